@@ -0,0 +1,61 @@
+"""Per revision cost of walking the migration graph.
+
+Run with `python benchmarks/bench_graph.py`. The "dumped" column emulates the
+previous graph, which stored `revision.model_dump()` on each node and built a
+new, validated `Revision` from it every time a node was handed out. The
+"stored" column walks `MigrationGraph`, which hands out the revisions it holds.
+"""
+
+import time
+from collections.abc import Callable, Iterable
+from datetime import datetime
+
+from wandern.graph import MigrationGraph
+from wandern.models import Revision
+
+SIZES = [1_000, 10_000, 100_000]
+ROUNDS = 2  # the graph is usually walked more than once per command
+
+
+def make_revisions(count: int) -> list[Revision]:
+    return [
+        Revision(
+            revision_id=f"{i:08d}",
+            down_revision_id=f"{i - 1:08d}" if i else None,
+            message=f"migration {i}",
+            tags=["bench"],
+            author="bench",
+            created_at=datetime(2024, 1, 1),
+        )
+        for i in range(count)
+    ]
+
+
+def dumped_iter(nodes: list[dict]) -> Iterable[Revision]:
+    return (Revision(**data) for data in nodes)
+
+
+def per_revision_us(func: Callable[[], Iterable[Revision]], count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for _ in func():
+            pass
+    return (time.perf_counter() - start) / (count * ROUNDS) * 1e6
+
+
+def main():
+    print(f"{'revisions':>10}{'dumped (us/rev)':>18}{'stored (us/rev)':>18}")
+    for size in SIZES:
+        revisions = make_revisions(size)
+        nodes = [revision.model_dump() for revision in revisions]
+        graph = MigrationGraph(revisions)
+
+        print(
+            f"{size:>10}"
+            f"{per_revision_us(lambda: dumped_iter(nodes), size):>18.3f}"
+            f"{per_revision_us(graph.iter, size):>18.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the single pass migration parser against the legacy regex.
+
+Run with `python benchmarks/bench_parser.py`. For each input the size is
+doubled a few times, a linear parser roughly doubles its time per step while
+the legacy regex grows quadratically on the adversarial inputs.
+"""
+
+import io
+import time
+from collections.abc import Callable
+
+from wandern.constants import REGEX_MIGRATION_PARSER
+from wandern.parser import parse_migration
+
+HEADER = """/*
+Timestamp: 2024-11-19 00:55:16
+Revision ID: abc123
+Revises: None
+Message: benchmark
+*/
+"""
+
+# input name -> (content for n lines, sizes to try)
+INPUTS: dict[str, tuple[Callable[[int], str], list[int]]] = {
+    "seed migration": (
+        lambda n: (
+            HEADER
+            + "-- UP\n"
+            + "INSERT INTO t VALUES (1, 'some text');\n" * n
+            + "-- DOWN\nDELETE FROM t;\n"
+        ),
+        [10_000, 20_000, 40_000, 80_000],
+    ),
+    "many /* */ pairs": (lambda n: "/* */ x\n" * n, [1_000, 2_000, 4_000]),
+    "missing -- DOWN": (lambda n: "/* */\n-- UP\n" * n, [100, 200, 400]),
+}
+
+
+def legacy(content: bytes):
+    REGEX_MIGRATION_PARSER.search(content.decode("utf-8"))
+
+
+def single_pass(content: bytes):
+    try:
+        parse_migration(io.BytesIO(content), with_sql=True)
+    except ValueError:
+        pass
+
+
+def timed(func: Callable[[bytes], None], content: bytes) -> float:
+    start = time.perf_counter()
+    func(content)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'input':<20}{'lines':>8}{'legacy (s)':>14}{'single pass (s)':>18}")
+    for name, (make, sizes) in INPUTS.items():
+        for size in sizes:
+            content = make(size).encode("utf-8")
+            print(
+                f"{name:<20}{size:>8}"
+                f"{timed(legacy, content):>14.4f}"
+                f"{timed(single_pass, content):>18.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Time taken to apply a revision of many small statements on PostgreSQL, one
+statement per round trip and in pipeline mode.
+
+Run with `python benchmarks/bench_pipeline.py postgresql://...`, against a
+throwaway database as the migration table is dropped at the end. Pipeline mode
+waits for the server once per `PIPELINE_SYNC_INTERVAL` statements instead of
+after each of them, so the gap widens with the latency to the server; against
+a local server it mostly shows the saved per statement overhead.
+"""
+
+import math
+import sys
+import time
+
+from wandern.databases.postgresql import PIPELINE_SYNC_INTERVAL, PostgresProvider
+from wandern.models import Config, RevisionRecord
+
+SIZES = [100, 1000, 5000]
+
+
+def make_revision(count: int) -> RevisionRecord:
+    return RevisionRecord(
+        revision_id=f"bench{count}",
+        down_revision_id=None,
+        message=f"{count} statements",
+        up_sql="".join(
+            f"CREATE TABLE bench_pipeline_{i} (id INTEGER);\n" for i in range(count)
+        ),
+        down_sql="".join(f"DROP TABLE bench_pipeline_{i};\n" for i in range(count)),
+    )
+
+
+def round_trips(count: int, pipeline: bool) -> int:
+    """Waits for the server, for the statements and the bookkeeping query"""
+    if pipeline:
+        return math.ceil(count / PIPELINE_SYNC_INTERVAL) + 1
+    return count + 1
+
+
+def measure(config: Config, count: int) -> float:
+    database = PostgresProvider(config)
+    revision = make_revision(count)
+    with database.session():
+        database.create_table_migration()
+        start = time.perf_counter()
+        database.migrate_up(revision)
+        elapsed = time.perf_counter() - start
+        database.migrate_down(revision)
+        database.drop_table_migration()
+    return elapsed
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(f"usage: python {sys.argv[0]} postgresql://...")
+
+    print(f"{'statements':>12}{'mode':>12}{'round trips':>14}{'up s':>10}")
+    for size in SIZES:
+        for name, pipeline in (("per call", False), ("pipeline", True)):
+            config = Config(
+                dsn=sys.argv[1], migration_dir=".", index_file=None, pipeline=pipeline
+            )
+            elapsed = measure(config, size)
+            print(
+                f"{size:>12}{name:>12}{round_trips(size, pipeline):>14}{elapsed:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Cost of building revisions from migration table rows.
+
+Run with `python benchmarks/bench_records.py`. Compares the pydantic
+`Revision` with the slots based `RevisionRecord` that providers now build from
+rows, on construction time and on memory held per revision.
+"""
+
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from wandern.models import Revision, RevisionRecord
+
+SIZES = [10_000, 50_000]
+
+
+def make_rows(count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "revision_id": f"{i:08d}",
+            "down_revision_id": f"{i - 1:08d}" if i else None,
+            "message": f"migration {i}",
+            "tags": ["bench"],
+            "author": "bench",
+            "created_at": datetime(2024, 1, 1),
+        }
+        for i in range(count)
+    ]
+
+
+def measure(
+    build: Callable[..., Any], rows: list[dict[str, Any]]
+) -> tuple[float, float]:
+    """Return the time in us and the memory in bytes per revision"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    revisions = [build(**row) for row in rows]
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(revisions) == len(rows)
+    return elapsed / len(rows) * 1e6, memory / len(rows)
+
+
+def main():
+    print(f"{'rows':>8}{'model':>16}{'us/rev':>10}{'bytes/rev':>12}")
+    for size in SIZES:
+        rows = make_rows(size)
+        for name, build in (("Revision", Revision), ("RevisionRecord", RevisionRecord)):
+            per_rev, per_rev_bytes = measure(build, rows)
+            print(f"{size:>8}{name:>16}{per_rev:>10.3f}{per_rev_bytes:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Connections opened, and time spent opening them, by an upgrade and downgrade.
+
+Run with `python benchmarks/bench_session.py [dsn]`, against a throwaway
+database as the migration table is dropped at the end. The "per call" rows
+connect for every provider call, as providers did before sessions, the
+"session" rows hold one connection for the run like `MigrationService` does.
+Connection setup dominates on Postgres and MySQL, especially over TLS, SQLite
+is the default only so that the benchmark runs anywhere.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+from wandern.databases.provider import get_database_impl
+from wandern.models import Config, RevisionRecord
+
+SIZES = [100, 300]
+
+
+def make_revisions(count: int) -> list[RevisionRecord]:
+    return [
+        RevisionRecord(
+            revision_id=f"{i:08d}",
+            down_revision_id=f"{i - 1:08d}" if i else None,
+            message=f"migration {i}",
+            up_sql="SELECT 1",
+            down_sql="SELECT 1",
+        )
+        for i in range(count)
+    ]
+
+
+def measure(config: Config, count: int, session: bool) -> tuple[int, float, float]:
+    """Return the connections opened, the seconds spent opening them and the
+    seconds the whole run took.
+    """
+    database = get_database_impl(config.dialect, config=config)
+    connect = database.connect
+    connections = 0
+    setup = 0.0
+
+    def counting_connect():
+        nonlocal connections, setup
+        start = time.perf_counter()
+        connection = connect()
+        setup += time.perf_counter() - start
+        connections += 1
+        return connection
+
+    database.connect = counting_connect  # type: ignore
+    revisions = make_revisions(count)
+
+    start = time.perf_counter()
+    with database.session() if session else nullcontext():
+        database.create_table_migration()
+        database.get_head_revision()
+        for revision in revisions:
+            database.migrate_up(revision)
+        for revision in reversed(revisions):
+            database.migrate_down(revision)
+    elapsed = time.perf_counter() - start
+    result = connections, setup, elapsed
+
+    database.drop_table_migration()
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        dsn = (
+            sys.argv[1]
+            if len(sys.argv) > 1
+            else f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        )
+        config = Config(dsn=dsn, migration_dir=directory, index_file=None)
+
+        print(
+            f"{'revisions':>10}{'mode':>10}{'connects':>10}"
+            f"{'setup s':>10}{'total s':>10}"
+        )
+        for size in SIZES:
+            for name, session in (("per call", False), ("session", True)):
+                connections, setup, elapsed = measure(config, size, session)
+                print(
+                    f"{size:>10}{name:>10}{connections:>10}"
+                    f"{setup:>10.3f}{elapsed:>10.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
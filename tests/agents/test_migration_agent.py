@@ -12,7 +12,7 @@ from wandern.agents.migration_agent import (
     MigrationAgentResponse,
     MigrationSQL,
 )
-from wandern.models import Config, DatabaseProviders, Revision
+from wandern.models import Config, DatabaseProviders, RevisionRecord
 
 
 def test_migration_sql_model_valid():
@@ -97,13 +97,13 @@ def test_migration_agent_generate_additional_context(dialect, dsn):
         config = Config(dsn=dsn, migration_dir=temp_dir)
 
         # Mock revisions
-        revision1 = Revision(
+        revision1 = RevisionRecord(
             revision_id="rev1",
             down_revision_id=None,
             message="Initial migration",
             created_at=datetime(2024, 1, 1, 12, 0, 0),
         )
-        revision2 = Revision(
+        revision2 = RevisionRecord(
             revision_id="rev2",
             down_revision_id="rev1",
             message="Add users table",
@@ -116,6 +116,7 @@ def test_migration_agent_generate_additional_context(dialect, dsn):
             with patch("wandern.graph.MigrationGraph.build") as mock_graph_build:
                 mock_graph = Mock()
                 mock_graph.iter.return_value = [revision1, revision2]
+                mock_graph.load_revision.side_effect = lambda revision: revision
                 mock_graph_build.return_value = mock_graph
 
                 agent = MigrationAgent(config=config)
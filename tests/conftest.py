@@ -0,0 +1,11 @@
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def migration_dir(tmp_path):
+    """A copy of the fixture migrations, that a test can modify"""
+    directory = tmp_path / "migrations"
+    shutil.copytree("tests/fixtures/migrations", directory)
+    return directory
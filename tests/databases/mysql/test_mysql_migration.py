@@ -1,7 +1,6 @@
 import mysql.connector
 from unittest.mock import patch
 
-import networkx as nx
 import pytest
 
 from wandern.graph import MigrationGraph
@@ -74,13 +73,7 @@ def revisions() -> list[Revision]:
 def test_upgrade_all(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
         migration_service.upgrade()
@@ -93,13 +86,7 @@ def test_upgrade_all(config, revisions):
 def test_upgrade_with_steps(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -121,13 +108,7 @@ def test_upgrade_with_steps(config, revisions):
 def test_upgrade_with_author_filter(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -143,13 +124,7 @@ def test_upgrade_with_author_filter(config, revisions):
 def test_upgrade_with_tags_filter(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -164,13 +139,7 @@ def test_upgrade_with_tags_filter(config, revisions):
 def test_downgrade_all(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -191,13 +160,7 @@ def test_downgrade_all(config, revisions):
 def test_downgrade_with_steps(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -225,13 +188,7 @@ def test_downgrade_with_steps(config, revisions):
 def test_filter_migrations(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -255,13 +212,7 @@ def test_filter_migrations(config, revisions):
 def test_get_combined_migrations(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -295,8 +246,7 @@ def test_get_combined_migrations(config, revisions):
 def test_save_migration(config, revisions):
     """Test saving migration to file."""
     with patch.object(MigrationGraph, "build") as mock_build:
-        graph = nx.DiGraph()
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph()
 
         migration_service = MigrationService(config)
 
@@ -342,13 +292,7 @@ def test_upgrade_with_author_and_tags_validation(config, revisions):
             ),
         ]
 
-        graph = nx.DiGraph()
-        for rev in revisions_with_tags:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions_with_tags:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions_with_tags)
 
         migration_service = MigrationService(config)
 
@@ -1,10 +1,11 @@
 from unittest.mock import patch
 
-import networkx as nx
 import psycopg
 import pytest
 from psycopg.sql import SQL, Identifier
 
+from wandern.databases.postgresql import AsyncPostgresProvider
+from wandern.fanout import TargetState, upgrade_schemas
 from wandern.graph import MigrationGraph
 from wandern.migration import MigrationService
 from wandern.models import Revision
@@ -69,13 +70,7 @@ def revisions() -> list[Revision]:
 def test_upgrade_all(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
         migration_service.upgrade()
@@ -88,13 +83,7 @@ def test_upgrade_all(config, revisions):
 def test_upgrade_with_steps(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -116,13 +105,7 @@ def test_upgrade_with_steps(config, revisions):
 def test_upgrade_with_author_filter(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -138,13 +121,7 @@ def test_upgrade_with_author_filter(config, revisions):
 def test_upgrade_with_tags_filter(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -159,13 +136,7 @@ def test_upgrade_with_tags_filter(config, revisions):
 def test_downgrade_all(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -186,13 +157,7 @@ def test_downgrade_all(config, revisions):
 def test_downgrade_with_steps(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -220,13 +185,7 @@ def test_downgrade_with_steps(config, revisions):
 def test_filter_migrations(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -250,13 +209,7 @@ def test_filter_migrations(config, revisions):
 def test_get_combined_migrations(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -287,8 +240,7 @@ def test_get_combined_migrations(config, revisions):
 def test_save_migration(config, revisions):
     """Test saving migration to file."""
     with patch.object(MigrationGraph, "build") as mock_build:
-        graph = nx.DiGraph()
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph()
 
         migration_service = MigrationService(config)
 
@@ -334,13 +286,7 @@ def test_upgrade_with_author_and_tags_validation(config, revisions):
             ),
         ]
 
-        graph = nx.DiGraph()
-        for rev in revisions_with_tags:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions_with_tags:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions_with_tags)
 
         migration_service = MigrationService(config)
 
@@ -350,3 +296,92 @@ def test_upgrade_with_author_and_tags_validation(config, revisions):
         revision = migration_service.database.get_head_revision()
         assert revision is not None
         assert revision.revision_id == "0001"  # Only feature tagged migration
+
+
+def test_upgrade_atomic_resets_revision_timeouts(config, revisions):
+    revisions[0] = revisions[0].model_copy(update={"lock_timeout": 0.5})
+    revisions[1] = revisions[1].model_copy(
+        update={
+            "up_sql": "CREATE TABLE public.timeouts AS"
+            " SELECT current_setting('lock_timeout') AS lock_timeout"
+        }
+    )
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+        migration_service.database.create_table_migration()
+
+        try:
+            migration_service.upgrade(atomic=True)
+
+            # the lock_timeout of 0001 does not apply to 0002
+            with psycopg.connect(config.dsn) as conn:
+                result = conn.execute("SELECT lock_timeout FROM public.timeouts")
+                assert result.fetchone() == ("0",)
+        finally:
+            with psycopg.connect(config.dsn, autocommit=True) as conn:
+                conn.execute("DROP TABLE IF EXISTS public.timeouts")
+
+
+@pytest.fixture(scope="function")
+def tenant_schemas(config):
+    schemas = ["tenant_a", "tenant_b", "tenant_c"]
+    with psycopg.connect(config.dsn, autocommit=True) as conn:
+        for schema in schemas:
+            conn.execute(SQL("CREATE SCHEMA {}").format(Identifier(schema)))
+        # the first revision can not be applied on this schema
+        conn.execute("CREATE TABLE tenant_b.items (id INT)")
+
+    yield schemas
+
+    with psycopg.connect(config.dsn, autocommit=True) as conn:
+        for schema in schemas:
+            conn.execute(SQL("DROP SCHEMA {} CASCADE").format(Identifier(schema)))
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schemas(config, tenant_schemas):
+    revisions = [
+        Revision(
+            revision_id="0001",
+            down_revision_id=None,
+            message="items",
+            up_sql="CREATE TABLE items (id INT PRIMARY KEY)",
+            down_sql="DROP TABLE items",
+        ),
+        Revision(
+            revision_id="0002",
+            down_revision_id="0001",
+            message="item names",
+            up_sql="ALTER TABLE items ADD COLUMN name TEXT",
+            down_sql="ALTER TABLE items DROP COLUMN name",
+        ),
+    ]
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        targets = await upgrade_schemas(config, "tenant\\_%", concurrency=2)
+
+        assert [(target.name, target.state) for target in targets] == [
+            ("tenant_a", TargetState.DONE),
+            ("tenant_b", TargetState.FAILED),
+            ("tenant_c", TargetState.DONE),
+        ]
+        assert "already exists" in targets[1].error
+        assert targets[0].applied == targets[2].applied == 2
+
+        heads = await AsyncPostgresProvider(config).get_schema_heads("tenant\\_%")
+        assert heads == {"tenant_a": "0002", "tenant_b": None, "tenant_c": "0002"}
+
+        with psycopg.connect(config.dsn) as conn:
+            # the tables of the revisions were created in the schemas
+            columns = conn.execute(
+                """SELECT table_schema FROM information_schema.columns
+                    WHERE table_name = 'items' AND column_name = 'name'
+                    ORDER BY table_schema"""
+            ).fetchall()
+            assert columns == [("tenant_a",), ("tenant_c",)]
+
+        # the schemas up to date are skipped
+        targets = await upgrade_schemas(config, "tenant\\_%", concurrency=2)
+        assert [target.applied for target in targets] == [0, 0, 0]
+        assert targets[1].state == TargetState.FAILED
@@ -534,3 +534,120 @@ def test_migrate_down_return_value(config):
     # Then migrate down and check return value
     result = migration.migrate_down(revision)
     assert result == 1  # Should delete exactly one row
+
+
+def test_migrate_up_and_down_pipelined(config):
+    config.pipeline = True
+    revision = Revision(
+        revision_id="pipelined",
+        down_revision_id=None,
+        message="Pipelined revision",
+        up_sql="".join(
+            f"CREATE TABLE public.pipelined_{i} (id INTEGER);\n" for i in range(20)
+        ),
+        down_sql="".join(f"DROP TABLE public.pipelined_{i};\n" for i in range(20)),
+    )
+
+    migration = PostgresProvider(config)
+    migration.create_table_migration()
+
+    assert migration.migrate_up(revision) == 1
+    head = migration.get_head_revision()
+    assert head is not None
+    assert head.revision_id == "pipelined"
+
+    assert migration.migrate_down(revision) == 1
+    assert migration.get_head_revision() is None
+
+
+def test_migrate_up_pipelined_error_names_statement(config):
+    config.pipeline = True
+    revision = Revision(
+        revision_id="broken",
+        down_revision_id=None,
+        message="Broken revision",
+        up_sql="CREATE TABLE public.broken (id INTEGER);\n\nSELECT * FROM missing;",
+    )
+
+    migration = PostgresProvider(config)
+    migration.create_table_migration()
+
+    with pytest.raises(psycopg.errors.UndefinedTable) as exc_info:
+        migration.migrate_up(revision)
+
+    assert exc_info.value.__notes__ == [
+        "In the statement on line 3 of the UP SQL of revision broken"
+    ]
+    # rolled back with the rest of the revision
+    assert migration.get_head_revision() is None
+    with psycopg.connect(config.dsn) as conn:
+        result = conn.execute("SELECT to_regclass('public.broken')").fetchone()
+        assert result == (None,)
+
+
+def test_migrate_up_non_transactional_drops_invalid_index(config):
+    revision = Revision(
+        revision_id="concurrently",
+        down_revision_id=None,
+        message="Non transactional revision",
+        up_sql="CREATE UNIQUE INDEX CONCURRENTLY items_id ON public.items (id);",
+        down_sql="DROP INDEX CONCURRENTLY public.items_id;",
+        transactional=False,
+    )
+    with psycopg.connect(config.dsn, autocommit=True) as conn:
+        conn.execute("CREATE TABLE public.items (id INTEGER)")
+        conn.execute("INSERT INTO public.items VALUES (1), (1)")
+
+    migration = PostgresProvider(config)
+    migration.create_table_migration()
+
+    try:
+        # the failed build leaves an invalid index behind
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            migration.migrate_up(revision)
+        assert migration.get_head_revision() is None
+
+        with psycopg.connect(config.dsn, autocommit=True) as conn:
+            conn.execute("TRUNCATE public.items")
+
+        # which is dropped before the index is built again
+        assert migration.migrate_up(revision) == 1
+        with psycopg.connect(config.dsn) as conn:
+            valid = conn.execute(
+                """SELECT indisvalid FROM pg_index
+                    WHERE indexrelid = 'public.items_id'::regclass"""
+            ).fetchone()
+            assert valid == (True,)
+
+        assert migration.migrate_down(revision) == 1
+        assert migration.get_head_revision() is None
+    finally:
+        with psycopg.connect(config.dsn, autocommit=True) as conn:
+            conn.execute("DROP TABLE public.items")
+
+
+def test_migrate_up_lock_timeout(config):
+    revision = Revision(
+        revision_id="locked",
+        down_revision_id=None,
+        message="Revision waiting on a lock",
+        up_sql="ALTER TABLE public.locked ADD COLUMN name TEXT;",
+        lock_timeout=0.1,
+    )
+    with psycopg.connect(config.dsn, autocommit=True) as conn:
+        conn.execute("CREATE TABLE public.locked (id INTEGER)")
+
+    migration = PostgresProvider(config)
+    migration.create_table_migration()
+
+    try:
+        with psycopg.connect(config.dsn) as blocker:
+            blocker.execute("LOCK TABLE public.locked IN ACCESS SHARE MODE")
+
+            with pytest.raises(psycopg.errors.LockNotAvailable) as exc_info:
+                migration.migrate_up(revision)
+            assert migration.is_lock_timeout(exc_info.value)
+            assert migration.get_head_revision() is None
+    finally:
+        with psycopg.connect(config.dsn, autocommit=True) as conn:
+            conn.execute("DROP TABLE public.locked")
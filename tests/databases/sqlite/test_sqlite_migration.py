@@ -1,12 +1,16 @@
+import asyncio
+import os
 import sqlite3
 from unittest.mock import patch
 
-import networkx as nx
 import pytest
 
+from wandern.databases.sqlite import SQLiteProvider
+from wandern.fanout import TargetState, upgrade_schemas, upgrade_targets
 from wandern.graph import MigrationGraph
-from wandern.migration import MigrationService
-from wandern.models import Revision
+from wandern.migration import AsyncMigrationService, MigrationService
+from wandern.models import Config, Revision
+from wandern.utils import create_migration
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -61,13 +65,7 @@ def revisions() -> list[Revision]:
 def test_upgrade_all(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
         migration_service.upgrade()
@@ -77,16 +75,268 @@ def test_upgrade_all(config, revisions):
         assert revision.revision_id == "0003"
 
 
+def test_upgrade_and_downgrade_connect_once(config, revisions):
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+        database = migration_service.database
+
+        with patch.object(database, "connect", wraps=database.connect) as mock_connect:
+            migration_service.upgrade()
+            assert mock_connect.call_count == 1
+
+            migration_service.downgrade()
+            assert mock_connect.call_count == 2
+
+        assert database.get_head_revision() is None
+
+
+def test_atomic_upgrade(config, revisions):
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+        database = migration_service.database
+
+        with patch.object(
+            database, "record_migrations", wraps=database.record_migrations
+        ) as mock_record:
+            migration_service.upgrade(atomic=True)
+
+        mock_record.assert_called_once()
+        applied = database.list_migrations()
+        assert [revision.revision_id for revision in applied] == [
+            "0003",
+            "0002",
+            "0001",
+        ]
+        assert all(revision.checksum for revision in applied)
+
+
+def test_atomic_upgrade_rolls_back_on_failure(config, revisions):
+    revisions = [
+        revisions[0].model_copy(update={"up_sql": "CREATE TABLE atomic_1 (id INT);"}),
+        revisions[1].model_copy(update={"up_sql": "CREATE TABLE atomic_2 (id INT);"}),
+        revisions[2].model_copy(update={"up_sql": "SELECT * FROM missing_table;"}),
+    ]
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+
+        with pytest.raises(sqlite3.OperationalError):
+            migration_service.upgrade(atomic=True)
+
+        # even the migration table was rolled back
+        with migration_service.database.connect() as connection:
+            tables = connection.execute(
+                "SELECT name FROM sqlite_master WHERE name LIKE 'atomic_%' OR name = ?",
+                (config.migration_table,),
+            ).fetchall()
+        assert tables == []
+
+
+@pytest.mark.asyncio
+async def test_async_upgrade_and_downgrade(config, revisions):
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = AsyncMigrationService(config)
+        database = migration_service.database
+
+        await migration_service.upgrade(steps=2)
+        head = await database.get_head_revision()
+        assert head is not None
+        assert head.revision_id == "0002"
+
+        await migration_service.upgrade()
+        combined = await migration_service.get_combined_migrations()
+        assert [(rev.revision_id, status) for rev, status in combined] == [
+            ("0003", "applied"),
+            ("0002", "applied"),
+            ("0001", "applied"),
+        ]
+        assert await migration_service.verify() == []
+
+        await migration_service.downgrade(to="0001")
+        head = await database.get_head_revision()
+        assert head is not None
+        assert head.revision_id == "0001"
+
+
+@pytest.mark.asyncio
+async def test_async_upgrade_databases_concurrently(config, revisions, tmp_path):
+    configs = [
+        Config(
+            dsn=f"sqlite:///{tmp_path / f'shard_{i}.db'}", migration_dir="migrations"
+        )
+        for i in range(3)
+    ]
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.side_effect = lambda *args, **kwargs: MigrationGraph(revisions)
+        services = [AsyncMigrationService(config) for config in configs]
+
+        await asyncio.gather(*(service.upgrade() for service in services))
+
+        for service in services:
+            head = await service.database.get_head_revision()
+            assert head is not None
+            assert head.revision_id == "0003"
+
+
+@pytest.mark.asyncio
+async def test_upgrade_targets_keeps_going_after_a_failure(config, revisions, tmp_path):
+    dsns = [f"sqlite:///{tmp_path / f'shard_{i}.db'}" for i in range(3)]
+    # the directory of the database does not exist
+    dsns.insert(1, f"sqlite:///{tmp_path / 'missing' / 'shard.db'}")
+    progress = []
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        targets = await upgrade_targets(
+            config,
+            dsns,
+            concurrency=2,
+            on_progress=lambda targets: progress.append(targets[0].state),
+        )
+        # the graph is built once for all the databases
+        assert mock_build.call_count == 1
+
+    assert [target.state for target in targets] == [
+        TargetState.DONE,
+        TargetState.FAILED,
+        TargetState.DONE,
+        TargetState.DONE,
+    ]
+    assert targets[1].error
+    for target in targets[::2]:
+        assert target.applied == 3
+        assert target.last == "0003"
+        assert target.error is None
+    assert progress[0] == TargetState.RUNNING
+    assert progress[-1] == TargetState.DONE
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schemas_requires_postgresql(config):
+    with pytest.raises(ValueError, match="only supported on PostgreSQL"):
+        await upgrade_schemas(config, "tenant_%")
+
+
+@pytest.mark.asyncio
+async def test_async_atomic_upgrade_rolls_back_on_failure(config, revisions):
+    revisions[2] = revisions[2].model_copy(
+        update={"up_sql": "SELECT * FROM missing_table;"}
+    )
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = AsyncMigrationService(config)
+        database = migration_service.database
+        await database.create_table_migration()
+
+        with pytest.raises(sqlite3.OperationalError):
+            await migration_service.upgrade(atomic=True)
+
+        assert await database.list_migrations() == []
+
+
+def test_atomic_upgrade_refuses_non_transactional_revision(config, revisions):
+    revisions[1] = revisions[1].model_copy(update={"transactional": False})
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+        migration_service.database.create_table_migration()
+
+        with pytest.raises(ValueError, match="0002 is not transactional"):
+            migration_service.upgrade(atomic=True)
+
+        # refused before any revision is applied
+        assert migration_service.database.get_head_revision() is None
+
+        migration_service.upgrade()
+        head = migration_service.database.get_head_revision()
+        assert head is not None
+        assert head.revision_id == "0003"
+
+
+@pytest.fixture(scope="function")
+def locked_database(config):
+    """Another connection holding the write lock of the database"""
+    SQLiteProvider(config).create_table_migration()
+    blocker = sqlite3.connect(config.dsn.replace("sqlite:///", ""))
+    blocker.execute("BEGIN IMMEDIATE")
+    yield blocker
+    blocker.close()
+
+
+def test_upgrade_retries_lock_timeouts(config, revisions, locked_database):
+    config = config.model_copy(
+        update={"lock_timeout": 0.05, "lock_attempts": 3, "lock_retry_delay": 0.01}
+    )
+    revisions[0] = revisions[0].model_copy(update={"up_sql": "CREATE TABLE t (id INT)"})
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+
+        # the lock is released during the first wait before a retry
+        with patch("wandern.migration.time.sleep") as mock_sleep:
+            mock_sleep.side_effect = lambda delay: locked_database.rollback()
+            migration_service.upgrade()
+
+        assert mock_sleep.call_count == 1
+        assert 0.005 <= mock_sleep.call_args.args[0] <= 0.01
+        head = migration_service.database.get_head_revision()
+        assert head is not None
+        assert head.revision_id == "0003"
+
+
+def test_upgrade_gives_up_after_lock_attempts(config, revisions, locked_database):
+    config = config.model_copy(update={"lock_timeout": 0.05, "lock_attempts": 2})
+    revisions[0] = revisions[0].model_copy(update={"up_sql": "CREATE TABLE t (id INT)"})
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+
+        with patch("wandern.migration.time.sleep") as mock_sleep:
+            with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+                migration_service.upgrade()
+
+        assert mock_sleep.call_count == 1
+
+
+def test_upgrade_rolls_back_failed_revision(config, revisions):
+    revisions[0] = revisions[0].model_copy(
+        update={"up_sql": "CREATE TABLE x (id INT);\nSELECT * FROM missing;"}
+    )
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+
+        with pytest.raises(sqlite3.OperationalError, match="no such table: missing"):
+            migration_service.upgrade()
+
+    # the table created before the failed statement is rolled back with it
+    with sqlite3.connect(config.dsn.replace("sqlite:///", "")) as conn:
+        result = conn.execute("SELECT name FROM sqlite_master WHERE name = 'x'")
+        assert result.fetchone() is None
+
+
+def test_upgrade_does_not_retry_non_transactional(config, revisions, locked_database):
+    config = config.model_copy(update={"lock_timeout": 0.05, "lock_attempts": 3})
+    revisions[0] = revisions[0].model_copy(
+        update={"up_sql": "CREATE TABLE t (id INT)", "transactional": False}
+    )
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+        migration_service = MigrationService(config)
+
+        with patch("wandern.migration.time.sleep") as mock_sleep:
+            with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+                migration_service.upgrade()
+
+        mock_sleep.assert_not_called()
+
+
 def test_upgrade_with_steps(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -108,13 +358,7 @@ def test_upgrade_with_steps(config, revisions):
 def test_upgrade_with_author_filter(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -130,13 +374,7 @@ def test_upgrade_with_author_filter(config, revisions):
 def test_upgrade_with_tags_filter(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -151,13 +389,7 @@ def test_upgrade_with_tags_filter(config, revisions):
 def test_downgrade_all(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -175,16 +407,46 @@ def test_downgrade_all(config, revisions):
         assert revision is None
 
 
+def test_upgrade_and_downgrade_to_revision(config, revisions):
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+
+        migration_service = MigrationService(config)
+
+        migration_service.upgrade(to="0002")
+        assert migration_service.database.get_head_revision().revision_id == "0002"
+
+        with pytest.raises(ValueError, match="use `wandern down --to 0001`"):
+            migration_service.upgrade(to="0001")
+
+        migration_service.upgrade(to="0003")
+        assert migration_service.database.get_head_revision().revision_id == "0003"
+
+        migration_service.downgrade(to="0001")
+        assert migration_service.database.get_head_revision().revision_id == "0001"
+
+        with pytest.raises(ValueError, match="0003 is not an ancestor of 0001"):
+            migration_service.downgrade(to="0003")
+
+
+def test_invalid_target_is_rejected_before_connecting(config, revisions):
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+
+        migration_service = MigrationService(config)
+        with patch.object(migration_service.database, "connect") as mock_connect:
+            with pytest.raises(ValueError, match="Revision: 0009 does not exist"):
+                migration_service.upgrade(to="0009")
+            with pytest.raises(ValueError, match="Revision: 0009 does not exist"):
+                migration_service.downgrade(to="0009")
+
+        mock_connect.assert_not_called()
+
+
 def test_downgrade_with_steps(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -212,13 +474,7 @@ def test_downgrade_with_steps(config, revisions):
 def test_filter_migrations(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -242,13 +498,7 @@ def test_filter_migrations(config, revisions):
 def test_get_combined_migrations(config, revisions):
     with patch.object(MigrationGraph, "build") as mock_build:
         # Create a mock graph from revisions fixture
-        graph = nx.DiGraph()
-        for rev in revisions:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions)
 
         migration_service = MigrationService(config)
 
@@ -282,8 +532,7 @@ def test_get_combined_migrations(config, revisions):
 def test_save_migration(config, revisions):
     """Test saving migration to file."""
     with patch.object(MigrationGraph, "build") as mock_build:
-        graph = nx.DiGraph()
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph()
 
         migration_service = MigrationService(config)
 
@@ -329,13 +578,7 @@ def test_upgrade_with_author_and_tags_validation(config, revisions):
             ),
         ]
 
-        graph = nx.DiGraph()
-        for rev in revisions_with_tags:
-            graph.add_node(rev.revision_id, **rev.model_dump())
-        for rev in revisions_with_tags:
-            if rev.down_revision_id:
-                graph.add_edge(rev.down_revision_id, rev.revision_id)
-        mock_build.return_value = MigrationGraph(graph)
+        mock_build.return_value = MigrationGraph(revisions_with_tags)
 
         migration_service = MigrationService(config)
 
@@ -345,3 +588,193 @@ def test_upgrade_with_author_and_tags_validation(config, revisions):
         revision = migration_service.database.get_head_revision()
         assert revision is not None
         assert revision.revision_id == "0001"  # Only feature tagged migration
+
+
+def test_squash(config, tmp_path):
+    migration_dir = tmp_path / "migrations"
+    migration_dir.mkdir()
+    config = config.model_copy(
+        update={"migration_dir": str(migration_dir), "index_file": None}
+    )
+    fresh_config = config.model_copy(
+        update={"dsn": f"sqlite:///{tmp_path / 'fresh.db'}"}
+    )
+
+    service = MigrationService(config)
+    revision_ids: list[str] = []
+    for i in range(1, 5):
+        revision = create_migration(
+            message=f"table {i}",
+            down_revision_id=revision_ids[-1] if revision_ids else None,
+            up_sql=f"CREATE TABLE t{i} (id INTEGER);",
+            down_sql=f"DROP TABLE t{i};",
+            lock_timeout=2.0 if i == 2 else 0.5,
+        )
+        service.save_migration(revision)
+        revision_ids.append(revision.revision_id)
+
+    # a database migrated before the squash
+    MigrationService(config).upgrade(steps=3)
+
+    baseline, filename = MigrationService(config).squash(revision_ids[1])
+    assert baseline.replaces == revision_ids[:2]
+    assert baseline.down_revision_id is None
+    assert baseline.lock_timeout == 2.0
+    assert baseline.statement_timeout is None
+    assert len(os.listdir(migration_dir)) == 3
+    assert filename in os.listdir(migration_dir)
+
+    existing = MigrationService(config)
+    node = existing.graph.get_node(baseline.revision_id)
+    assert node is not None and node.lock_timeout == 2.0
+    existing.upgrade()
+    head = existing.database.get_head_revision()
+    assert head is not None and head.revision_id == revision_ids[3]
+    assert len(existing.database.list_migrations()) == 4
+
+    fresh = MigrationService(fresh_config)
+    fresh.upgrade()
+    assert [rev.revision_id for rev in fresh.database.list_migrations()] == [
+        revision_ids[3],
+        revision_ids[2],
+        baseline.revision_id,
+    ]
+    with sqlite3.connect(tmp_path / "fresh.db") as conn:
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE 't_' ORDER BY name"
+        ).fetchall()
+    assert [name for (name,) in tables] == ["t1", "t2", "t3", "t4"]
+
+    existing.downgrade()
+    assert existing.database.list_migrations() == []
+    fresh.downgrade()
+    assert fresh.database.list_migrations() == []
+
+
+def test_squash_requires_several_revisions(config, revisions):
+    with patch.object(MigrationGraph, "build") as mock_build:
+        mock_build.return_value = MigrationGraph(revisions)
+
+        migration_service = MigrationService(config)
+        with pytest.raises(ValueError, match="Nothing to squash"):
+            migration_service.squash("0001")
+        with pytest.raises(ValueError, match="missing does not exist"):
+            migration_service.squash("missing")
+
+
+def test_watch(config, tmp_path):
+    migration_dir = tmp_path / "migrations"
+    migration_dir.mkdir()
+    config = config.model_copy(
+        update={"migration_dir": str(migration_dir), "index_file": None}
+    )
+
+    service = MigrationService(config)
+    first = create_migration(
+        message="table 1", down_revision_id=None, up_sql="CREATE TABLE t1 (id INT);"
+    )
+    service.save_migration(first)
+    service = MigrationService(config)
+    service.upgrade()
+
+    with service.watch() as watcher:
+        second = create_migration(
+            message="table 2",
+            down_revision_id=first.revision_id,
+            up_sql="CREATE TABLE t2 (id INT);",
+        )
+        service.save_migration(second)
+
+        assert watcher.refresh(timeout=1) is True
+        service.upgrade()
+
+    assert service.database.get_head_revision().revision_id == second.revision_id
+
+
+def test_verify(config, tmp_path):
+    migration_dir = tmp_path / "migrations"
+    migration_dir.mkdir()
+    config = config.model_copy(
+        update={
+            "migration_dir": str(migration_dir),
+            "index_file": str(tmp_path / ".wd_index"),
+        }
+    )
+
+    service = MigrationService(config)
+    revision_ids: list[str] = []
+    for i in range(1, 4):
+        revision = create_migration(
+            message=f"table {i}",
+            down_revision_id=revision_ids[-1] if revision_ids else None,
+            up_sql=f"CREATE TABLE t{i} (id INTEGER);",
+            down_sql=f"DROP TABLE t{i};",
+            lock_timeout=2.0 if i == 2 else 0.5,
+        )
+        service.save_migration(revision)
+        revision_ids.append(revision.revision_id)
+
+    MigrationService(config).upgrade(steps=2)
+    assert MigrationService(config).verify() == []
+
+    graph = MigrationService(config).graph
+    first, second = (graph.get_source(revision_id) for revision_id in revision_ids[:2])
+    # not a change of the SQL
+    first.write_text(first.read_text().replace("table 1", "the first table"))
+    second.write_text(second.read_text().replace("t2", "t2_renamed"))
+
+    assert MigrationService(config).verify() == [
+        f"{revision_ids[1]}: changed after it was applied"
+    ]
+
+    second.unlink()
+    assert MigrationService(config).verify() == [
+        f"{revision_ids[1]}: missing from the migration directory"
+    ]
+
+
+def test_upgrade_and_downgrade_streamed_migration(config, tmp_path):
+    migration_dir = tmp_path / "migrations"
+    migration_dir.mkdir()
+    config = config.model_copy(
+        update={
+            "migration_dir": str(migration_dir),
+            "index_file": None,
+            "stream_threshold": 100,
+        }
+    )
+
+    service = MigrationService(config)
+    revision = create_migration(
+        message="seed",
+        down_revision_id=None,
+        up_sql="\n".join(
+            [
+                "CREATE TABLE seed (id INTEGER, note TEXT);",
+                "CREATE TRIGGER seed_note AFTER INSERT ON seed BEGIN"
+                " UPDATE seed SET note = 'a;b' WHERE id = NEW.id; END;",
+                *(f"INSERT INTO seed (id) VALUES ({i});" for i in range(100)),
+            ]
+        ),
+        down_sql="DROP TABLE seed;",
+    )
+    service.save_migration(revision)
+
+    service = MigrationService(config)
+    service.upgrade()
+    with service.database.connect() as connection:
+        rows = connection.execute("SELECT COUNT(*), MIN(note) FROM seed").fetchone()
+    assert tuple(rows) == (100, "a;b")
+
+    node = service.graph.get_node(revision.revision_id)
+    assert node is not None
+    loaded = MigrationService(config).graph.load_revision(node, stream=False)
+    assert loaded.sql_file is None
+    assert service.database.get_head_revision().checksum == loaded.checksum
+
+    service.downgrade()
+    with service.database.connect() as connection:
+        tables = connection.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'seed'"
+        ).fetchall()
+    assert tables == []
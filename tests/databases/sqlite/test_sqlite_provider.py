@@ -1,8 +1,11 @@
+import sqlite3
+import threading
 from datetime import datetime
+from unittest.mock import patch
 
 import pytest
 
-from wandern.databases.sqlite import SQLiteProvider
+from wandern.databases.sqlite import AsyncSQLiteProvider, SQLiteProvider
 from wandern.models import Revision
 
 
@@ -67,6 +70,59 @@ def test_get_head_revision(config):
     assert revision.down_revision_id is None
 
 
+def test_migrate_up_records_checksum(config):
+    migration = SQLiteProvider(config)
+    migration.create_table_migration()
+
+    migration.migrate_up(
+        Revision(revision_id="aaaaa", down_revision_id=None, message="first")
+    )
+    migration.migrate_up(
+        Revision(
+            revision_id="bbbbb",
+            down_revision_id="aaaaa",
+            message="second",
+            checksum="0123abcd",
+        )
+    )
+
+    checksums = {
+        revision.revision_id: revision.checksum
+        for revision in migration.list_migrations()
+    }
+    assert checksums == {"aaaaa": None, "bbbbb": "0123abcd"}
+    assert migration.get_head_revision().checksum == "0123abcd"
+
+
+def test_create_table_migration_adds_checksum_column(config):
+    """Test that a migration table from before checksums is upgraded."""
+    migration = SQLiteProvider(config)
+    with migration.connect() as conn:
+        conn.execute(
+            f"""
+            CREATE TABLE {config.migration_table} (
+                revision_id TEXT PRIMARY KEY NOT NULL,
+                down_revision_id TEXT,
+                message TEXT,
+                tags TEXT,
+                author TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.execute(
+            f"INSERT INTO {config.migration_table} (revision_id, message)"
+            " VALUES ('aaaaa', 'old')"
+        )
+
+    migration.create_table_migration()
+    migration.create_table_migration()
+
+    revision = migration.get_head_revision()
+    assert revision.revision_id == "aaaaa"
+    assert revision.checksum is None
+
+
 def test_migrate_up(config):
     """Test migrating up creates table and records revision."""
     revision = Revision(
@@ -103,6 +159,84 @@ def test_migrate_up(config):
         conn.execute(revision.down_sql)
 
 
+def test_session_reuses_one_connection(config):
+    """Test that calls inside a session share a connection and are committed."""
+    revision = Revision(
+        revision_id="aaaaa",
+        down_revision_id=None,
+        message="First Revision",
+        up_sql="CREATE TABLE users (id INTEGER PRIMARY KEY)",
+        down_sql="DROP TABLE users",
+    )
+    migration = SQLiteProvider(config)
+
+    with patch.object(migration, "connect", wraps=migration.connect) as mock_connect:
+        with migration.session():
+            migration.create_table_migration()
+            migration.migrate_up(revision)
+
+            # committed, and visible to other connections
+            head = SQLiteProvider(config).get_head_revision()
+            assert head is not None
+            assert head.revision_id == "aaaaa"
+
+            with migration.session():
+                migration.migrate_down(revision)
+
+        assert mock_connect.call_count == 1
+
+    assert migration.get_head_revision() is None
+
+
+@pytest.mark.asyncio
+async def test_async_provider(config):
+    revision = Revision(
+        revision_id="async",
+        down_revision_id=None,
+        message="Async revision",
+        up_sql="CREATE TABLE async_users (id INTEGER PRIMARY KEY);",
+        down_sql="DROP TABLE async_users;",
+    )
+
+    migration = AsyncSQLiteProvider(config)
+    async with migration.session():
+        await migration.create_table_migration()
+        assert await migration.migrate_up(revision) == 1
+
+        head = await migration.get_head_revision()
+        assert head is not None
+        assert head.revision_id == "async"
+        assert [rev.revision_id for rev in await migration.list_migrations()] == [
+            "async"
+        ]
+
+        assert await migration.migrate_down(revision) == 1
+        assert await migration.get_head_revision() is None
+
+
+def wandern_threads() -> list[threading.Thread]:
+    return [
+        thread
+        for thread in threading.enumerate()
+        if thread.name.startswith("wandern-sqlite")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_provider_stops_worker_thread(config):
+    migration = AsyncSQLiteProvider(config)
+    async with migration.session():
+        await migration.create_table_migration()
+        assert len(wandern_threads()) == 1
+
+    # a new worker is started for the calls after the session
+    assert await migration.get_head_revision() is None
+
+    for thread in wandern_threads():
+        thread.join(timeout=1)
+    assert wandern_threads() == []
+
+
 def test_migrate_up_multiple_revision(config):
     """Test applying multiple migrations in sequence."""
     first_revision = Revision(
@@ -449,6 +583,52 @@ def test_migrate_down_without_sql(config):
     assert head is None
 
 
+def test_migrate_up_error_names_statement(config):
+    revision = Revision(
+        revision_id="broken",
+        down_revision_id=None,
+        message="Broken revision",
+        up_sql="CREATE TABLE a (id INTEGER);\n\nCREATE TABLE a (id INTEGER);",
+    )
+
+    migration = SQLiteProvider(config)
+    migration.create_table_migration()
+
+    with pytest.raises(sqlite3.OperationalError) as exc_info:
+        migration.migrate_up(revision)
+
+    assert exc_info.value.__notes__ == [
+        "In the statement on line 3 of the UP SQL of revision broken"
+    ]
+    assert migration.get_head_revision() is None
+
+
+def test_migrate_up_non_transactional(config):
+    up_sql = "CREATE TABLE IF NOT EXISTS a (id INTEGER);\n\nVACUUM;"
+    revision = Revision(
+        revision_id="vacuum",
+        down_revision_id=None,
+        message="Non transactional revision",
+        up_sql=f"{up_sql}\n\nSELECT * FROM b;",
+        transactional=False,
+    )
+
+    migration = SQLiteProvider(config)
+    migration.create_table_migration()
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table: b"):
+        migration.migrate_up(revision)
+
+    # the statements before the failed one stay applied, without a record
+    with sqlite3.connect(config.dsn.replace("sqlite:///", "")) as connection:
+        assert connection.execute("SELECT * FROM a").fetchall() == []
+    assert migration.get_head_revision() is None
+
+    # and are run again once the revision is fixed
+    assert migration.migrate_up(revision.model_copy(update={"up_sql": up_sql})) == 1
+    assert migration.get_head_revision().revision_id == "vacuum"
+
+
 def test_get_head_revision_empty_tags(config):
     """Test get_head_revision with empty/null tags."""
     migration = SQLiteProvider(config)
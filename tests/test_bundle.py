@@ -0,0 +1,92 @@
+import shutil
+
+import pytest
+
+from wandern.bundle import PREAMBLE, MigrationBundle, write_bundle
+from wandern.exceptions import InvalidMigrationFile
+from wandern.graph import MigrationGraph
+from wandern.models import Config
+
+
+@pytest.fixture
+def bundle_file(migration_dir, tmp_path):
+    output = tmp_path / "migrations.wdb"
+    write_bundle(migration_dir, output)
+    return output
+
+
+def test_bundle_graph_matches_directory(migration_dir, bundle_file):
+    from_dir = MigrationGraph.build(str(migration_dir))
+    from_bundle = MigrationGraph.from_bundle(bundle_file)
+
+    assert list(from_bundle.iter()) == list(from_dir.iter())
+    for revision in from_dir.iter():
+        assert from_bundle.load_revision(revision) == from_dir.load_revision(revision)
+
+
+def test_bundle_loaded_from_config(bundle_file):
+    config = Config(dsn="sqlite:///test.db", migration_dir=str(bundle_file))
+
+    graph = MigrationGraph.from_config(config)
+
+    last = graph.get_last_migration()
+    assert last and last.revision_id == "0005"
+    assert graph.load_revision(last).up_sql == ""
+
+
+def test_bundle_verify(migration_dir, bundle_file):
+    bundle = MigrationBundle(bundle_file)
+    assert bundle.verify() == []
+    assert bundle.verify(migration_dir) == []
+
+    (migration_dir / "0001_create_table.sql").write_text("changed")
+    (migration_dir / "0002_create_table_2.sql").unlink()
+    shutil.copy(
+        migration_dir / "0003_create_table_3.sql",
+        migration_dir / "0006_create_table_6.sql",
+    )
+
+    assert bundle.verify(migration_dir) == [
+        "0001_create_table.sql: differs from the bundle",
+        "0006_create_table_6.sql: missing from the bundle",
+        "0002_create_table_2.sql: missing from the migration directory",
+    ]
+    bundle.close()
+
+
+def test_bundle_verify_detects_corrupt_body(bundle_file):
+    data = bytearray(bundle_file.read_bytes())
+    data[-2] ^= 0xFF
+    bundle_file.write_bytes(data)
+
+    bundle = MigrationBundle(bundle_file)
+    problems = bundle.verify()
+    bundle.close()
+
+    assert problems == [f"{bundle.entries[-1].filename}: bundle content is corrupt"]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"not a bundle",
+        PREAMBLE.pack(b"WDBUNDLE", 99, 0),
+        PREAMBLE.pack(b"WDBUNDLE", 1, 7) + b"garbage",
+    ],
+)
+def test_invalid_bundle(tmp_path, content):
+    bundle_file = tmp_path / "invalid.wdb"
+    bundle_file.write_bytes(content)
+
+    with pytest.raises(InvalidMigrationFile, match="invalid.wdb"):
+        MigrationBundle(bundle_file)
+
+
+def test_bundle_rejects_invalid_migration_file(migration_dir, tmp_path):
+    (migration_dir / "0006_broken.sql").write_text("SELECT 1;")
+
+    with pytest.raises(InvalidMigrationFile, match="0006_broken.sql"):
+        write_bundle(migration_dir, tmp_path / "migrations.wdb")
+
+    assert not (tmp_path / "migrations.wdb").exists()
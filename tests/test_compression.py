@@ -0,0 +1,90 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from wandern.bundle import MigrationBundle, write_bundle
+from wandern.compression import is_migration_file, open_migration_file
+from wandern.exceptions import InvalidMigrationFile
+from wandern.graph import MigrationGraph
+
+COMPRESSORS = {".gz": gzip.compress, ".bz2": bz2.compress, ".xz": lzma.compress}
+
+
+def compress_migrations(migration_dir, suffix):
+    for file in sorted(migration_dir.iterdir()):
+        compressed = file.with_name(file.name + suffix)
+        compressed.write_bytes(COMPRESSORS[suffix](file.read_bytes()))
+        file.unlink()
+
+
+def test_is_migration_file():
+    assert is_migration_file("0001_create_table.sql")
+    assert is_migration_file("0001_create_table.sql.gz")
+    assert is_migration_file("0001_create_table.sql.bz2")
+    assert is_migration_file("0001_create_table.sql.xz")
+    assert not is_migration_file("0001_create_table.gz")
+    assert not is_migration_file("0001_create_table.sql.zip")
+
+
+@pytest.mark.parametrize("suffix", COMPRESSORS)
+def test_open_migration_file(tmp_path, suffix):
+    file = tmp_path / f"0001.sql{suffix}"
+    file.write_bytes(COMPRESSORS[suffix](b"SELECT 1;"))
+
+    with open_migration_file(file) as f:
+        assert f.read() == b"SELECT 1;"
+
+
+@pytest.mark.parametrize("suffix", COMPRESSORS)
+def test_compressed_graph_matches_directory(migration_dir, tmp_path, suffix):
+    plain = MigrationGraph.build(str(migration_dir))
+    expected = [plain.load_revision(revision) for revision in plain.iter()]
+    compress_migrations(migration_dir, suffix)
+    graph = MigrationGraph.build(str(migration_dir))
+
+    assert list(graph.iter()) == list(plain.iter())
+    loaded = [graph.load_revision(revision) for revision in graph.iter()]
+    assert all(revision.sql_file is None for revision in loaded)
+    assert loaded == expected
+
+
+@pytest.mark.parametrize("suffix", COMPRESSORS)
+def test_compressed_sql_is_streamed(migration_dir, suffix):
+    plain = MigrationGraph.build(str(migration_dir))
+    revision = plain.get_node("0001")
+    assert revision is not None
+    loaded = plain.load_revision(revision)
+
+    compress_migrations(migration_dir, suffix)
+    graph = MigrationGraph.build(str(migration_dir))
+    graph.stream_threshold = 1024 * 1024
+    streamed = graph.load_revision(revision)
+
+    assert streamed.sql_file is not None
+    assert streamed.sql_file.offsets.down_end == -1
+    assert [s.sql for s in streamed.sql_file.up_statements()] == [loaded.up_sql]
+    assert [s.sql for s in streamed.sql_file.down_statements()] == [loaded.down_sql]
+    assert streamed.checksum == loaded.checksum
+
+
+def test_corrupt_compressed_file(migration_dir):
+    (migration_dir / "0006_create_table_6.sql.gz").write_bytes(b"not gzip")
+
+    with pytest.raises(InvalidMigrationFile, match="0006_create_table_6.sql.gz"):
+        MigrationGraph.build(str(migration_dir))
+
+
+def test_bundle_of_compressed_files(migration_dir, tmp_path):
+    plain = MigrationGraph.build(str(migration_dir))
+    expected = [plain.load_revision(revision) for revision in plain.iter()]
+    compress_migrations(migration_dir, ".gz")
+    output = tmp_path / "migrations.wdb"
+    write_bundle(migration_dir, output)
+
+    bundle = MigrationBundle(output)
+    assert bundle.verify(migration_dir) == []
+
+    graph = MigrationGraph.from_bundle(output)
+    assert [graph.load_revision(revision) for revision in graph.iter()] == expected
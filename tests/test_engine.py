@@ -89,6 +89,41 @@ def test_generate_template_minimal():
     assert "-- DOWN" in result
 
 
+def test_generate_template_non_transactional():
+    """Test generate_template marks a non transactional revision."""
+    revision = Revision(
+        revision_id="index123",
+        down_revision_id=None,
+        message="concurrent index",
+        created_at=datetime(2024, 11, 19, 0, 55, 16),
+        transactional=False,
+    )
+
+    result = generate_template("migration.sql.j2", revision)
+
+    assert "Transactional: false" in result
+    assert "Transactional:" not in generate_template(
+        "migration.sql.j2", revision.model_copy(update={"transactional": True})
+    )
+
+
+def test_generate_template_timeouts():
+    """Test generate_template writes the timeouts of a revision back."""
+    revision = Revision(
+        revision_id="alter123",
+        down_revision_id=None,
+        message="alter a busy table",
+        created_at=datetime(2024, 11, 19, 0, 55, 16),
+        lock_timeout=0.5,
+        statement_timeout=30,
+    )
+
+    result = generate_template("migration.sql.j2", revision)
+
+    assert "Lock Timeout: 0.5s" in result
+    assert "Statement Timeout: 30.0s" in result
+
+
 def test_generate_template_with_none_down_revision():
     """Test generate_template when down_revision_id is None."""
     revision = Revision(
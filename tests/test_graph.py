@@ -1,44 +1,240 @@
-import networkx as nx
+from dataclasses import FrozenInstanceError
+from unittest.mock import patch
+
 import pytest
 
-from wandern.exceptions import CycleDetected, DivergentbranchError, InvalidMigrationFile
+from wandern.exceptions import (
+    CycleDetected,
+    DivergentbranchError,
+    GraphErrror,
+    GraphValidationError,
+    InvalidMigrationFile,
+    MultipleRootsError,
+    OrphanedRevision,
+)
 from wandern.graph import MigrationGraph
-from wandern.models import Revision
+from wandern.models import Config, ParseExecutor, Revision, RevisionRecord
 
 
-def test_divergent_branch():
-    dg = nx.DiGraph()
+def make_graph(*edges: tuple[str | None, str]) -> MigrationGraph:
+    return MigrationGraph(
+        Revision(revision_id=revision_id, down_revision_id=down, message=revision_id)
+        for down, revision_id in edges
+    )
 
-    dg.add_edge("a", "b")
-    dg.add_edge("b", "c")
-    dg.add_edge("c", "d")
-    dg.add_edge("c", "e")
 
-    migration_graph = MigrationGraph(dg)
-    with pytest.raises(DivergentbranchError):
-        migration_graph.get_last_migration()
+def test_divergent_branch():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"), ("c", "d"), ("c", "e"))
+
+    with pytest.raises(DivergentbranchError, match=r"from c to \(d, e\)"):
+        graph.get_last_migration()
 
 
 def test_loops_in_branch():
-    dg = nx.DiGraph()
+    graph = make_graph((None, "a"), ("d", "b"), ("b", "c"), ("c", "d"))
+
+    with pytest.raises(CycleDetected) as exc_info:
+        graph.check_cycles()
+
+    assert set(str(exc_info.value).splitlines()) == {"b -> c", "c -> d", "d -> b"}
 
-    dg.add_edge("a", "b")
-    dg.add_edge("b", "c")
-    dg.add_edge("c", "d")
-    dg.add_edge("d", "b")
 
-    with pytest.raises(CycleDetected):
-        MigrationGraph.check_cycles(dg)
+def test_self_loop():
+    graph = make_graph(("a", "a"))
+
+    with pytest.raises(CycleDetected, match="a -> a"):
+        graph.get_last_migration()
 
 
 def test_no_loops():
-    dg = nx.DiGraph()
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"), ("c", "d"))
+
+    assert not graph.check_cycles()
+
+
+def test_orphaned_revision():
+    graph = make_graph((None, "a"), ("a", "b"), ("x", "c"))
+
+    with pytest.raises(OrphanedRevision, match="Revision c revises x"):
+        graph.get_last_migration()
+
+
+def test_multiple_roots():
+    graph = make_graph((None, "a"), ("a", "b"), (None, "c"))
+
+    with pytest.raises(MultipleRootsError, match="a and c both revise nothing"):
+        graph.get_last_migration()
 
-    dg.add_edge("a", "b")
-    dg.add_edge("b", "c")
-    dg.add_edge("c", "d")
 
-    assert not MigrationGraph.check_cycles(dg)
+def test_validation_reports_all_problems():
+    graph = make_graph(
+        (None, "a"),
+        ("a", "b"),
+        ("a", "c"),
+        (None, "d"),
+        ("x", "e"),
+        ("g", "f"),
+        ("f", "g"),
+        ("h", "h"),
+    )
+
+    with pytest.raises(GraphValidationError) as exc_info:
+        graph.get_last_migration()
+
+    errors = exc_info.value.errors
+    assert [type(error) for error in errors] == [
+        MultipleRootsError,
+        OrphanedRevision,
+        DivergentbranchError,
+        CycleDetected,
+        CycleDetected,
+    ]
+    assert isinstance(exc_info.value, GraphErrror)
+    message = str(exc_info.value)
+    assert message.startswith("Found 5 problems in the migration graph")
+    assert "Divergent branch detected from a to (b, c)" in message
+    assert "h -> h" in message
+
+
+def test_validation_is_memoised_until_revisions_are_added():
+    graph = make_graph((None, "a"), ("a", "b"))
+
+    assert graph.validation_errors() == []
+    with patch.object(graph, "_find_cycles") as mock_find_cycles:
+        graph.get_last_migration()
+        graph.get_last_migration()
+        mock_find_cycles.assert_not_called()
+
+    graph.add(Revision(revision_id="c", down_revision_id="a", message="c"))
+    with pytest.raises(DivergentbranchError):
+        graph.get_last_migration()
+
+
+def test_remove_revision():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"))
+
+    removed = graph.remove("b")
+
+    assert removed.revision_id == "b"
+    assert len(graph) == 2
+    assert "b" not in graph
+    with pytest.raises(OrphanedRevision, match="Revision c revises b"):
+        graph.get_last_migration()
+
+    graph.add(Revision(revision_id="b", down_revision_id="a", message="b again"))
+    assert ids(graph.iter()) == ["a", "b", "c"]
+    assert graph.get_last_migration().revision_id == "c"
+
+
+def test_remove_updates_leaves_and_branches():
+    graph = make_graph((None, "a"), ("a", "b"), ("a", "c"))
+
+    graph.remove("c")
+    assert graph.get_last_migration().revision_id == "b"
+
+    graph.remove("b")
+    assert graph.get_last_migration().revision_id == "a"
+
+    with pytest.raises(ValueError, match="does not exist"):
+        graph.remove("b")
+
+
+def test_remove_orphan_and_squashed_revision():
+    graph = MigrationGraph(
+        [
+            Revision(
+                revision_id="s", down_revision_id=None, message="s", replaces=["a"]
+            ),
+            Revision(revision_id="o", down_revision_id="x", message="o"),
+        ]
+    )
+
+    graph.remove("o")
+    graph.remove("s")
+
+    assert len(graph) == 0
+    assert "a" not in graph
+    # the replaced ID is free again
+    graph.add(Revision(revision_id="a", down_revision_id=None, message="a"))
+    graph.add(Revision(revision_id="x", down_revision_id="a", message="x"))
+    assert ids(graph.iter()) == ["a", "x"]
+
+
+def test_version_changes_with_the_graph():
+    graph = make_graph((None, "a"))
+    version = graph.version
+
+    graph.add(Revision(revision_id="b", down_revision_id="a", message="b"))
+    assert graph.version > version
+
+    version = graph.version
+    graph.remove("b")
+    assert graph.version > version
+
+
+def test_validation_after_changes_only_walks_up_from_them():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"))
+    assert graph.validation_errors() == []
+
+    graph.remove("b")
+    graph.add(Revision(revision_id="b", down_revision_id="c", message="b"))
+    with patch.object(
+        graph, "_find_cycles", wraps=graph._find_cycles
+    ) as mock_find_cycles:
+        with pytest.raises(CycleDetected, match="c -> b"):
+            graph.validate()
+
+    # only from the re-added b, the removed one is skipped
+    mock_find_cycles.assert_called_once_with([3])
+
+    # the known cycle is checked again, and is gone once it is broken
+    graph.remove("b")
+    with pytest.raises(OrphanedRevision):
+        graph.validate()
+    graph.add(Revision(revision_id="b", down_revision_id="a", message="b"))
+    assert graph.validation_errors() == []
+
+
+def test_revisions_are_handed_out_as_stored():
+    revision = RevisionRecord(revision_id="a", down_revision_id=None, message="a")
+    graph = MigrationGraph([revision])
+
+    assert graph.get_node("a") is revision
+    assert next(graph.iter()) is revision
+    assert graph.get_last_migration() is revision
+    with pytest.raises(FrozenInstanceError):
+        revision.message = "changed"  # type: ignore[misc]
+
+
+def test_revisions_are_stored_as_records():
+    revision = Revision(revision_id="a", down_revision_id=None, message="a")
+    graph = MigrationGraph([revision])
+
+    node = graph.get_node("a")
+    assert node == RevisionRecord.from_revision(revision)
+    assert node and node.to_revision() == revision
+
+
+def test_revisions_added_out_of_order():
+    graph = make_graph(("c", "d"), ("a", "b"), (None, "a"), ("b", "c"))
+
+    assert graph.first == "a"
+    assert [rev.revision_id for rev in graph.iter()] == ["a", "b", "c", "d"]
+    last = graph.get_last_migration()
+    assert last and last.revision_id == "d"
+
+
+def test_duplicate_revision_id():
+    with pytest.raises(GraphErrror, match="Duplicate revision ID: a"):
+        make_graph((None, "a"), (None, "a"))
+
+
+def test_len_and_contains():
+    graph = make_graph((None, "a"), ("a", "b"))
+
+    assert len(graph) == 2
+    assert "a" in graph
+    assert "z" not in graph
 
 
 def test_migration_files():
@@ -58,7 +254,7 @@ def test_iter():
 
     revisions = list(graph.iter())
     assert len(revisions) > 0
-    assert all(isinstance(rev, Revision) for rev in revisions)
+    assert all(isinstance(rev, RevisionRecord) for rev in revisions)
 
     # Check that the revisions are in the expected order
     expected_ids = {"0001", "0002", "0003", "0004", "0005"}
@@ -97,7 +293,7 @@ def test_iter_from():
 
     revisions = list(graph.iter_from("0003"))
     assert len(revisions) > 0
-    assert all(isinstance(rev, Revision) for rev in revisions)
+    assert all(isinstance(rev, RevisionRecord) for rev in revisions)
 
     # Check that the revisions are in the expected order
     expected_ids = {"0004", "0005"}
@@ -115,6 +311,177 @@ def test_iter_from_invalid_revision():
         list(graph.iter_from("nonexistent"))
 
 
+def ids(revisions) -> list[str]:
+    return [rev.revision_id for rev in revisions]
+
+
+def test_iter_steps():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"), ("c", "d"))
+
+    assert ids(graph.iter(steps=2)) == ["a", "b"]
+    assert ids(graph.iter(steps=10)) == ["a", "b", "c", "d"]
+    assert ids(graph.iter_from("b", steps=1)) == ["c"]
+    assert ids(graph.iter_from("d", steps=1)) == []
+
+
+def test_position_follows_linear_order():
+    graph = make_graph(("c", "d"), (None, "a"), ("b", "c"), ("a", "b"))
+
+    assert [graph.position(rev_id) for rev_id in "abcd"] == [0, 1, 2, 3]
+    assert graph.position("missing") is None
+
+    graph.add(Revision(revision_id="e", down_revision_id="d", message="e"))
+    assert graph.position("e") == 4
+
+
+def test_iter_between():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"), ("c", "d"))
+
+    assert ids(graph.iter_between("a", "c")) == ["b", "c"]
+    assert ids(graph.iter_between(None, "b")) == ["a", "b"]
+    assert ids(graph.iter_between("c", "c")) == []
+
+    with pytest.raises(ValueError, match="Revision: a comes before c"):
+        graph.iter_between("c", "a")
+    with pytest.raises(ValueError, match="Revision: x does not exist"):
+        graph.iter_between("a", "x")
+
+
+def test_iter_down_from():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"), ("c", "d"))
+
+    assert ids(graph.iter_down_from("c")) == ["c", "b", "a"]
+    assert ids(graph.iter_down_from("d", steps=2)) == ["d", "c"]
+    assert ids(graph.iter_down_from("a", steps=5)) == ["a"]
+
+    with pytest.raises(ValueError, match="Revision: x does not exist"):
+        graph.iter_down_from("x")
+
+
+def test_iter_off_the_linear_order():
+    graph = make_graph((None, "a"), ("a", "b"), ("a", "c"), ("c", "d"))
+
+    assert graph.position("c") is None
+    assert ids(graph.iter_from("c")) == ["d"]
+    assert ids(graph.iter_down_from("d")) == ["d", "c", "a"]
+    assert ids(graph.iter_down_from("d", steps=1)) == ["d"]
+
+
+def test_is_ancestor():
+    graph = make_graph((None, "a"), ("a", "b"), ("a", "c"), ("c", "d"))
+
+    assert graph.is_ancestor("a", "d")
+    assert graph.is_ancestor("c", "d")
+    assert not graph.is_ancestor("b", "d")
+    assert not graph.is_ancestor("d", "a")
+    assert not graph.is_ancestor("a", "a")
+    assert not graph.is_ancestor("x", "a")
+
+
+def test_depths_are_memoised_until_the_graph_changes():
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"))
+
+    assert graph.is_ancestor("a", "c")
+    assert graph._depths == {0: 0, 1: 1, 2: 2}
+
+    graph.add(Revision(revision_id="d", down_revision_id="c", message="d"))
+    assert graph._depths == {}
+
+
+def test_is_ancestor_on_a_cycle():
+    graph = make_graph((None, "a"), ("c", "b"), ("b", "c"))
+
+    assert not graph.is_ancestor("b", "c")
+    with pytest.raises(ValueError, match="part of a cycle"):
+        graph.path(None, "c")
+
+
+def test_path():
+    graph = make_graph((None, "a"), ("a", "b"), ("a", "c"), ("c", "d"), ("d", "e"))
+
+    assert ids(graph.path(None, "b")) == ["a", "b"]
+    assert ids(graph.path("a", "e")) == ["c", "d", "e"]
+    assert ids(graph.path("d", "d")) == []
+
+    with pytest.raises(ValueError, match="Revision: e does not follow b"):
+        graph.path("b", "e")
+    with pytest.raises(ValueError, match="Revision: x does not exist"):
+        graph.path(None, "x")
+
+
+def test_path_down():
+    graph = make_graph((None, "a"), ("a", "b"), ("a", "c"), ("c", "d"), ("d", "e"))
+
+    assert ids(graph.path_down("e", "a")) == ["e", "d", "c"]
+    assert ids(graph.path_down("b", "a")) == ["b"]
+    assert ids(graph.path_down("e", "e")) == []
+
+    with pytest.raises(ValueError, match="Revision: b is not an ancestor of e"):
+        graph.path_down("e", "b")
+
+
+def test_path_through_squashed_revisions():
+    graph = MigrationGraph(
+        [
+            Revision(
+                revision_id="s", down_revision_id=None, message="s", replaces=["a", "b"]
+            ),
+            Revision(revision_id="c", down_revision_id="b", message="c"),
+        ]
+    )
+
+    assert ids(graph.path("b", "c")) == ["c"]
+    assert ids(graph.path_down("c", "b")) == ["c"]
+    assert graph.get_target("b").revision_id == "s"
+    with pytest.raises(ValueError, match="was squashed into s partway"):
+        graph.get_target("a")
+
+
+def test_squashed_revision_replaces_ids():
+    baseline = RevisionRecord(
+        revision_id="base",
+        down_revision_id=None,
+        message="base",
+        replaces=["a", "b", "c"],
+    )
+    graph = make_graph(("c", "d"), ("d", "e"))
+    graph.add(baseline)
+
+    assert graph.get_last_migration() == graph.get_node("e")
+    assert graph.get_node("b") is baseline
+    assert "c" in graph
+    assert ids(graph.iter()) == ["base", "d", "e"]
+    assert ids(graph.iter_from("c")) == ["d", "e"]
+    assert ids(graph.iter_down_from("c")) == ["base"]
+    assert graph.position("c") == graph.position("base") == 0
+
+    with pytest.raises(ValueError, match="b was squashed into base partway"):
+        graph.iter_from("b")
+    with pytest.raises(ValueError, match="a was squashed into base partway"):
+        graph.iter_down_from("a")
+
+
+def test_squashed_revision_with_original_file():
+    graph = make_graph((None, "a"))
+
+    with pytest.raises(GraphErrror, match="Duplicate revision ID: a"):
+        graph.add(
+            RevisionRecord(
+                revision_id="base", down_revision_id=None, message="", replaces=["a"]
+            )
+        )
+
+    graph = MigrationGraph(
+        [
+            RevisionRecord(
+                revision_id="base", down_revision_id=None, message="", replaces=["a"]
+            )
+        ]
+    )
+    with pytest.raises(GraphErrror, match="a was squashed into base"):
+        graph.add(Revision(revision_id="a", down_revision_id=None, message="a"))
+
+
 def test_get_node():
     """Test getting a specific node from the graph."""
     migration_dir = "tests/fixtures/migrations"
@@ -124,7 +491,7 @@ def test_get_node():
     revision = graph.get_node("0003")
     assert revision is not None
     assert revision.revision_id == "0003"
-    assert isinstance(revision, Revision)
+    assert isinstance(revision, RevisionRecord)
 
     # Test non-existent node
     revision = graph.get_node("nonexistent")
@@ -142,18 +509,14 @@ def test_first_property():
 
 def test_first_property_empty_graph():
     """Test first property with empty graph."""
-    empty_graph = nx.DiGraph()
-    migration_graph = MigrationGraph(empty_graph)
+    migration_graph = MigrationGraph()
 
     assert migration_graph.first is None
 
 
 def test_get_last_migration_single_node():
     """Test get_last_migration with a single node graph."""
-    dg = nx.DiGraph()
-    dg.add_node("single", revision_id="single", down_revision_id=None, message="test")
-
-    migration_graph = MigrationGraph(dg)
+    migration_graph = make_graph((None, "single"))
     last = migration_graph.get_last_migration()
 
     assert last is not None
@@ -162,8 +525,7 @@ def test_get_last_migration_single_node():
 
 def test_get_last_migration_empty_graph():
     """Test get_last_migration with empty graph."""
-    empty_graph = nx.DiGraph()
-    migration_graph = MigrationGraph(empty_graph)
+    migration_graph = MigrationGraph()
 
     last = migration_graph.get_last_migration()
     assert last is None
@@ -171,8 +533,7 @@ def test_get_last_migration_empty_graph():
 
 def test_iter_empty_graph():
     """Test iter with empty graph."""
-    empty_graph = nx.DiGraph()
-    migration_graph = MigrationGraph(empty_graph)
+    migration_graph = MigrationGraph()
 
     revisions = list(migration_graph.iter())
     assert revisions == []
@@ -180,20 +541,20 @@ def test_iter_empty_graph():
 
 def test_iter_single_node():
     """Test iter with single node graph."""
-    dg = nx.DiGraph()
-    dg.add_node(
-        "single",
-        revision_id="single",
-        down_revision_id=None,
-        message="test",
-        author=None,
-        tags=None,
-        up_sql="",
-        down_sql="",
-        created_at="2024-01-01T00:00:00",
+    migration_graph = MigrationGraph(
+        [
+            Revision(
+                revision_id="single",
+                down_revision_id=None,
+                message="test",
+                author=None,
+                tags=None,
+                up_sql="",
+                down_sql="",
+                created_at="2024-01-01T00:00:00",
+            )
+        ]
     )
-
-    migration_graph = MigrationGraph(dg)
     revisions = list(migration_graph.iter())
 
     assert len(revisions) == 1
@@ -202,21 +563,17 @@ def test_iter_single_node():
 
 def test_check_divergence_no_divergence():
     """Test check_divergence with valid linear graph."""
-    dg = nx.DiGraph()
-    dg.add_edge("a", "b")
-    dg.add_edge("b", "c")
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"))
 
     # Should not raise any exception
-    MigrationGraph.check_divergence(dg)
+    graph.check_divergence()
 
 
 def test_check_cycles_no_cycles():
     """Test check_cycles returns None when no cycles exist."""
-    dg = nx.DiGraph()
-    dg.add_edge("a", "b")
-    dg.add_edge("b", "c")
+    graph = make_graph((None, "a"), ("a", "b"), ("b", "c"))
 
-    result = MigrationGraph.check_cycles(dg)
+    result = graph.check_cycles()
     assert result is None
 
 
@@ -250,21 +607,79 @@ def test_build_with_directory_in_migration_dir(tmp_path):
 
 def test_build_with_invalid_sql_content(tmp_path):
     """Test MigrationGraph.build raises InvalidMigrationFile for unparseable SQL files."""
-    from unittest.mock import patch
-
     # Create a temporary directory with an invalid SQL file
     test_dir = tmp_path / "migrations"
     test_dir.mkdir()
 
-    # Create an SQL file that will cause parse_sql_file_content to raise ValueError
+    # Create an SQL file that will cause parse_sql_file_header to raise ValueError
     invalid_sql_file = test_dir / "invalid.sql"
     invalid_sql_file.write_text("/*Invalid SQL content*/")
 
-    # Mock parse_sql_file_content to raise ValueError
+    # Mock parse_sql_file_header to raise ValueError
     with patch(
-        "wandern.graph.parse_sql_file_content", side_effect=ValueError("Parse error")
+        "wandern.graph.parse_sql_file_header", side_effect=ValueError("Parse error")
     ):
         with pytest.raises(
             InvalidMigrationFile, match="Error parsing migration file: invalid.sql"
         ):
             MigrationGraph.build(str(test_dir))
+
+
+def write_chain(directory, count):
+    for i in range(1, count + 1):
+        revises = f"{i - 1:04d}" if i > 1 else "None"
+        (directory / f"{i:04d}_migration.sql").write_text(
+            "/*\n"
+            "Timestamp: 2024-11-19 00:55:16\n"
+            f"Revision ID: {i:04d}\n"
+            f"Revises: {revises}\n"
+            f"Message: migration {i}\n"
+            "*/\n\n"
+            f"-- UP\nCREATE TABLE t{i} (id INTEGER);\n\n"
+            f"-- DOWN\nDROP TABLE t{i};\n"
+        )
+
+
+@pytest.mark.parametrize("executor", list(ParseExecutor))
+@pytest.mark.parametrize("workers", [0, 4])
+def test_build_parallel_matches_serial(tmp_path, executor, workers):
+    """Test that a parallel build produces the same graph as a serial build."""
+    write_chain(tmp_path, 40)
+
+    serial = MigrationGraph.build(str(tmp_path))
+    parallel = MigrationGraph.build(str(tmp_path), workers=workers, executor=executor)
+
+    assert list(parallel.iter()) == list(serial.iter())
+    assert parallel.first == serial.first
+    assert parallel.get_last_migration() == serial.get_last_migration()
+    assert parallel._sources == serial._sources
+
+
+@pytest.mark.parametrize("executor", list(ParseExecutor))
+def test_build_parallel_reports_invalid_file(tmp_path, executor):
+    """Test that parse errors from pool workers name the offending file."""
+    write_chain(tmp_path, 10)
+    (tmp_path / "0005_migration.sql").write_text("/* not a migration */")
+
+    with pytest.raises(
+        InvalidMigrationFile, match="Error parsing migration file: 0005_migration.sql"
+    ):
+        MigrationGraph.build(str(tmp_path), workers=4, executor=executor)
+
+
+def test_from_config(tmp_path):
+    """Test that from_config passes the parse settings to build."""
+    config = Config(
+        dsn="sqlite:///test.db",
+        migration_dir=str(tmp_path),
+        index_file=None,
+        parse_workers=3,
+        parse_executor=ParseExecutor.PROCESS,
+    )
+
+    with patch.object(MigrationGraph, "build") as mock_build:
+        MigrationGraph.from_config(config)
+
+    mock_build.assert_called_once_with(
+        str(tmp_path), index_file=None, workers=3, executor=ParseExecutor.PROCESS
+    )
@@ -0,0 +1,263 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from wandern.exceptions import InvalidMigrationFile
+from wandern.graph import MigrationGraph
+from wandern.index import INDEX_VERSION, RevisionIndex, file_checksum
+from wandern.utils import parse_sql_file_header
+
+MIGRATION_CONTENT = """/*
+Timestamp: 2024-11-19 00:55:16
+Revision ID: {revision_id}
+Revises: {revises}
+Message: {message}
+*/
+
+-- UP
+CREATE TABLE {table} (id INTEGER);
+
+-- DOWN
+DROP TABLE {table};
+"""
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    return tmp_path / ".wd_index"
+
+
+def test_build_writes_index(migration_dir, index_file):
+    MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    assert index_file.exists()
+    index = RevisionIndex.load(index_file)
+    assert len(index.entries) == 5
+    for path, entry in index.entries.items():
+        assert entry.revision.up_sql is None
+        assert entry.revision.down_sql is None
+        assert entry.offsets.down_end == os.path.getsize(path)
+
+
+def test_build_uses_index(migration_dir, index_file):
+    MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    with patch("wandern.graph.parse_sql_file_header") as mock_parse:
+        graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    mock_parse.assert_not_called()
+    assert [rev.revision_id for rev in graph.iter()] == [
+        "0001",
+        "0002",
+        "0003",
+        "0004",
+        "0005",
+    ]
+
+
+def test_build_reparses_changed_files(migration_dir, index_file):
+    MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    changed = migration_dir / "0005_create_table_5.sql"
+    changed.write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0005", revises="0004", message="changed", table="t5"
+        )
+    )
+    added = migration_dir / "0006_create_table_6.sql"
+    added.write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0006", revises="0005", message="added", table="t6"
+        )
+    )
+
+    with patch(
+        "wandern.graph.parse_sql_file_header", wraps=parse_sql_file_header
+    ) as mock_parse:
+        graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    assert sorted(call.args[0].name for call in mock_parse.mock_calls) == [
+        "0005_create_table_5.sql",
+        "0006_create_table_6.sql",
+    ]
+    node = graph.get_node("0005")
+    assert node and node.message == "changed"
+    last = graph.get_last_migration()
+    assert last and last.revision_id == "0006"
+
+
+def test_build_reuses_touched_file_with_same_content(migration_dir, index_file):
+    MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    touched = migration_dir / "0003_create_table_3.sql"
+    stat = touched.stat()
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with patch("wandern.graph.parse_sql_file_header") as mock_parse:
+        MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    mock_parse.assert_not_called()
+    entry = RevisionIndex.load(index_file).entries[str(touched.resolve())]
+    assert entry.mtime_ns == stat.st_mtime_ns + 10**9
+
+
+def test_build_prunes_deleted_files(migration_dir, index_file):
+    MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    (migration_dir / "0005_create_table_5.sql").unlink()
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    assert graph.get_node("0005") is None
+    assert len(RevisionIndex.load(index_file).entries) == 4
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        "not json at all",
+        '{"version": 1, "entries": {"x": {"size": "big"}}}',
+        f'{{"version": {INDEX_VERSION + 1}, "entries": {{}}}}',
+    ],
+)
+def test_build_ignores_corrupt_or_stale_index(migration_dir, index_file, content):
+    index_file.write_text(content)
+
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    last = graph.get_last_migration()
+    assert last and last.revision_id == "0005"
+    assert len(RevisionIndex.load(index_file).entries) == 5
+
+
+def test_build_ignores_unwritable_index(migration_dir, tmp_path):
+    index_file = tmp_path / "missing_dir" / ".wd_index"
+
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    assert graph.get_node("0001") is not None
+    assert not index_file.exists()
+
+
+def test_load_revision_reads_sql_from_file(migration_dir, index_file):
+    (migration_dir / "0006_create_table_6.sql").write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0006", revises="0005", message="added", table="t6"
+        )
+    )
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+
+    node = graph.get_node("0006")
+    assert node is not None
+    assert node.up_sql is None
+
+    revision = graph.load_revision(node)
+    assert revision.up_sql == "CREATE TABLE t6 (id INTEGER);"
+    assert revision.down_sql == "DROP TABLE t6;"
+
+
+def test_load_revision_rejects_file_changed_after_build(migration_dir, index_file):
+    changed = migration_dir / "0006_create_table_6.sql"
+    changed.write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0006", revises="0005", message="added", table="t6"
+        )
+    )
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    changed.write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0006", revises="0005", message="added", table="t6_renamed"
+        )
+    )
+
+    node = graph.get_node("0006")
+    assert node is not None
+    with pytest.raises(InvalidMigrationFile, match="0006_create_table_6.sql"):
+        graph.load_revision(node)
+
+
+def test_sql_checksums_are_cached_in_the_index(migration_dir, index_file):
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    node = graph.get_node("0002")
+    assert node is not None
+
+    checksum = graph.checksum(node)
+    assert graph.load_revision(node).checksum == checksum
+    graph.save_index()
+
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    with patch("wandern.graph.read_sql_section") as mock_read:
+        assert graph.checksum(node) == checksum
+    mock_read.assert_not_called()
+
+    # a changed file is read again
+    changed = migration_dir / "0002_create_table_2.sql"
+    changed.write_text(changed.read_text().replace("-- DOWN", "SELECT 1;\n-- DOWN"))
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    assert graph.checksum(node) != checksum
+
+
+def test_statements_are_cached_in_the_index(migration_dir, index_file):
+    (migration_dir / "0006_create_table_6.sql").write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0006", revises="0005", message="added", table="t6"
+        )
+    )
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    node = graph.get_node("0006")
+    assert node is not None
+
+    loaded = graph.load_revision(node, dialect="sqlite")
+    assert loaded.statements is not None
+    assert loaded.statements.up == [("CREATE TABLE t6 (id INTEGER);", 1)]
+    assert loaded.statements.down == [("DROP TABLE t6;", 1)]
+    graph.save_index()
+
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    with patch("wandern.graph.statement_spans") as mock_split:
+        cached = graph.load_revision(node, dialect="sqlite")
+    mock_split.assert_not_called()
+    assert cached.statements == loaded.statements
+
+    # another dialect is split on its own
+    assert graph.load_revision(node, dialect="mysql").statements is not None
+
+
+def test_load_revision_streams_large_sql(migration_dir, index_file):
+    (migration_dir / "0006_create_table_6.sql").write_text(
+        MIGRATION_CONTENT.format(
+            revision_id="0006", revises="0005", message="added", table="t6"
+        )
+    )
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    node = graph.get_node("0006")
+    assert node is not None
+    loaded = graph.load_revision(node)
+
+    graph = MigrationGraph.build(str(migration_dir), index_file=index_file)
+    graph.stream_threshold = 10
+    streamed = graph.load_revision(node)
+
+    assert streamed.up_sql is None
+    assert streamed.down_sql is None
+    assert streamed.sql_file is not None
+    assert [s.sql for s in streamed.sql_file.up_statements()] == [loaded.up_sql]
+    assert [s.sql for s in streamed.sql_file.down_statements()] == [loaded.down_sql]
+    assert streamed.checksum == loaded.checksum
+
+    loaded = graph.load_revision(node, stream=False)
+    assert loaded.sql_file is None
+    assert loaded.up_sql is not None
+
+
+def test_file_checksum(tmp_path):
+    first = tmp_path / "first.sql"
+    second = tmp_path / "second.sql"
+    first.write_text("SELECT 1;")
+    second.write_text("SELECT 1;")
+
+    assert file_checksum(first) == file_checksum(second)
+
+    second.write_text("SELECT 2;")
+    assert file_checksum(first) != file_checksum(second)
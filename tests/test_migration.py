@@ -1,9 +1,10 @@
 from datetime import datetime, timezone
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 
 from wandern.exceptions import ConnectError
+from wandern.graph import MigrationGraph
 from wandern.migration import MigrationService
 from wandern.models import Config, Revision
 
@@ -36,7 +37,7 @@ def sample_revision():
 
 def test_migration_service_init(mock_config):
     """Test MigrationService initialization with full mocking."""
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_graph = Mock()
 
     with (
@@ -53,7 +54,12 @@ def test_migration_service_init(mock_config):
         assert service.database == mock_database
         assert service.graph == mock_graph
         mock_get_db.assert_called_once_with(mock_config.dialect, config=mock_config)
-        mock_graph_build.assert_called_once_with(mock_config.migration_dir)
+        mock_graph_build.assert_called_once_with(
+            mock_config.migration_dir,
+            index_file=mock_config.index_file,
+            workers=mock_config.parse_workers,
+            executor=mock_config.parse_executor,
+        )
 
 
 def test_migration_service_init_raises_on_invalid_dsn():
@@ -70,12 +76,13 @@ def test_migration_service_init_raises_on_invalid_dsn():
 
 def test_upgrade_first_migration(mock_config, sample_revision):
     """Test upgrade when no migrations have been applied yet."""
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.create_table_migration = Mock()
     mock_database.get_head_revision = Mock(return_value=None)
     mock_database.migrate_up = Mock()
 
     mock_graph = Mock()
+    mock_graph.load_revision.side_effect = lambda revision, **kwargs: revision
     mock_graph.iter = Mock(return_value=[sample_revision])
 
     with (
@@ -86,6 +93,7 @@ def test_upgrade_first_migration(mock_config, sample_revision):
         service = MigrationService(mock_config)
         service.upgrade()
 
+        mock_database.session.assert_called_once()
         mock_database.create_table_migration.assert_called_once()
         mock_database.get_head_revision.assert_called_once()
         mock_graph.iter.assert_called_once()
@@ -101,12 +109,13 @@ def test_upgrade_with_existing_head(mock_config, sample_revision):
         created_at=datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
     )
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.create_table_migration = Mock()
     mock_database.get_head_revision = Mock(return_value=head_revision)
     mock_database.migrate_up = Mock()
 
     mock_graph = Mock()
+    mock_graph.load_revision.side_effect = lambda revision, **kwargs: revision
     mock_graph.iter_from = Mock(return_value=[sample_revision])
 
     with (
@@ -117,7 +126,7 @@ def test_upgrade_with_existing_head(mock_config, sample_revision):
         service = MigrationService(mock_config)
         service.upgrade()
 
-        mock_graph.iter_from.assert_called_once_with("head123")
+        mock_graph.iter_from.assert_called_once_with("head123", steps=None)
         mock_database.migrate_up.assert_called_once_with(sample_revision)
 
 
@@ -144,13 +153,14 @@ def test_upgrade_with_steps(mock_config):
         ),
     ]
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.create_table_migration = Mock()
     mock_database.get_head_revision = Mock(return_value=None)
     mock_database.migrate_up = Mock()
 
     mock_graph = Mock()
-    mock_graph.iter = Mock(return_value=revisions)
+    mock_graph.load_revision.side_effect = lambda revision, **kwargs: revision
+    mock_graph.iter = Mock(side_effect=lambda steps=None: iter(revisions[:steps]))
 
     with (
         patch("wandern.migration.get_database_impl", return_value=mock_database),
@@ -160,6 +170,7 @@ def test_upgrade_with_steps(mock_config):
         service = MigrationService(mock_config)
         service.upgrade(steps=2)
 
+        mock_graph.iter.assert_called_once_with(steps=2)
         assert mock_database.migrate_up.call_count == 2
         mock_database.migrate_up.assert_any_call(revisions[0])
         mock_database.migrate_up.assert_any_call(revisions[1])
@@ -188,7 +199,7 @@ def test_validate_sequential_path_valid(mock_config):
         ),
     ]
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_graph = Mock()
 
     with (
@@ -217,7 +228,7 @@ def test_validate_sequential_path_invalid(mock_config):
         )
     ]
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_graph = Mock()
 
     with (
@@ -238,12 +249,14 @@ def test_downgrade(mock_config):
         created_at=datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
     )
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.get_head_revision = Mock(return_value=head_revision)
     mock_database.migrate_down = Mock()
 
     mock_graph = Mock()
+    mock_graph.load_revision.side_effect = lambda revision, **kwargs: revision
     mock_graph.get_node = Mock(return_value=head_revision)
+    mock_graph.iter_down_from = Mock(return_value=iter([head_revision]))
 
     with (
         patch("wandern.migration.get_database_impl", return_value=mock_database),
@@ -253,12 +266,13 @@ def test_downgrade(mock_config):
         service = MigrationService(mock_config)
         service.downgrade()
 
+        mock_graph.iter_down_from.assert_called_once_with("current", steps=None)
         mock_database.migrate_down.assert_called_once_with(head_revision)
 
 
 def test_downgrade_no_head(mock_config):
     """Test downgrade when no head revision exists."""
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.get_head_revision = Mock(return_value=None)
     mock_database.migrate_down = Mock()
 
@@ -277,7 +291,7 @@ def test_downgrade_no_head(mock_config):
 
 def test_save_migration(mock_config, sample_revision):
     """Test saving migration to file."""
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_graph = Mock()
 
     with (
@@ -303,7 +317,7 @@ def test_save_migration(mock_config, sample_revision):
 
 def test_filter_migrations(mock_config, sample_revision):
     """Test filtering migrations."""
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.list_migrations = Mock(return_value=[sample_revision])
     mock_graph = Mock()
 
@@ -335,7 +349,7 @@ def test_get_combined_migrations(mock_config):
         created_at=datetime(2024, 1, 2, 12, 0, 0, tzinfo=timezone.utc),
     )
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.list_migrations = Mock(return_value=[db_revision])
 
     mock_graph = Mock()
@@ -377,7 +391,7 @@ def test_validate_sequential_path_missing_dependency(mock_config):
         ),
     ]
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_graph = Mock()
 
     with (
@@ -398,7 +412,7 @@ def test_downgrade_migration_file_not_found(mock_config):
         created_at=datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
     )
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.get_head_revision = Mock(return_value=head_revision)
 
     mock_graph = Mock()
@@ -469,7 +483,7 @@ def test_get_combined_migrations_with_filters(mock_config):
         created_at=old_date,  # Older than filter
     )
 
-    mock_database = Mock()
+    mock_database = MagicMock()
     mock_database.list_migrations = Mock(return_value=[db_revision])
 
     mock_graph = Mock()
@@ -509,3 +523,47 @@ def test_get_combined_migrations_with_filters(mock_config):
         assert (
             len(local_revisions) == 3
         )  # Should include only revisions >= new_date (local_rev1, local_rev2, local_rev4)
+
+
+def test_upgrade_with_author_and_steps_validates_filtered_revisions(mock_config):
+    """All the filtered revisions need to form a chain, not only those applied."""
+    created_at = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    graph = MigrationGraph(
+        [
+            Revision(
+                revision_id="rev1",
+                down_revision_id=None,
+                message="1",
+                author="alice",
+                created_at=created_at,
+            ),
+            Revision(
+                revision_id="rev2",
+                down_revision_id="rev1",
+                message="2",
+                author="bob",
+                created_at=created_at,
+            ),
+            Revision(
+                revision_id="rev3",
+                down_revision_id="rev2",
+                message="3",
+                author="alice",
+                created_at=created_at,
+            ),
+        ]
+    )
+
+    mock_database = MagicMock()
+    mock_database.get_head_revision = Mock(return_value=None)
+
+    with (
+        patch("wandern.migration.get_database_impl", return_value=mock_database),
+        patch("wandern.migration.MigrationGraph.build", return_value=graph),
+        patch("wandern.migration.rich.print"),
+    ):
+        service = MigrationService(mock_config)
+        with pytest.raises(ValueError, match="between 'rev1' and 'rev3'"):
+            service.upgrade(steps=1, author="alice")
+
+        mock_database.migrate_up.assert_not_called()
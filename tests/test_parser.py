@@ -0,0 +1,200 @@
+import io
+import random
+import time
+
+import pytest
+
+from wandern.constants import REGEX_MIGRATION_PARSER
+from wandern.parser import parse_migration
+
+HEADER = """/*Autogenerated by Wandern, please add your migration SQL here.
+
+Timestamp: 2024-11-19 00:55:16
+
+Revision ID: abc123
+Revises: def456
+Message: test migration
+Tags: tag1, tag2
+Author: John Doe
+*/
+"""
+
+SQL_FRAGMENTS = [
+    "CREATE TABLE t (id INTEGER);",
+    "INSERT INTO t VALUES (1), (2), (3);",
+    "-- a regular comment",
+    "/* block comment */",
+    "SELECT '*/' AS tricky;",
+    "SELECT '-- UP' AS not_a_marker;",
+    "UPDATE t SET id = id + 1 WHERE id > 0;",
+    "",
+    "    ",
+]
+
+
+def parse(content: str, with_sql: bool = True):
+    return parse_migration(io.BytesIO(content.encode("utf-8")), with_sql=with_sql)
+
+
+def legacy_sections(content: str) -> tuple[str, str]:
+    match = REGEX_MIGRATION_PARSER.search(content)
+    assert match is not None
+    return match.group("up_sql").strip(), match.group("down_sql").strip()
+
+
+def random_body(rng: random.Random) -> str:
+    return "\n".join(rng.choice(SQL_FRAGMENTS) for _ in range(rng.randint(0, 12)))
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_parse_matches_legacy_regex(seed):
+    """Randomly generated valid migrations parse like the legacy regex did."""
+    rng = random.Random(seed)
+    content = (
+        HEADER
+        + "\n" * rng.randint(0, 3)
+        + rng.choice(["-- UP", "--UP", "  -- UP  "])
+        + "\n"
+        + random_body(rng)
+        + "\n"
+        + rng.choice(["-- DOWN", "--DOWN", "  -- DOWN  "])
+        + "\n"
+        + random_body(rng)
+        + "\n" * rng.randint(0, 2)
+    )
+
+    revision, offsets = parse(content)
+    up_sql, down_sql = legacy_sections(content)
+
+    assert revision.revision_id == "abc123"
+    assert revision.down_revision_id == "def456"
+    assert revision.tags == ["tag1", " tag2"]
+    assert revision.author == "John Doe"
+    assert revision.up_sql == up_sql
+    assert revision.down_sql == down_sql
+
+    data = content.encode("utf-8")
+    assert data[offsets.up_start : offsets.up_end].decode().strip() == up_sql
+    assert data[offsets.down_start : offsets.down_end].decode().strip() == down_sql
+
+    header_revision, header_offsets = parse(content, with_sql=False)
+    assert header_offsets == offsets
+    assert header_revision.up_sql is None
+    assert header_revision == revision.model_copy(
+        update={"up_sql": None, "down_sql": None}
+    )
+
+
+def test_parse_crlf_line_endings():
+    content = (HEADER + "\n-- UP\nSELECT 1;\nSELECT 2;\n-- DOWN\nSELECT 3;\n").replace(
+        "\n", "\r\n"
+    )
+
+    revision, _ = parse(content)
+
+    assert revision.message == "test migration"
+    assert revision.up_sql == "SELECT 1;\nSELECT 2;"
+    assert revision.down_sql == "SELECT 3;"
+
+
+def test_parse_marker_on_comment_closing_line():
+    content = HEADER.rstrip("\n") + " -- UP\nSELECT 1;\n-- DOWN\nSELECT 2;"
+
+    revision, _ = parse(content)
+
+    assert revision.up_sql == "SELECT 1;"
+    assert revision.down_sql == "SELECT 2;"
+
+
+def test_parse_first_down_marker_ends_up_section():
+    content = HEADER + "-- UP\nSELECT 1;\n-- DOWN\nSELECT 2;\n-- DOWN\nSELECT 3;\n"
+
+    revision, _ = parse(content)
+
+    assert revision.up_sql == "SELECT 1;"
+    assert revision.down_sql == "SELECT 2;\n-- DOWN\nSELECT 3;"
+
+
+def test_parse_fields_do_not_span_lines():
+    content = HEADER.replace("Message: test migration", "Message:") + (
+        "-- UP\n-- DOWN\n"
+    )
+
+    revision, _ = parse(content)
+
+    assert revision.message == ""
+
+
+# Adversarial inputs for the legacy DOTALL regex, which backtracks over the
+# whole file for each of them. The parser must handle them in linear time.
+ADVERSARIAL_INPUTS = {
+    "many_comment_ends": "/*" + "*/ x\n" * 200_000,
+    "many_comment_ends_one_line": "/*" + "*/ x " * 200_000,
+    "many_comment_starts": "/* " * 200_000,
+    "many_comment_pairs": "/* */ x\n" * 200_000,
+    "many_up_markers": "/* */\n-- UP\n" * 200_000,
+    "missing_down_marker": HEADER + "-- UP\n" + "SELECT 1; -- DOWN x\n" * 200_000,
+    "missing_up_marker": HEADER + "SELECT 1;\n" * 200_000,
+    "unterminated_comment": "/*\n" + "Revision ID: abc\n" * 200_000,
+}
+
+
+@pytest.mark.parametrize("name", ADVERSARIAL_INPUTS)
+def test_parse_adversarial_inputs_fail_fast(name):
+    content = ADVERSARIAL_INPUTS[name]
+
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="Invalid migration file format"):
+        parse(content)
+    elapsed = time.perf_counter() - start
+
+    # a few megabytes, linear scanning takes well under a second
+    assert elapsed < 5
+
+
+def test_parse_large_valid_file():
+    body = "INSERT INTO t VALUES (1); /* */ -- DOWN later\n" * 200_000
+    content = HEADER + "-- UP\n" + body + "-- DOWN\nDELETE FROM t;\n"
+
+    revision, offsets = parse(content, with_sql=False)
+
+    assert revision.revision_id == "abc123"
+    assert offsets.up_end - offsets.up_start == len(body)
+
+
+def test_parse_transactional_header():
+    content = HEADER.replace("Author:", "Transactional: false\nAuthor:") + (
+        "-- UP\n-- DOWN\n"
+    )
+
+    revision, _ = parse(content)
+
+    assert revision.transactional is False
+    assert parse(HEADER + "-- UP\n-- DOWN\n")[0].transactional is True
+    with pytest.raises(ValueError, match="Transactional field"):
+        parse(content.replace("false", "sometimes"))
+
+
+def test_parse_timeout_headers():
+    content = HEADER.replace(
+        "Author:", "Lock Timeout: 500ms\nStatement Timeout: 2min\nAuthor:"
+    ) + ("-- UP\n-- DOWN\n")
+
+    revision, _ = parse(content)
+
+    assert revision.lock_timeout == 0.5
+    assert revision.statement_timeout == 120
+    assert parse(HEADER + "-- UP\n-- DOWN\n")[0].lock_timeout is None
+    with pytest.raises(ValueError, match="Invalid duration: 5 hours"):
+        parse(content.replace("500ms", "5 hours"))
+
+
+def test_parse_replaces_header():
+    content = HEADER.replace("Author:", "Replaces: a1, b2 ,c3\nAuthor:") + (
+        "-- UP\n-- DOWN\n"
+    )
+
+    revision, _ = parse(content)
+
+    assert revision.replaces == ["a1", "b2", "c3"]
+    assert parse(HEADER + "-- UP\n-- DOWN\n")[0].replaces is None
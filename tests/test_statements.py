@@ -0,0 +1,173 @@
+import tracemalloc
+
+import pytest
+
+from wandern.statements import (
+    Statement,
+    execute_statements,
+    read_chunks,
+    read_statements,
+    spans_to_statements,
+    split_statements,
+    statement_spans,
+)
+
+SQL = """-- create the table
+CREATE TABLE t (id INT, s TEXT); /* a comment; with a semicolon */
+INSERT INTO t VALUES (1, 'a;b''c;');
+CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;
+SELECT "odd;name" FROM t -- trailing; comment
+;
+-- nothing but a comment;
+"""
+
+STATEMENTS = [
+    "-- create the table\nCREATE TABLE t (id INT, s TEXT);",
+    "/* a comment; with a semicolon */\nINSERT INTO t VALUES (1, 'a;b''c;');",
+    "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;",
+    'SELECT "odd;name" FROM t -- trailing; comment\n;',
+]
+
+
+def chunked(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1000])
+def test_split_statements(size):
+    statements = list(split_statements(chunked(SQL, size)))
+    assert [statement.sql for statement in statements] == STATEMENTS
+    assert [statement.line for statement in statements] == [2, 3, 4, 5]
+
+
+def test_split_statements_without_trailing_semicolon():
+    assert list(split_statements(["SELECT 1; SELECT 2"])) == [
+        Statement("SELECT 1;", 1),
+        Statement("SELECT 2", 1),
+    ]
+
+
+def test_split_statements_empty():
+    assert list(split_statements([])) == []
+    assert list(split_statements(["", "  \n", "-- only a comment"])) == []
+    assert list(split_statements([";;"])) == []
+
+
+def test_read_chunks_decodes_across_chunks(tmp_path):
+    file = tmp_path / "0001.sql"
+    file.write_text("xx -- UP\nSELECT 'äöü€';\n", encoding="utf-8")
+    end = file.stat().st_size
+
+    assert "".join(read_chunks(file, 3, end, chunk_size=1)) == "-- UP\nSELECT 'äöü€';\n"
+
+
+def test_read_statements_memory_is_bounded_by_statement_size(tmp_path):
+    file = tmp_path / "0001.sql"
+    row = "x" * 1000
+    with open(file, "w") as f:
+        for i in range(20_000):
+            f.write(f"INSERT INTO t VALUES ({i}, '{row}');\n")
+    size = file.stat().st_size
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in read_statements(file, 0, size))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 20_000
+    # a 20 MB file, read a megabyte at a time
+    assert peak < size / 4
+
+
+SQLITE_SQL = """CREATE TABLE t (id INT, note TEXT, [odd;name] INT, `other;name` INT);
+CREATE TRIGGER t_note AFTER INSERT ON t
+BEGIN
+    UPDATE t SET note = CASE WHEN NEW.id > 1 THEN 'a;b' ELSE 'c' END;
+    UPDATE t SET id = id;
+END;
+BEGIN TRANSACTION;
+INSERT INTO t (id) VALUES (1);
+"""
+
+MYSQL_SQL = r"""# a hash comment; with a semicolon
+INSERT INTO t VALUES ('it\'s;', "a \"b;\"");
+/*!40101 SET NAMES utf8 */;
+DELIMITER //
+CREATE PROCEDURE p()
+BEGIN
+    IF 1 THEN SELECT 1; END IF;
+END//
+DELIMITER ;
+CREATE TRIGGER t_bi BEFORE INSERT ON t FOR EACH ROW
+BEGIN
+    IF NEW.id < 0 THEN SET NEW.id = 0; END IF;
+    CASE WHEN NEW.id = 1 THEN SET NEW.id = 2; ELSE BEGIN END; END CASE;
+END;
+SELECT 1;
+"""
+
+
+@pytest.mark.parametrize("size", [1, 5, 64, 1000])
+def test_split_statements_sqlite(size):
+    assert list(split_statements(chunked(SQLITE_SQL, size), "sqlite")) == [
+        Statement(
+            "CREATE TABLE t (id INT, note TEXT, [odd;name] INT, `other;name` INT);", 1
+        ),
+        Statement(SQLITE_SQL.split("\n", 1)[1].split("\nBEGIN TRANSACTION")[0], 2),
+        Statement("BEGIN TRANSACTION;", 7),
+        Statement("INSERT INTO t (id) VALUES (1);", 8),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 5, 64, 1000])
+def test_split_statements_mysql(size):
+    statements = list(split_statements(chunked(MYSQL_SQL, size), "mysql"))
+
+    assert [statement.line for statement in statements] == [2, 3, 5, 10, 15]
+    assert statements[0].sql.endswith("""VALUES ('it\\'s;', "a \\"b;\\"");""")
+    assert statements[1].sql == "/*!40101 SET NAMES utf8 */;"
+    # custom delimiters are not sent to the server
+    assert statements[2].sql.startswith("CREATE PROCEDURE p()")
+    assert statements[2].sql.endswith("END IF;\nEND")
+    assert statements[3].sql.startswith("CREATE TRIGGER t_bi")
+    assert statements[3].sql.endswith("END CASE;\nEND;")
+    assert statements[4].sql == "SELECT 1;"
+
+
+def test_split_statements_postgresql():
+    sql = r"SELECT E'it\'s;'; SELECT 'a\'; SELECT $$;$$;"
+
+    assert [s.sql for s in split_statements([sql], "postgresql")] == [
+        r"SELECT E'it\'s;';",
+        r"SELECT 'a\';",
+        "SELECT $$;$$;",
+    ]
+
+
+def test_statement_spans():
+    sql = "-- first\nSELECT 1;\n\n  SELECT\n  2;"
+
+    spans = statement_spans(sql, "sqlite")
+
+    assert spans == [(0, 18, 2), (22, 33, 4)]
+    assert spans_to_statements(sql, spans) == list(split_statements([sql], "sqlite"))
+
+
+def test_execute_statements_adds_the_statement_line():
+    executed = []
+
+    def execute(sql):
+        if "fail" in sql:
+            raise RuntimeError("boom")
+        executed.append(sql)
+
+    statements = split_statements(["SELECT 1;\nSELECT\nfail;\nSELECT 3;"])
+    with pytest.raises(RuntimeError) as exc_info:
+        execute_statements(execute, statements, "the UP SQL of revision 0001")
+
+    assert executed == ["SELECT 1;"]
+    assert exc_info.value.__notes__ == [
+        "In the statement on line 2 of the UP SQL of revision 0001"
+    ]
@@ -10,14 +10,18 @@ import typer
 from wandern.constants import DEFAULT_FILE_FORMAT
 from wandern.models import Config
 from wandern.utils import (
+    SqlChecksum,
     create_migration,
     exception_handler,
     generate_migration_filename,
     generate_revision_id,
     load_config,
     parse_sql_file_content,
+    parse_sql_file_header,
+    read_sql_section,
     save_config,
     slugify,
+    sql_checksum,
 )
 
 
@@ -317,6 +321,126 @@ def test_parse_sql_file_content_missing_fields():
             os.unlink(f.name)
 
 
+def test_parse_sql_file_header(tmp_path):
+    """Test header-only parsing records the offsets of the SQL sections."""
+    content = """/*
+    Timestamp: 2024-11-19 00:55:16
+    Revision ID: abc123
+    Revises: def456
+    Message: test migration
+    Author: John Doe
+    Tags: tag1, tag2
+    */
+
+    -- UP
+    CREATE TABLE test (id INTEGER);
+    -- Add your UP migration SQL here
+
+    -- DOWN
+    DROP TABLE test;
+    """
+    file_path = tmp_path / "migration.sql"
+    file_path.write_text(content, encoding="utf-8")
+
+    revision, offsets = parse_sql_file_header(file_path)
+    full_revision = parse_sql_file_content(file_path)
+
+    assert revision.up_sql is None
+    assert revision.down_sql is None
+    assert revision == full_revision.model_copy(
+        update={"up_sql": None, "down_sql": None}
+    )
+    assert offsets.down_end == len(content.encode("utf-8"))
+    assert (
+        read_sql_section(file_path, offsets.up_start, offsets.up_end)
+        == full_revision.up_sql
+    )
+    assert (
+        read_sql_section(file_path, offsets.down_start, offsets.down_end)
+        == full_revision.down_sql
+    )
+
+
+def test_parse_sql_file_header_multibyte_offsets(tmp_path):
+    """Test offsets are byte offsets, not character offsets."""
+    content = (
+        "/*\nTimestamp: 2024-11-19 00:55:16\nRevision ID: abc123\n"
+        "Revises: None\nMessage: grüße ✓\n*/\n"
+        "-- UP\nINSERT INTO t VALUES ('ünïcödé');\n"
+        "-- DOWN\nDELETE FROM t WHERE v = 'ünïcödé';\n"
+    )
+    file_path = tmp_path / "migration.sql"
+    file_path.write_text(content, encoding="utf-8")
+
+    revision, offsets = parse_sql_file_header(file_path)
+
+    assert revision.message == "grüße ✓"
+    assert (
+        read_sql_section(file_path, offsets.up_start, offsets.up_end)
+        == "INSERT INTO t VALUES ('ünïcödé');"
+    )
+    assert (
+        read_sql_section(file_path, offsets.down_start, offsets.down_end)
+        == "DELETE FROM t WHERE v = 'ünïcödé';"
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "Invalid content without proper format",
+        "/* Timestamp: 2024-11-19 00:55:16 unterminated comment\n-- UP\n-- DOWN\n",
+        "/*\nRevision ID: abc\n*/\nSELECT 1;\n-- UP\n-- DOWN\n",
+        "/*\nRevision ID: abc\n*/\n-- UP\nSELECT 1;\n",
+    ],
+)
+def test_parse_sql_file_header_invalid(tmp_path, content):
+    """Test header-only parsing rejects files without comment block or markers."""
+    file_path = tmp_path / "migration.sql"
+    file_path.write_text(content, encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Invalid migration file format"):
+        parse_sql_file_header(file_path)
+
+
+def test_parse_sql_file_header_missing_fields(tmp_path):
+    """Test header-only parsing validates the required fields."""
+    file_path = tmp_path / "migration.sql"
+    file_path.write_text(
+        "/*\nRevision ID: abc123\nRevises: none\nMessage: test\n*/\n-- UP\n-- DOWN\n",
+        encoding="utf-8",
+    )
+
+    with pytest.raises(ValueError, match="Timestamp field is required"):
+        parse_sql_file_header(file_path)
+
+
+def test_sql_checksum():
+    checksum = sql_checksum("CREATE TABLE t (id INT);", "DROP TABLE t;")
+
+    assert len(checksum) == 32
+    assert checksum == sql_checksum(
+        "\n  CREATE TABLE t (id INT);   \r\n", "DROP TABLE t;\r\n"
+    )
+    assert checksum != sql_checksum("CREATE TABLE t (id INT);", "")
+    assert checksum != sql_checksum("DROP TABLE t;", "CREATE TABLE t (id INT);")
+    assert sql_checksum(None, None) == sql_checksum("", "")
+
+
+def test_sql_checksum_in_chunks():
+    up_sql = "\r\n  CREATE TABLE t (id INT);  \r\n\r\nINSERT INTO t VALUES (1);\r\n\n"
+    down_sql = "DROP TABLE t;\n"
+
+    for size in (1, 2, 5):
+        checksum = SqlChecksum()
+        for sql in (up_sql, down_sql):
+            for i in range(0, len(sql), size):
+                checksum.update(sql[i : i + size])
+            checksum.end_section()
+
+        assert checksum.hexdigest() == sql_checksum(up_sql, down_sql)
+
+
 def test_load_config():
     """Test loading configuration from file."""
     config_data = {
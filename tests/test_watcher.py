@@ -0,0 +1,177 @@
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from wandern.exceptions import InvalidMigrationFile, OrphanedRevision
+from wandern.graph import MigrationGraph
+from wandern.utils import parse_sql_file_header
+from wandern.watcher import (
+    GraphWatcher,
+    InotifyWatcher,
+    PollingWatcher,
+    create_watcher,
+)
+
+
+def migration(revision_id: str, revises: str | None, message: str = "") -> str:
+    return (
+        "/*\n"
+        "Timestamp: 2024-11-19 00:55:16\n"
+        f"Revision ID: {revision_id}\n"
+        f"Revises: {revises}\n"
+        f"Message: {message or revision_id}\n"
+        "*/\n\n"
+        f"-- UP\nCREATE TABLE {revision_id} (id INTEGER);\n\n"
+        f"-- DOWN\nDROP TABLE {revision_id};\n"
+    )
+
+
+@pytest.fixture
+def watched_dir(tmp_path):
+    (tmp_path / "0001.sql").write_text(migration("a", None))
+    (tmp_path / "0002.sql").write_text(migration("b", "a"))
+    return tmp_path
+
+
+def ids(graph: MigrationGraph) -> list[str]:
+    return [revision.revision_id for revision in graph.iter()]
+
+
+def polling_watcher(directory):
+    return PollingWatcher(directory, interval=0.01)
+
+
+def inotify_watcher(directory):
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError):
+        pytest.skip("inotify is not available")
+
+
+@pytest.fixture(params=[polling_watcher, inotify_watcher])
+def watched(request, watched_dir):
+    graph = MigrationGraph.build(str(watched_dir))
+    with GraphWatcher(graph, watched_dir, request.param(watched_dir)) as watcher:
+        yield watcher
+
+
+def test_refresh_without_changes(watched):
+    version = watched.graph.version
+
+    assert watched.refresh() is False
+    assert watched.graph.version == version
+
+
+def test_refresh_added_file(watched, watched_dir):
+    (watched_dir / "0003.sql").write_text(migration("c", "b"))
+
+    assert watched.refresh(timeout=1) is True
+    assert ids(watched.graph) == ["a", "b", "c"]
+    assert watched.graph.get_source("c") == watched_dir / "0003.sql"
+
+
+def test_refresh_modified_file(watched, watched_dir):
+    (watched_dir / "0002.sql").write_text(migration("b", "a", "a longer message"))
+
+    assert watched.refresh(timeout=1) is True
+    assert watched.graph.get_node("b").message == "a longer message"
+    assert ids(watched.graph) == ["a", "b"]
+
+
+def test_refresh_deleted_file(watched, watched_dir):
+    (watched_dir / "0001.sql").unlink()
+
+    assert watched.refresh(timeout=1) is True
+    assert ids(watched.graph) == ["b"]
+    with pytest.raises(OrphanedRevision, match="Revision b revises a"):
+        watched.graph.validate()
+
+
+def test_refresh_renamed_file(watched, watched_dir):
+    (watched_dir / "0002.sql").rename(watched_dir / "0009.sql")
+
+    assert watched.refresh(timeout=1) is True
+    assert ids(watched.graph) == ["a", "b"]
+    assert watched.graph.get_source("b") == watched_dir / "0009.sql"
+
+
+def test_refresh_only_parses_changed_files(watched_dir):
+    graph = MigrationGraph.build(str(watched_dir))
+    watcher = GraphWatcher(graph, watched_dir, polling_watcher(watched_dir))
+    (watched_dir / "0003.sql").write_text(migration("c", "b"))
+
+    with patch(
+        "wandern.graph.parse_sql_file_header", wraps=parse_sql_file_header
+    ) as mock_parse:
+        watcher.refresh()
+
+    mock_parse.assert_called_once_with(watched_dir / "0003.sql")
+
+
+def test_refresh_invalid_file(watched_dir):
+    graph = MigrationGraph.build(str(watched_dir))
+    watcher = GraphWatcher(graph, watched_dir, polling_watcher(watched_dir))
+
+    (watched_dir / "0002.sql").write_text("/* not a migration */")
+    (watched_dir / "0003.sql").write_text(migration("c", "a"))
+    with pytest.raises(InvalidMigrationFile, match="0002.sql"):
+        watcher.refresh()
+
+    # the other changes are applied, the broken file is left out
+    assert ids(graph) == ["a", "c"]
+
+    (watched_dir / "0002.sql").write_text(migration("b", "c"))
+    assert watcher.refresh(timeout=1) is True
+    assert ids(graph) == ["a", "c", "b"]
+
+
+def test_refresh_ignores_other_files(watched_dir):
+    graph = MigrationGraph.build(str(watched_dir))
+    watcher = GraphWatcher(graph, watched_dir, polling_watcher(watched_dir))
+
+    (watched_dir / "notes.txt").write_text("not a migration")
+
+    assert watcher.refresh() is False
+
+
+def test_refresh_after_lost_events(watched_dir):
+    """Test that the whole directory is compared when events were lost."""
+    graph = MigrationGraph.build(str(watched_dir))
+    watcher = GraphWatcher(graph, watched_dir, polling_watcher(watched_dir))
+    (watched_dir / "0001.sql").unlink()
+    (watched_dir / "0003.sql").write_text(migration("c", "b"))
+
+    with patch.object(watcher.watcher, "changes", return_value=None):
+        assert watcher.refresh() is True
+
+    assert "a" not in graph
+    assert ids(graph) == ["b", "c"]
+    assert sorted(graph.source_files) == [
+        watched_dir / "0002.sql",
+        watched_dir / "0003.sql",
+    ]
+
+
+def test_polling_watcher_waits_for_changes(tmp_path):
+    watcher = PollingWatcher(tmp_path, interval=0.01)
+
+    assert watcher.changes(timeout=0.05) == set()
+
+    (tmp_path / "0001.sql").write_text("x")
+    assert watcher.changes() == {"0001.sql"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="requires Linux")
+def test_create_watcher_prefers_inotify(tmp_path):
+    watcher = create_watcher(tmp_path)
+    watcher.close()
+
+    assert isinstance(watcher, InotifyWatcher)
+
+
+def test_create_watcher_falls_back_to_polling(tmp_path):
+    with patch("wandern.watcher.InotifyWatcher", side_effect=OSError):
+        watcher = create_watcher(tmp_path)
+
+    assert isinstance(watcher, PollingWatcher)
@@ -92,7 +92,7 @@ class MigrationAgent(BaseAgent[MigrationSQL, str]):
         )
 
         self.config = config
-        self.graph = MigrationGraph.build(config.migration_dir)
+        self.graph = MigrationGraph.from_config(config)
         self.system_prompt = self.create_system_prompt(
             role="migration assistant",
             task="generate SQL migration files",
@@ -110,7 +110,8 @@ class MigrationAgent(BaseAgent[MigrationSQL, str]):
         revisions = revisions[::-1]  # sort by most recent
 
         for rev in revisions:
-            additional_context.append(rev.model_dump_json(indent=2))
+            revision = self.graph.load_revision(rev).to_revision()
+            additional_context.append(revision.model_dump_json(indent=2))
 
         additional_context_str = "\n".join(additional_context)
         additional_context_str = (
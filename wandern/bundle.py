@@ -0,0 +1,183 @@
+import dataclasses
+import hashlib
+import io
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from pydantic import BaseModel, Field, ValidationError
+
+from wandern.compression import (
+    DECOMPRESSION_ERRORS,
+    is_compressed,
+    open_migration_file,
+)
+from wandern.exceptions import InvalidMigrationFile
+from wandern.index import file_checksum
+from wandern.models import Revision, RevisionRecord, SectionOffsets
+from wandern.parser import decode_sql, parse_migration
+from wandern.utils import list_migration_files
+
+BUNDLE_MAGIC = b"WDBUNDLE"
+BUNDLE_VERSION = 1
+
+# magic, version, length of the JSON header that follows
+PREAMBLE = struct.Struct("<8sIQ")
+
+
+class BundleEntry(BaseModel):
+    filename: str
+    checksum: str
+    revision: Revision
+    # relative to the start of the bundle body
+    offsets: SectionOffsets
+    start: int
+    size: int
+
+
+class BundleHeader(BaseModel):
+    version: int = BUNDLE_VERSION
+    entries: list[BundleEntry] = Field(default_factory=list)
+
+
+def read_migration_bytes(file_path: str | Path) -> bytes:
+    """Content of a migration file, compressed files are bundled decompressed"""
+    with open_migration_file(file_path) as file:
+        try:
+            return file.read()
+        except DECOMPRESSION_ERRORS as exc:
+            raise ValueError(f"Corrupt compressed file: {file_path}") from exc
+
+
+def write_bundle(migration_dir: str | Path, output: str | Path) -> BundleHeader:
+    """Pack the migration files of a directory into a single bundle file.
+
+    The bundle starts with a header table of revision metadata, followed by
+    the content of every migration file at the offset recorded in its entry.
+    Compressed migration files are stored decompressed, so they can be mapped.
+    """
+    header = BundleHeader()
+    bodies: list[bytes] = []
+    start = 0
+
+    for file in list_migration_files(migration_dir):
+        try:
+            data = read_migration_bytes(file)
+            revision, offsets = parse_migration(io.BytesIO(data))
+        except ValueError as exc:
+            raise InvalidMigrationFile(
+                f"Error parsing migration file: {file.name}"
+            ) from exc
+
+        header.entries.append(
+            BundleEntry(
+                filename=file.name,
+                checksum=hashlib.blake2b(data).hexdigest(),
+                revision=revision,
+                offsets=SectionOffsets(*(start + offset for offset in offsets)),
+                start=start,
+                size=len(data),
+            )
+        )
+        bodies.append(data)
+        start += len(data)
+
+    header_json = header.model_dump_json().encode("utf-8")
+    tmp_path = Path(output).with_name(f"{Path(output).name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(PREAMBLE.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(header_json)))
+            file.write(header_json)
+            file.writelines(bodies)
+        os.replace(tmp_path, output)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return header
+
+
+class MigrationBundle:
+    """Read only view of a bundle file, memory mapped for the SQL bodies"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        try:
+            with open(self.path, "rb") as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise InvalidMigrationFile(
+                f"Error reading migration bundle: {self.path.name}"
+            ) from exc
+
+        try:
+            magic, version, header_size = PREAMBLE.unpack_from(self._mmap)
+            if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+                raise ValueError("not a wandern bundle of a supported version")
+
+            self._body_start = PREAMBLE.size + header_size
+            self.header = BundleHeader.model_validate_json(
+                self._mmap[PREAMBLE.size : self._body_start]
+            )
+        except (struct.error, ValueError, ValidationError) as exc:
+            self.close()
+            raise InvalidMigrationFile(
+                f"Invalid migration bundle: {self.path.name}"
+            ) from exc
+
+        self._entries = {
+            entry.revision.revision_id: entry for entry in self.header.entries
+        }
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    @property
+    def entries(self) -> list[BundleEntry]:
+        return self.header.entries
+
+    def _read(self, start: int, end: int) -> bytes:
+        return self._mmap[self._body_start + start : self._body_start + end]
+
+    def load_revision(self, revision: RevisionRecord) -> RevisionRecord:
+        entry = self._entries.get(revision.revision_id)
+        if entry is None:
+            return revision
+
+        offsets = entry.offsets
+        return dataclasses.replace(
+            revision,
+            up_sql=decode_sql(self._read(offsets.up_start, offsets.up_end)),
+            down_sql=decode_sql(self._read(offsets.down_start, offsets.down_end)),
+        )
+
+    def verify(self, migration_dir: str | Path | None = None) -> list[str]:
+        """Check the bundle's content hashes, and that it matches `migration_dir`.
+
+        Returns a description of every mismatch, an empty list if there is none.
+        """
+        problems = []
+        for entry in self.entries:
+            data = self._read(entry.start, entry.start + entry.size)
+            if hashlib.blake2b(data).hexdigest() != entry.checksum:
+                problems.append(f"{entry.filename}: bundle content is corrupt")
+
+        if migration_dir is None:
+            return problems
+
+        bundled = {entry.filename: entry.checksum for entry in self.entries}
+        for file in list_migration_files(migration_dir):
+            checksum = bundled.pop(file.name, None)
+            if checksum is None:
+                problems.append(f"{file.name}: missing from the bundle")
+            elif checksum != (
+                hashlib.blake2b(read_migration_bytes(file)).hexdigest()
+                if is_compressed(file)
+                else file_checksum(file)
+            ):
+                problems.append(f"{file.name}: differs from the bundle")
+
+        for filename in bundled:
+            problems.append(f"{filename}: missing from the migration directory")
+
+        return problems
@@ -1,24 +1,83 @@
+import asyncio
 import getpass
 import os
+from collections.abc import Callable, Coroutine
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any
 
 import rich
 import typer
 from questionary import checkbox, path, select, text
 from rich.console import Console
+from rich.live import Live
 
-from wandern.cli.utils import date_validator, display_migrations_state
-from wandern.constants import DEFAULT_CONFIG_FILENAME, DEFAULT_MIGRATION_TABLE
-from wandern.exceptions import ConnectError
+from wandern.cli.utils import (
+    create_targets_table,
+    date_validator,
+    display_migrations_state,
+)
+from wandern.bundle import MigrationBundle, write_bundle
+from wandern.constants import (
+    DEFAULT_BUNDLE_SUFFIX,
+    DEFAULT_CONFIG_FILENAME,
+    DEFAULT_MIGRATION_TABLE,
+)
+from wandern.exceptions import ConnectError, WandernException
+from wandern.fanout import (
+    TargetProgress,
+    TargetState,
+    read_dsn_file,
+    redact_dsn,
+    upgrade_schemas,
+    upgrade_targets,
+)
+from wandern.graph import MigrationGraph
 from wandern.migration import MigrationService
-from wandern.models import Config
+from wandern.models import Config, ParseExecutor
 from wandern.utils import create_migration, exception_handler, load_config, save_config
 
 app = typer.Typer(rich_markup_mode="rich", no_args_is_help=True)
+index_app = typer.Typer(
+    rich_markup_mode="rich", no_args_is_help=True, help="Manage the migration index"
+)
+app.add_typer(index_app, name="index")
 config_path = Path.cwd() / DEFAULT_CONFIG_FILENAME
 
+# settings given on the command line take precedence over the wandern config
+config_overrides: dict[str, Any] = {}
+
+
+@app.callback()
+def main(
+    parse_workers: Annotated[
+        int | None,
+        typer.Option(
+            "--parse-workers",
+            min=0,
+            help="Number of workers parsing migration files (0: one per CPU)",
+        ),
+    ] = None,
+    parse_executor: Annotated[
+        ParseExecutor | None,
+        typer.Option(
+            "--parse-executor",
+            help="Parse migration files on a thread or a process pool",
+        ),
+    ] = None,
+):
+    config_overrides.clear()
+    if parse_workers is not None:
+        config_overrides["parse_workers"] = parse_workers
+    if parse_executor is not None:
+        config_overrides["parse_executor"] = parse_executor
+
+
+def get_config() -> Config:
+    config = load_config(config_path)
+    return config.model_copy(update=config_overrides)
+
 
 @app.command(help="Initialize wandern for a new project")
 def init(
@@ -114,7 +173,7 @@ def prompt(
 ):
     from wandern.agents.migration_agent import MigrationAgent
 
-    config = load_config(config_path)
+    config = get_config()
     tags_list = tags.split(", ") if tags else []
     if author is None:
         author = getpass.getuser()  # get system username
@@ -182,7 +241,7 @@ def generate(
         ),
     ] = None,
 ):
-    config = load_config(config_path)
+    config = get_config()
     tags_list = tags.split(", ") if tags else []
     if author is None:
         author = getpass.getuser()  # get system username
@@ -230,20 +289,114 @@ def upgrade(
             help="Optional author of the migration",
         ),
     ] = None,
+    to: Annotated[
+        str | None,
+        typer.Option(
+            "--to",
+            help="Revision to upgrade to, including it",
+        ),
+    ] = None,
+    atomic: Annotated[
+        bool,
+        typer.Option(
+            "--atomic",
+            help="Apply all revisions in a single transaction, or none of them",
+        ),
+    ] = False,
+    dsn_file: Annotated[
+        Path | None,
+        typer.Option(
+            "--dsn-file",
+            help="File with the connection strings of the databases to upgrade,"
+            " one per line",
+            exists=True,
+            dir_okay=False,
+        ),
+    ] = None,
+    schemas: Annotated[
+        str | None,
+        typer.Option(
+            "--schemas",
+            help="Upgrade every schema LIKE this pattern of the PostgreSQL"
+            " database, each with its own migration table, e.g. 'tenant_%'",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            help="Number of databases of --dsn-file, or schemas of --schemas,"
+            " upgraded at the same time",
+            min=1,
+        ),
+    ] = 8,
 ):
-    config = load_config(config_path)
+    config = get_config()
     tags_list = tags.split(", ") if tags else []
     if author:
         rich.print(f"[green]Applying migrations by author: {author}[/green]")
     if tags:
         rich.print(f"[green]Applying migrations with tags: {tags}[/green]")
 
+    options = dict(steps=steps, author=author, tags=tags_list, to=to, atomic=atomic)
+    if dsn_file is not None and schemas is not None:
+        rich.print("[red]Error:[/red] --dsn-file and --schemas can not be combined")
+        raise typer.Exit(code=1)
+    if dsn_file is not None:
+        dsns = read_dsn_file(dsn_file)
+        if not dsns:
+            rich.print("[red]Error:[/red] No connection strings in the DSN file")
+            raise typer.Exit(code=1)
+        upgrade_many(
+            "Database", partial(upgrade_targets, config, dsns, concurrency, **options)
+        )
+        return
+    if schemas is not None:
+        upgrade_many(
+            "Schema", partial(upgrade_schemas, config, schemas, concurrency, **options)
+        )
+        return
+
     migration_service = MigrationService(config)
     try:
-        migration_service.upgrade(steps=steps, author=author, tags=tags_list)
+        migration_service.upgrade(**options)
+    except ValueError as e:
+        rich.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(code=1)
+
+
+def upgrade_many(
+    title: str, fanout: Callable[..., Coroutine[Any, Any, list[TargetProgress]]]
+):
+    """Run the `fanout` of `wandern.fanout`, showing the progress of each of
+    its databases or schemas, and exit with an error if any failed.
+    """
+    console = Console()
+    live = Live(create_targets_table([], title), console=console, transient=True)
+
+    def refresh(targets: list[TargetProgress]) -> None:
+        live.update(create_targets_table(targets, title))
+
+    try:
+        with live:
+            targets = asyncio.run(fanout(on_progress=refresh))
     except ValueError as e:
         rich.print(f"[red]Error:[/red] {e}")
         raise typer.Exit(code=1)
+    console.print(create_targets_table(targets, title))
+
+    failed = [target for target in targets if target.state == TargetState.FAILED]
+    console.print(
+        f"[green]Upgraded {len(targets) - len(failed)} of {len(targets)}"
+        f" {title.lower()}s[/green]"
+    )
+    if failed:
+        for target in failed:
+            console.print(
+                f"[red]Failed:[/red] {redact_dsn(target.name)}", highlight=False
+            )
+            console.print(target.error, markup=False, highlight=False)
+        raise typer.Exit(code=1)
 
 
 @app.command(name="down", help="Downgrade database migrations")
@@ -255,11 +408,22 @@ def downgrade(
             help="Number of migration steps to apply (default: all)",
         ),
     ] = None,
+    to: Annotated[
+        str | None,
+        typer.Option(
+            "--to",
+            help="Revision to downgrade to, it stays applied",
+        ),
+    ] = None,
 ):
-    config = load_config(config_path)
+    config = get_config()
 
     migration_service = MigrationService(config)
-    migration_service.downgrade(steps=steps)
+    try:
+        migration_service.downgrade(steps=steps, to=to)
+    except ValueError as e:
+        rich.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(code=1)
 
 
 @app.command(help="Reset all migrations")
@@ -269,13 +433,29 @@ def reset():
     Rolls back all the migrations applied to the database
     """
 
-    config = load_config(config_path)
+    config = get_config()
 
     migration_service = MigrationService(config)
     migration_service.downgrade(steps=None)
     rich.print("[green]Reset all migrations successfully![/green]")
 
 
+@app.command(help="Check applied migrations against their migration files")
+@exception_handler(WandernException)
+def verify():
+    config = get_config()
+
+    migration_service = MigrationService(config)
+    problems = migration_service.verify()
+
+    for problem in problems:
+        rich.print(f"[red]{problem}[/red]")
+    if problems:
+        raise typer.Exit(code=1)
+
+    rich.print("[green]Applied migrations match their migration files[/green]")
+
+
 @app.command(help="Browse database migrations interactively")
 @exception_handler(ConnectError)
 def browse(
@@ -289,7 +469,7 @@ def browse(
     ] = False,
 ):
     """Interactive browser for migrations with search and filtering."""
-    config = load_config(config_path)
+    config = get_config()
     service = MigrationService(config)
     console = Console(force_terminal=True)
 
@@ -369,3 +549,112 @@ def browse(
             date_filter = None
 
     raise typer.Exit()
+
+
+@app.command(help="Squash migrations into a single baseline migration")
+@exception_handler(WandernException)
+def squash(
+    until: Annotated[
+        str,
+        typer.Option(
+            "--until",
+            "-u",
+            help="Last revision to squash, all revisions up to it are replaced",
+        ),
+    ],
+    message: Annotated[
+        str | None,
+        typer.Option(
+            "--message",
+            "-m",
+            help="A brief description of the baseline migration",
+        ),
+    ] = None,
+    author: Annotated[
+        str | None,
+        typer.Option(
+            "--author",
+            "-a",
+            help="Optional author of the migration (default: system user)",
+        ),
+    ] = None,
+):
+    config = get_config()
+    if author is None:
+        author = getpass.getuser()  # get system username
+
+    migration_service = MigrationService(config)
+    try:
+        revision, filename = migration_service.squash(
+            until, message=message, author=author
+        )
+    except ValueError as e:
+        rich.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(code=1)
+
+    rich.print(
+        f"[green]Squashed {len(revision.replaces or [])} migrations into"
+        f" {filename} for revision:[/green] [yellow]{revision.revision_id}[/yellow]"
+    )
+
+
+@app.command(help="Pack the migration directory into a single bundle file")
+@exception_handler(WandernException)
+def bundle(
+    output: Annotated[
+        str | None,
+        typer.Argument(
+            help="Path of the bundle file (default: the migration directory + .wdb)",
+        ),
+    ] = None,
+    verify: Annotated[
+        bool,
+        typer.Option(
+            "--verify",
+            help="Verify an existing bundle against the migration directory",
+        ),
+    ] = False,
+):
+    config = get_config()
+    if os.path.isfile(config.migration_dir):
+        rich.print("[red]The configured migration directory is a bundle[/red]")
+        raise typer.Exit(code=1)
+
+    output = output or os.path.normpath(config.migration_dir) + DEFAULT_BUNDLE_SUFFIX
+
+    if verify:
+        migration_bundle = MigrationBundle(output)
+        try:
+            problems = migration_bundle.verify(config.migration_dir)
+        finally:
+            migration_bundle.close()
+
+        for problem in problems:
+            rich.print(f"[red]{problem}[/red]")
+        if problems:
+            raise typer.Exit(code=1)
+
+        rich.print(
+            f"[green]Bundle {output} matches {config.migration_dir}"
+            f" ({len(migration_bundle.entries)} migrations)[/green]"
+        )
+        return
+
+    header = write_bundle(config.migration_dir, output)
+    rich.print(f"[green]Bundled {len(header.entries)} migrations into {output}[/green]")
+
+
+@index_app.command(name="rebuild", help="Rebuild the migration index from scratch")
+@exception_handler(WandernException)
+def index_rebuild():
+    config = get_config()
+    if not config.index_file:
+        rich.print("[red]Migration index is disabled in the wandern config[/red]")
+        raise typer.Exit(code=1)
+
+    Path(config.index_file).unlink(missing_ok=True)
+    graph = MigrationGraph.from_config(config)
+    rich.print(
+        f"[green]Rebuilt migration index {config.index_file}"
+        f" with {len(graph)} revisions[/green]"
+    )
@@ -4,7 +4,8 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from wandern.models import Revision
+from wandern.fanout import TargetProgress, TargetState, redact_dsn
+from wandern.models import RevisionRecord
 
 
 def date_validator(date_str: str) -> bool:
@@ -15,7 +16,7 @@ def date_validator(date_str: str) -> bool:
 
 
 def create_migration_table(
-    revisions: list[Revision],
+    revisions: list[RevisionRecord],
     sources: list[str] | None = None,
     db_head_id: str | None = None,
 ) -> Table:
@@ -116,7 +117,7 @@ def create_filter_panel(
 
 def display_migrations_state(
     console: Console,
-    filtered_revisions: list[Revision],
+    filtered_revisions: list[RevisionRecord],
     author_filter: str | None,
     tags_filter: list[str] | None,
     date_filter: datetime | None,
@@ -132,3 +133,35 @@ def display_migrations_state(
         )
     )
     console.print(create_filter_panel(author_filter, tags_filter, date_filter))
+
+
+_TARGET_STATE_STYLES = {
+    TargetState.PENDING: "[dim]Pending[/dim]",
+    TargetState.RUNNING: "[yellow]Running[/yellow]",
+    TargetState.DONE: "[green]Done[/green]",
+    TargetState.FAILED: "[red]Failed[/red]",
+}
+
+
+def create_targets_table(
+    targets: list[TargetProgress], title: str = "Database"
+) -> Table:
+    """Create the table of the databases, or schemas, upgraded by `wandern up
+    --dsn-file` or `--schemas`
+    """
+    table = Table(show_header=True, header_style="bold blue", expand=True)
+
+    table.add_column(title, style="cyan")
+    table.add_column("Status", no_wrap=True)
+    table.add_column("Applied", style="green", justify="right")
+    table.add_column("Last revision", style="white", no_wrap=True)
+
+    for target in targets:
+        table.add_row(
+            redact_dsn(target.name),
+            _TARGET_STATE_STYLES[target.state],
+            str(target.applied),
+            target.last[:8] if target.last else "",
+        )
+
+    return table
@@ -0,0 +1,37 @@
+import bz2
+import gzip
+import lzma
+from collections.abc import Callable
+from pathlib import Path
+from typing import BinaryIO
+
+from wandern.constants import MIGRATION_FILE_SUFFIXES
+
+OPENERS: dict[str, Callable[[str | Path], BinaryIO]] = {
+    ".gz": gzip.open,  # type: ignore
+    ".bz2": bz2.open,  # type: ignore
+    ".xz": lzma.open,  # type: ignore
+}
+
+# raised while reading a corrupt or truncated compressed file, besides OSError
+DECOMPRESSION_ERRORS = (EOFError, lzma.LZMAError)
+
+
+def is_migration_file(file_path: str | Path) -> bool:
+    return Path(file_path).name.endswith(MIGRATION_FILE_SUFFIXES)
+
+
+def is_compressed(file_path: str | Path) -> bool:
+    return Path(file_path).suffix in OPENERS
+
+
+def open_migration_file(file_path: str | Path) -> BinaryIO:
+    """Open a migration file for reading bytes, decompressing it on the fly.
+
+    Seeking forward in a compressed file decompresses the skipped data, and
+    its size is only known once it was read to the end.
+    """
+    opener = OPENERS.get(Path(file_path).suffix)
+    if opener is None:
+        return open(file_path, "rb")
+    return opener(file_path)
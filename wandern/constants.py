@@ -5,6 +5,8 @@ DEFAULT_FILE_FORMAT = "{version}-{datetime:%Y%m%d_%H%M%S}-{message}"
 
 DEFAULT_MIGRATION_TABLE = "wd_migrations"
 
+# Superseded by the single pass parser in `wandern.parser`, which does not
+# backtrack on large files. Kept for compatibility and as benchmark baseline.
 REGEX_MIGRATION_PARSER: Pattern = re.compile(
     r"""
     /\*                                             # Opening comment
@@ -19,7 +21,11 @@ REGEX_MIGRATION_PARSER: Pattern = re.compile(
     re.DOTALL | re.VERBOSE,
 )
 
-# Individual field patterns for extracting fields from comment block
+# Section markers, matched against single lines of a migration file
+REGEX_UP_MARKER: Pattern = re.compile(rb"^\s*--\s*UP\s*$")
+REGEX_DOWN_MARKER: Pattern = re.compile(rb"^\s*--\s*DOWN\s*$")
+
+# Individual field patterns, matched against each line of the comment block
 REGEX_TIMESTAMP: Pattern = re.compile(
     r"Timestamp:\s*(?P<timestamp>[^\n]+)", re.IGNORECASE
 )
@@ -30,6 +36,29 @@ REGEX_REVISES: Pattern = re.compile(r"Revises:\s*(?P<revises>\w+)", re.IGNORECAS
 REGEX_MESSAGE: Pattern = re.compile(r"Message:\s*(?P<message>[^\n]*)", re.IGNORECASE)
 REGEX_AUTHOR: Pattern = re.compile(r"Author:\s*(?P<author>[^\n]+)", re.IGNORECASE)
 REGEX_TAGS: Pattern = re.compile(r"Tags:\s*(?P<tags>[^\n]+)", re.IGNORECASE)
+REGEX_REPLACES: Pattern = re.compile(r"Replaces:\s*(?P<replaces>[^\n]+)", re.IGNORECASE)
+REGEX_TRANSACTIONAL: Pattern = re.compile(
+    r"Transactional:\s*(?P<transactional>\w+)", re.IGNORECASE
+)
+REGEX_LOCK_TIMEOUT: Pattern = re.compile(
+    r"Lock\s+Timeout:\s*(?P<lock_timeout>[^\n]+)", re.IGNORECASE
+)
+REGEX_STATEMENT_TIMEOUT: Pattern = re.compile(
+    r"Statement\s+Timeout:\s*(?P<statement_timeout>[^\n]+)", re.IGNORECASE
+)
+# durations of the timeout fields, in seconds unless a unit is given
+REGEX_DURATION: Pattern = re.compile(
+    r"(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>ms|s|min)?", re.IGNORECASE
+)
 
 
 DEFAULT_CONFIG_FILENAME = ".wd.json"
+
+DEFAULT_INDEX_FILENAME = ".wd_index"
+
+DEFAULT_BUNDLE_SUFFIX = ".wdb"
+
+DEFAULT_STREAM_THRESHOLD = 64 * 1024 * 1024
+
+# suffixes of migration files, compressed files are decompressed as they are read
+MIGRATION_FILE_SUFFIXES = (".sql", ".sql.gz", ".sql.bz2", ".sql.xz")
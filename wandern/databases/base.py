@@ -1,24 +1,81 @@
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
 from datetime import datetime
 from typing import Any, Protocol, runtime_checkable
 
-from wandern.models import Revision
+from wandern.models import Config, RevisionRecord
+
+
+def revision_timeouts(
+    revision: RevisionRecord, config: Config
+) -> tuple[float | None, float | None]:
+    """Lock and statement timeouts of `revision` in seconds, its own or else
+    those of `config`
+    """
+    return (
+        revision.lock_timeout
+        if revision.lock_timeout is not None
+        else config.lock_timeout,
+        revision.statement_timeout
+        if revision.statement_timeout is not None
+        else config.statement_timeout,
+    )
 
 
 @runtime_checkable
 class BaseProvider(Protocol):
+    def session(self) -> AbstractContextManager[None]: ...
+
+    def atomic(self) -> AbstractContextManager[None]: ...
+
     def create_table_migration(self) -> Any: ...
 
     def drop_table_migration(self) -> Any: ...
 
-    def get_head_revision(self) -> Revision | None: ...
+    def get_head_revision(self) -> RevisionRecord | None: ...
+
+    def migrate_up(self, revision: RevisionRecord, record: bool = True) -> Any: ...
+
+    def record_migrations(self, revisions: list[RevisionRecord]) -> Any: ...
 
-    def migrate_up(self, revision: Revision) -> Any: ...
+    def migrate_down(self, revision: RevisionRecord) -> Any: ...
 
-    def migrate_down(self, revision: Revision) -> Any: ...
+    def is_lock_timeout(self, exc: Exception) -> bool: ...
 
     def list_migrations(
         self,
         author: str | None = None,
         tags: list[str] | None = None,
         created_at: datetime | None = None,
-    ) -> list[Revision]: ...
+    ) -> list[RevisionRecord]: ...
+
+
+@runtime_checkable
+class AsyncBaseProvider(Protocol):
+    """`BaseProvider` for asyncio, every call is awaited"""
+
+    def session(self) -> AbstractAsyncContextManager[None]: ...
+
+    def atomic(self) -> AbstractAsyncContextManager[None]: ...
+
+    async def create_table_migration(self) -> Any: ...
+
+    async def drop_table_migration(self) -> Any: ...
+
+    async def get_head_revision(self) -> RevisionRecord | None: ...
+
+    async def migrate_up(
+        self, revision: RevisionRecord, record: bool = True
+    ) -> Any: ...
+
+    async def record_migrations(self, revisions: list[RevisionRecord]) -> Any: ...
+
+    async def migrate_down(self, revision: RevisionRecord) -> Any: ...
+
+    def is_lock_timeout(self, exc: Exception) -> bool: ...
+
+    async def list_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]: ...
@@ -1,9 +1,20 @@
-from datetime import datetime
-from wandern.databases.base import BaseProvider
+import math
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import (
+    AbstractAsyncContextManager,
+    AbstractContextManager,
+    asynccontextmanager,
+    contextmanager,
+)
+from datetime import datetime, timedelta
+from wandern.databases.base import AsyncBaseProvider, BaseProvider, revision_timeouts
 from wandern.exceptions import ConnectError
-from wandern.models import Config, Revision
+from wandern.models import Config, DatabaseProviders, RevisionRecord
+from wandern.statements import Statement, execute_statements, execute_statements_async
 
 import mysql.connector as mysql
+import mysql.connector.aio as mysql_aio
+from mysql.connector import errorcode
 from urllib.parse import urlparse, parse_qs
 from typing import TypedDict, NotRequired, Literal
 
@@ -108,147 +119,150 @@ def validate_parsed_params(params_dict: MySQLConnectionParams) -> MySQLConnectio
 
     return validated_params
 
-class MySQLProvider(BaseProvider):
-    def __init__(self, config: Config):
-        self.config = config
+class _MySQLQueries:
+    """Queries on the migration table, shared by the sync and async providers"""
 
-    def connect(self) -> mysql.MySQLConnection:
-        """
-        Establish connection to MySQL database.
-        
-        Returns a connection with autocommit enabled to ensure changes are persisted immediately.
-        """
-        try:
-            params = parse_params_from_dsn(self.config.dsn)
-            connection_params = validate_parsed_params(params)
+    dialect = DatabaseProviders.MYSQL
+    config: Config
 
-            if 'autocommit' not in connection_params:
-                connection_params['autocommit'] = True
-                
-            return mysql.connect(**connection_params)
-        
-        except Exception as exc:
-            raise ConnectError(
-                "Failed to connect to the database"
-                f"\nIs your database server running on '{self.config.dsn}'?"
-            ) from exc
-    
-    def create_table_migration(self) -> None:
-        """
-        Create the migrations tracking table.
-        """
+    def _connection_params(self) -> MySQLConnectionParams:
+        params = parse_params_from_dsn(self.config.dsn)
+        connection_params = validate_parsed_params(params)
+
+        if 'autocommit' not in connection_params:
+            connection_params['autocommit'] = True
+
+        return connection_params
+
+    def _connect_error(self) -> ConnectError:
+        return ConnectError(
+            "Failed to connect to the database"
+            f"\nIs your database server running on '{self.config.dsn}'?"
+        )
 
+    def _lock_wait_timeout(self, revision: RevisionRecord) -> int | None:
+        # whole seconds, at least one
+        lock_timeout, _ = revision_timeouts(revision, self.config)
+        return max(1, math.ceil(lock_timeout)) if lock_timeout is not None else None
+
+    @staticmethod
+    def _lock_wait_timeout_query() -> str:
+        return "SET SESSION lock_wait_timeout = %s"
+
+    @staticmethod
+    def _reset_lock_wait_timeout_query() -> str:
+        return "SET SESSION lock_wait_timeout = DEFAULT"
+
+    @staticmethod
+    def is_lock_timeout(exc: Exception) -> bool:
+        return (
+            isinstance(exc, mysql.Error)
+            and exc.errno == errorcode.ER_LOCK_WAIT_TIMEOUT
+        )
+
+    @staticmethod
+    def _atomic_error() -> ValueError:
+        return ValueError(
+            "Atomic upgrades are not supported on MySQL, which commits every"
+            " DDL statement implicitly"
+        )
+
+    def _create_table_query(self) -> str:
         # We use TIMESTAMP(6) as MySQL TIMESTAMP goes upto seconds as compared to SQLITE and Postgres
-        query = f"""
+        return f"""
         CREATE TABLE IF NOT EXISTS {self.config.migration_table} (
             revision_id VARCHAR(255) PRIMARY KEY NOT NULL,
             down_revision_id VARCHAR(255),
             message TEXT,
             tags TEXT,
             author VARCHAR(255),
-            created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) 
+            created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+            checksum VARCHAR(64)
         )
         """
 
-        with self.connect() as connection:
-            cursor = connection.cursor()
-            cursor.execute(query)
+    def _checksum_column_query(self) -> tuple[str, dict]:
+        # tables created before checksums were recorded
+        return """
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+            AND table_name = %(table)s AND column_name = 'checksum'
+        """, {"table": self.config.migration_table}
+
+    def _add_checksum_column_query(self) -> str:
+        return (
+            f"ALTER TABLE {self.config.migration_table}"
+            " ADD COLUMN checksum VARCHAR(64)"
+        )
 
-    def drop_table_migration(self) -> None:
-        query = f"""
+    def _drop_table_query(self) -> str:
+        return f"""
         DROP TABLE IF EXISTS {self.config.migration_table}
         """
 
-        with self.connect() as connection:
-            cursor = connection.cursor()
-            cursor.execute(query)
-
-    def get_head_revision(self) -> Revision | None:
-        query = f"""
+    def _head_query(self) -> str:
+        return f"""
         SELECT * FROM {self.config.migration_table}
         ORDER BY created_at DESC LIMIT 1
         """
 
-        with self.connect() as connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(query)
-            row = cursor.fetchone()
-            if not row:
-                return None
-
-            # Convert tags from TEXT to list
-            tags = row["tags"].split(",") if row["tags"] else []
-
-            return Revision(
-                revision_id=row["revision_id"],
-                down_revision_id=row["down_revision_id"],
-                message=row["message"] or "",
-                tags=tags,
-                author=row["author"],
-                created_at=(
-                    row["created_at"] if row["created_at"] else datetime.now()
-                ),
-            )
+    @staticmethod
+    def _to_record(row: dict) -> RevisionRecord:
+        # Convert tags from TEXT to list
+        tags = row["tags"].split(",") if row["tags"] else []
+
+        return RevisionRecord(
+            revision_id=row["revision_id"],
+            down_revision_id=row["down_revision_id"],
+            message=row["message"] or "",
+            tags=tags,
+            author=row["author"],
+            created_at=(
+                row["created_at"] if row["created_at"] else datetime.now()
+            ),
+            checksum=row["checksum"],
+        )
 
-    def migrate_up(self, revision: Revision) -> int:
-        query = f"""
+    def _insert_query(self) -> str:
+        return f"""
         INSERT INTO {self.config.migration_table}
-            (revision_id, down_revision_id, message, tags, author, created_at)
-        VALUES (%(revision_id)s, %(down_revision_id)s, %(message)s, %(tags)s, %(author)s, %(created_at)s)
+            (revision_id, down_revision_id, message, tags, author, created_at, checksum)
+        VALUES (%(revision_id)s, %(down_revision_id)s, %(message)s, %(tags)s, %(author)s, %(created_at)s, %(checksum)s)
         """
 
-        with self.connect() as connection:
-            if revision.up_sql:
-                cursor = connection.cursor()
-                cursor.execute(revision.up_sql)
-                if getattr(cursor, "with_rows", False):
-                    cursor.fetchall()
-                cursor.close()
-
-            cursor = connection.cursor()
-            cursor.execute(
-                query,
-                {
-                    "revision_id": revision.revision_id,
-                    "down_revision_id": revision.down_revision_id,
-                    "message": revision.message,
-                    "tags": ",".join(revision.tags) if revision.tags else None,
-                    "author": revision.author,
-                    "created_at": datetime.now(),
-                },
-            )
-            rowcount = cursor.rowcount
-            cursor.close()
-
-            return rowcount
-
-    def migrate_down(self, revision: Revision) -> int:
-        query = f"""
+    @staticmethod
+    def _insert_params(revision: RevisionRecord, created_at: datetime) -> dict:
+        return {
+            "revision_id": revision.revision_id,
+            "down_revision_id": revision.down_revision_id,
+            "message": revision.message,
+            "tags": ",".join(revision.tags) if revision.tags else None,
+            "author": revision.author,
+            "created_at": created_at,
+            "checksum": revision.checksum,
+        }
+
+    @classmethod
+    def _records_params(cls, revisions: list[RevisionRecord]) -> list[dict]:
+        # one microsecond apart, the last revision stays the head
+        now = datetime.now()
+        return [
+            cls._insert_params(revision, now + timedelta(microseconds=i))
+            for i, revision in enumerate(revisions)
+        ]
+
+    def _delete_query(self) -> str:
+        return f"""
         DELETE FROM {self.config.migration_table}
         WHERE revision_id = %(revision_id)s
         """
 
-        with self.connect() as connection:
-            if revision.down_sql:
-                cursor = connection.cursor()
-                cursor.execute(revision.down_sql)
-                if getattr(cursor, "with_rows", False):
-                    cursor.fetchall()
-                cursor.close()
-
-            cursor = connection.cursor()
-            cursor.execute(query, {"revision_id": revision.revision_id})
-            rowcount = cursor.rowcount
-            cursor.close()
-
-            return rowcount
-
-    def list_migrations(
+    def _list_query(
         self,
         author: str | None = None,
         tags: list[str] | None = None,
         created_at: datetime | None = None,
-    ) -> list[Revision]:
+    ) -> tuple[str, dict]:
         base_query = f"""
         SELECT * FROM {self.config.migration_table}
         """
@@ -282,27 +296,308 @@ class MySQLProvider(BaseProvider):
             base_query += f" WHERE {' AND '.join(where_clause)}"
         base_query += " ORDER BY created_at DESC"
 
+        return base_query, params
+
+
+class MySQLProvider(_MySQLQueries, BaseProvider):
+    def __init__(self, config: Config):
+        self.config = config
+        self._session: mysql.MySQLConnection | None = None
+
+    def connect(self) -> mysql.MySQLConnection:
+        """
+        Establish connection to MySQL database.
+        
+        Returns a connection with autocommit enabled to ensure changes are persisted immediately.
+        """
+        try:
+            return mysql.connect(**self._connection_params())
+        except Exception as exc:
+            raise self._connect_error() from exc
+    
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Run every call made inside the block on one connection, instead of
+        connecting for each of them.
+        """
+        if self._session is not None:
+            yield
+            return
+
+        self._session = self.connect()
+        try:
+            yield
+        finally:
+            self._session.close()
+            self._session = None
+
+    def atomic(self) -> AbstractContextManager[None]:
+        """Not supported, as MySQL commits DDL statements implicitly."""
+        raise self._atomic_error()
+
+    @contextmanager
+    def _connect(self) -> Iterator[mysql.MySQLConnection]:
+        if self._session is not None:
+            yield self._session
+            return
+
         with self.connect() as connection:
+            yield connection
+
+    def _execute_statements(
+        self,
+        connection: mysql.MySQLConnection,
+        revision: RevisionRecord,
+        statements: Iterable[Statement],
+        location: str,
+    ) -> None:
+        cursor = connection.cursor()
+
+        def execute(statement: str) -> None:
+            cursor.execute(statement)
+            if getattr(cursor, "with_rows", False):
+                cursor.fetchall()
+
+        lock_wait_timeout = self._lock_wait_timeout(revision)
+        try:
+            if lock_wait_timeout is not None:
+                cursor.execute(self._lock_wait_timeout_query(), (lock_wait_timeout,))
+            try:
+                execute_statements(execute, statements, location)
+            finally:
+                if lock_wait_timeout is not None:
+                    cursor.execute(self._reset_lock_wait_timeout_query())
+        finally:
+            cursor.close()
+
+    def create_table_migration(self) -> None:
+        """
+        Create the migrations tracking table.
+        """
+        with self._connect() as connection:
+            cursor = connection.cursor()
+            cursor.execute(self._create_table_query())
+            cursor.execute(*self._checksum_column_query())
+            (count,) = cursor.fetchone()
+            if not count:
+                cursor.execute(self._add_checksum_column_query())
+
+    def drop_table_migration(self) -> None:
+        with self._connect() as connection:
+            cursor = connection.cursor()
+            cursor.execute(self._drop_table_query())
+
+    def get_head_revision(self) -> RevisionRecord | None:
+        with self._connect() as connection:
             cursor = connection.cursor(dictionary=True)
-            cursor.execute(base_query, params)
+            cursor.execute(self._head_query())
+            row = cursor.fetchone()
+            if not row:
+                return None
+
+            return self._to_record(row)
+
+    def migrate_up(self, revision: RevisionRecord, record: bool = True) -> int:
+        with self._connect() as connection:
+            self._execute_statements(
+                connection,
+                revision,
+                revision.up_statements(self.dialect),
+                f"the UP SQL of revision {revision.revision_id}",
+            )
+
+            if not record:
+                return 0
+
+            cursor = connection.cursor()
+            cursor.execute(
+                self._insert_query(), self._insert_params(revision, datetime.now())
+            )
+            rowcount = cursor.rowcount
+            cursor.close()
+
+            return rowcount
+
+    def record_migrations(self, revisions: list[RevisionRecord]) -> int:
+        with self._connect() as connection:
+            cursor = connection.cursor()
+            cursor.executemany(self._insert_query(), self._records_params(revisions))
+            rowcount = cursor.rowcount
+            cursor.close()
+
+            return rowcount
+
+    def migrate_down(self, revision: RevisionRecord) -> int:
+        with self._connect() as connection:
+            self._execute_statements(
+                connection,
+                revision,
+                revision.down_statements(self.dialect),
+                f"the DOWN SQL of revision {revision.revision_id}",
+            )
+
+            cursor = connection.cursor()
+            cursor.execute(self._delete_query(), {"revision_id": revision.revision_id})
+            rowcount = cursor.rowcount
+            cursor.close()
+
+            return rowcount
+
+    def list_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        with self._connect() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(*self._list_query(author, tags, created_at))
             rows = cursor.fetchall()
 
-            revisions = []
-            for row in rows:
-                # Convert tags from TEXT to list
-                tags_list = row["tags"].split(",") if row["tags"] else []
-
-                revisions.append(
-                    Revision(
-                        revision_id=row["revision_id"],
-                        down_revision_id=row["down_revision_id"],
-                        message=row["message"] or "",
-                        tags=tags_list,
-                        author=row["author"],
-                        created_at=(
-                            row["created_at"] if row["created_at"] else datetime.now()
-                        ),
-                    )
+            return [self._to_record(row) for row in rows]
+
+
+class AsyncMySQLProvider(_MySQLQueries, AsyncBaseProvider):
+    """`MySQLProvider` on the asyncio MySQL connector"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._session: mysql_aio.MySQLConnection | None = None
+
+    async def connect(self) -> mysql_aio.MySQLConnection:
+        try:
+            return await mysql_aio.connect(**self._connection_params())
+        except Exception as exc:
+            raise self._connect_error() from exc
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[None]:
+        """Run every call made inside the block on one connection, instead of
+        connecting for each of them.
+        """
+        if self._session is not None:
+            yield
+            return
+
+        self._session = await self.connect()
+        try:
+            yield
+        finally:
+            await self._session.close()
+            self._session = None
+
+    def atomic(self) -> AbstractAsyncContextManager[None]:
+        """Not supported, as MySQL commits DDL statements implicitly."""
+        raise self._atomic_error()
+
+    @asynccontextmanager
+    async def _connect(self) -> AsyncIterator[mysql_aio.MySQLConnection]:
+        if self._session is not None:
+            yield self._session
+            return
+
+        async with await self.connect() as connection:
+            yield connection
+
+    async def _execute_statements(
+        self,
+        connection: mysql_aio.MySQLConnection,
+        revision: RevisionRecord,
+        statements: Iterable[Statement],
+        location: str,
+    ) -> None:
+        async with await connection.cursor() as cursor:
+
+            async def execute(statement: str) -> None:
+                await cursor.execute(statement)
+                if cursor.with_rows:
+                    await cursor.fetchall()
+
+            lock_wait_timeout = self._lock_wait_timeout(revision)
+            if lock_wait_timeout is not None:
+                await cursor.execute(
+                    self._lock_wait_timeout_query(), (lock_wait_timeout,)
+                )
+            try:
+                await execute_statements_async(execute, statements, location)
+            finally:
+                if lock_wait_timeout is not None:
+                    await cursor.execute(self._reset_lock_wait_timeout_query())
+
+    async def create_table_migration(self) -> None:
+        async with self._connect() as connection:
+            async with await connection.cursor() as cursor:
+                await cursor.execute(self._create_table_query())
+                await cursor.execute(*self._checksum_column_query())
+                (count,) = await cursor.fetchone()
+                if not count:
+                    await cursor.execute(self._add_checksum_column_query())
+
+    async def drop_table_migration(self) -> None:
+        async with self._connect() as connection:
+            async with await connection.cursor() as cursor:
+                await cursor.execute(self._drop_table_query())
+
+    async def get_head_revision(self) -> RevisionRecord | None:
+        async with self._connect() as connection:
+            async with await connection.cursor(dictionary=True) as cursor:
+                await cursor.execute(self._head_query())
+                row = await cursor.fetchone()
+                if not row:
+                    return None
+
+                return self._to_record(row)
+
+    async def migrate_up(self, revision: RevisionRecord, record: bool = True) -> int:
+        async with self._connect() as connection:
+            await self._execute_statements(
+                connection,
+                revision,
+                revision.up_statements(self.dialect),
+                f"the UP SQL of revision {revision.revision_id}",
+            )
+
+            if not record:
+                return 0
+
+            async with await connection.cursor() as cursor:
+                await cursor.execute(
+                    self._insert_query(), self._insert_params(revision, datetime.now())
                 )
+                return cursor.rowcount
+
+    async def record_migrations(self, revisions: list[RevisionRecord]) -> int:
+        async with self._connect() as connection:
+            async with await connection.cursor() as cursor:
+                await cursor.executemany(
+                    self._insert_query(), self._records_params(revisions)
+                )
+                return cursor.rowcount
+
+    async def migrate_down(self, revision: RevisionRecord) -> int:
+        async with self._connect() as connection:
+            await self._execute_statements(
+                connection,
+                revision,
+                revision.down_statements(self.dialect),
+                f"the DOWN SQL of revision {revision.revision_id}",
+            )
+
+            async with await connection.cursor() as cursor:
+                await cursor.execute(
+                    self._delete_query(), {"revision_id": revision.revision_id}
+                )
+                return cursor.rowcount
+
+    async def list_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        async with self._connect() as connection:
+            async with await connection.cursor(dictionary=True) as cursor:
+                await cursor.execute(*self._list_query(author, tags, created_at))
+                rows = await cursor.fetchall()
 
-            return revisions
\ No newline at end of file
+                return [self._to_record(row) for row in rows]
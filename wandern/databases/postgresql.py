@@ -1,141 +1,186 @@
-from datetime import datetime
+import re
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
 from typing import Any
 
 try:
     import psycopg
     from psycopg.connection import Connection
+    from psycopg.connection_async import AsyncConnection
+    from psycopg.cursor import Cursor
+    from psycopg.cursor_async import AsyncCursor
+    from psycopg.pq import TransactionStatus
     from psycopg.rows import DictRow, dict_row
-    from psycopg.sql import SQL, Identifier
+    from psycopg.sql import SQL, Identifier, Literal
 except ModuleNotFoundError as exc:
     raise ImportError(
         "psycopg is required for PostgreSQL support. "
         'Install it with: pip install "wandern[postgresql]"'
     ) from exc
 
-from wandern.databases.base import BaseProvider
+from wandern.databases.base import (
+    AsyncBaseProvider,
+    BaseProvider,
+    revision_timeouts,
+)
 from wandern.exceptions import ConnectError
-from wandern.models import Config, Revision
+from wandern.models import Config, DatabaseProviders, RevisionRecord
+from wandern.statements import Statement, execute_statements, execute_statements_async
 
+# statements sent in pipeline mode before waiting for their results
+PIPELINE_SYNC_INTERVAL = 1000
 
-class PostgresProvider(BaseProvider):
-    def __init__(self, config: Config):
-        self.config = config
+# a failed CREATE INDEX CONCURRENTLY leaves an invalid index behind, that is
+# dropped before the statement is run again
+REGEX_CREATE_INDEX_CONCURRENTLY = re.compile(
+    r"\bCREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+    r'(?!ON\s)(?P<name>"(?:[^"]|"")+"|[^\s"(]+)',
+    re.IGNORECASE,
+)
 
-    def connect(self) -> Connection[DictRow]:
-        try:
-            return psycopg.connect(
-                self.config.dsn,
-                autocommit=True,
-                row_factory=dict_row,  # type: ignore
+
+class _PostgresQueries:
+    """Queries on the migration table, shared by the sync and async providers"""
+
+    dialect = DatabaseProviders.POSTGRESQL
+    config: Config
+
+    def _table(self) -> Identifier:
+        schema = self.config.db_schema or "public"
+        return Identifier(schema, self.config.migration_table)
+
+    def _search_path_query(self) -> SQL:
+        return SQL("SET search_path TO {schema}").format(
+            schema=Identifier(self.config.db_schema)  # type: ignore
+        )
+
+    def _schemas_query(self) -> SQL:
+        return SQL(
+            """
+            SELECT n.nspname AS schema_name, c.oid IS NOT NULL AS migrated
+            FROM pg_catalog.pg_namespace n
+            LEFT JOIN pg_catalog.pg_class c
+                ON c.relnamespace = n.oid
+                AND c.relname = %(table)s
+                AND c.relkind IN ('r', 'p')
+            WHERE n.nspname LIKE %(pattern)s
+            ORDER BY n.nspname
+            """
+        )
+
+    def _schema_heads_query(self, schemas: list[str]) -> SQL:
+        # the heads of all the migration tables are read by a single query,
+        # instead of one query per schema
+        return SQL(" UNION ALL ").join(
+            SQL(
+                """
+                (SELECT {schema} AS schema_name, revision_id FROM {table}
+                    ORDER BY created_at DESC LIMIT 1)
+                """
+            ).format(
+                schema=Literal(schema),
+                table=Identifier(schema, self.config.migration_table),
             )
-        except Exception as exc:
-            raise ConnectError(
-                "Failed to connect to the database"
-                f"\nIs your database server running on '{self.config.dsn}'?"
-            ) from exc
+            for schema in schemas
+        )
 
-    def create_table_migration(self):
+    def _create_table_queries(self) -> list[SQL]:
         query = SQL(
             """
-            CREATE TABLE IF NOT EXISTS public.{table} (
+            CREATE TABLE IF NOT EXISTS {table} (
                 revision_id TEXT PRIMARY KEY NOT NULL,
                 down_revision_id TEXT,
                 message VARCHAR(255),
                 tags TEXT[] DEFAULT NULL,
                 author VARCHAR(255) DEFAULT NULL,
-                created_at TIMESTAMP DEFAULT NOW()
+                created_at TIMESTAMP DEFAULT NOW(),
+                checksum TEXT DEFAULT NULL
             )
             """
-        ).format(table=Identifier(self.config.migration_table))
-
-        with self.connect() as connection:
-            connection.execute(query)
+        ).format(table=self._table())
+        # tables created before checksums were recorded
+        add_checksum = SQL(
+            """
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS checksum TEXT
+            """
+        ).format(table=self._table())
 
-    def drop_table_migration(self):
-        query = SQL("""DROP TABLE IF EXISTS public.{table}""").format(
-            table=Identifier(self.config.migration_table)
-        )
+        return [query, add_checksum]
 
-        with self.connect() as connection:
-            connection.execute(query)
+    def _drop_table_query(self) -> SQL:
+        return SQL("""DROP TABLE IF EXISTS {table}""").format(table=self._table())
 
-    def get_head_revision(self) -> Revision | None:
-        query = SQL(
+    def _head_query(self) -> SQL:
+        return SQL(
             """
-            SELECT * FROM public.{table}
+            SELECT * FROM {table}
                 ORDER BY created_at DESC LIMIT 1
             """
-        ).format(table=Identifier(self.config.migration_table))
-
-        with self.connect() as connection:
-            result = connection.execute(query)
-            row = result.fetchone()
-            if not row:
-                return None
-            return Revision(**row)
+        ).format(table=self._table())
 
-    def migrate_up(self, revision: Revision):
-        query = SQL(
+    def _insert_query(self) -> SQL:
+        return SQL(
             """
-            INSERT INTO public.{table}
+            INSERT INTO {table}
+                (
+                    revision_id,
+                    down_revision_id,
+                    message,
+                    tags,
+                    author,
+                    created_at,
+                    checksum
+                )
                 VALUES (
                     %(revision_id)s,
                     %(down_revision_id)s,
                     %(message)s,
                     %(tags)s,
                     %(author)s,
-                    %(created_at)s
+                    %(created_at)s,
+                    %(checksum)s
                 )
             """
-        ).format(table=Identifier(self.config.migration_table))
+        ).format(table=self._table())
 
-        with self.connect() as connection:
-            with connection.transaction():  # Begin transaction
-                if revision.up_sql:
-                    connection.execute(revision.up_sql)  # type: ignore
-
-                result = connection.execute(
-                    query,
-                    params={
-                        "revision_id": revision.revision_id,
-                        "down_revision_id": revision.down_revision_id,
-                        "message": revision.message,
-                        "tags": revision.tags,
-                        "author": revision.author,
-                        "created_at": datetime.now(),
-                    },
-                )
+    @staticmethod
+    def _insert_params(revision: RevisionRecord, created_at: datetime) -> dict:
+        return {
+            "revision_id": revision.revision_id,
+            "down_revision_id": revision.down_revision_id,
+            "message": revision.message,
+            "tags": revision.tags,
+            "author": revision.author,
+            "created_at": created_at,
+            "checksum": revision.checksum,
+        }
 
-                return result.rowcount
+    @classmethod
+    def _records_params(cls, revisions: list[RevisionRecord]) -> list[dict]:
+        # one microsecond apart, the last revision stays the head
+        now = datetime.now()
+        return [
+            cls._insert_params(revision, now + timedelta(microseconds=i))
+            for i, revision in enumerate(revisions)
+        ]
 
-    def migrate_down(self, revision: Revision) -> int:
-        query = SQL(
+    def _delete_query(self) -> SQL:
+        return SQL(
             """
-            DELETE FROM public.{table}
+            DELETE FROM {table}
                 WHERE revision_id = %(revision_id)s
             """
-        ).format(table=Identifier(self.config.migration_table))
+        ).format(table=self._table())
 
-        with self.connect() as connection:
-            with connection.transaction():  # BEGIN
-                if revision.down_sql:
-                    connection.execute(revision.down_sql)  # type: ignore
-
-                result = connection.execute(
-                    query,
-                    params={"revision_id": revision.revision_id},
-                )
-
-                return result.rowcount
-
-    def list_migrations(
+    def _list_query(
         self,
         author: str | None = None,
         tags: list[str] | None = None,
         created_at: datetime | None = None,
-    ) -> list[Revision]:
+    ) -> tuple[SQL, dict[str, Any]]:
         base_query = """
-            SELECT * FROM public.{table}
+            SELECT * FROM {table}
         """
 
         where_clause = []
@@ -155,10 +200,514 @@ class PostgresProvider(BaseProvider):
             base_query += f" WHERE {' AND '.join(where_clause)}"
         base_query += " ORDER BY created_at DESC"
 
-        query = SQL(base_query).format(table=Identifier(self.config.migration_table))
+        query = SQL(base_query).format(table=self._table())
+        return query, params
+
+    @staticmethod
+    def _invalid_index_query() -> SQL:
+        return SQL(
+            """
+            SELECT n.nspname AS schema_name, c.relname AS index_name
+                FROM pg_catalog.pg_index i
+                JOIN pg_catalog.pg_class c ON c.oid = i.indexrelid
+                JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                WHERE i.indexrelid = to_regclass(%(name)s) AND NOT i.indisvalid
+            """
+        )
+
+    @staticmethod
+    def _drop_index_query(row: DictRow) -> SQL:
+        return SQL("DROP INDEX CONCURRENTLY IF EXISTS {index}").format(
+            index=Identifier(row["schema_name"], row["index_name"])
+        )
+
+    def _timeout_settings(self, revision: RevisionRecord) -> dict[str, str | None]:
+        lock_timeout, statement_timeout = revision_timeouts(revision, self.config)
+        timeouts = {
+            "lock_timeout": lock_timeout,
+            "statement_timeout": statement_timeout,
+        }
+        return {
+            name: None if seconds is None else f"{round(seconds * 1000)}ms"
+            for name, seconds in timeouts.items()
+        }
+
+    @staticmethod
+    def _set_config_query(settings: dict[str, str | None], local: bool) -> SQL:
+        # a setting of None is set back to its default
+        return SQL("; ").join(
+            SQL("SET {scope} {name} TO {value}").format(
+                scope=SQL("LOCAL" if local else "SESSION"),
+                name=Identifier(name),
+                value=SQL("DEFAULT") if value is None else Literal(value),
+            )
+            for name, value in settings.items()
+        )
+
+    @staticmethod
+    def _reset_query(settings: dict[str, str | None]) -> SQL:
+        return SQL("; ").join(
+            SQL("RESET {name}").format(name=Identifier(name)) for name in settings
+        )
+
+    @staticmethod
+    def is_lock_timeout(exc: Exception) -> bool:
+        return isinstance(exc, psycopg.errors.LockNotAvailable)
+
+    def _connect_error(self) -> ConnectError:
+        return ConnectError(
+            "Failed to connect to the database"
+            f"\nIs your database server running on '{self.config.dsn}'?"
+        )
+
+
+def _add_failed_statement_note(
+    exc: Exception,
+    sent: list[tuple[Cursor[DictRow], Statement]]
+    | list[tuple[AsyncCursor[DictRow], Statement]],
+    location: str,
+) -> None:
+    # results are attached to the cursors in order, up to the failed statement
+    for cursor, statement in sent:
+        if cursor.pgresult is None:
+            exc.add_note(f"In the statement on line {statement.line} of {location}")
+            return
+
+
+class PostgresProvider(_PostgresQueries, BaseProvider):
+    def __init__(self, config: Config):
+        self.config = config
+        self._session: Connection[DictRow] | None = None
+
+    def connect(self) -> Connection[DictRow]:
+        try:
+            connection = psycopg.connect(
+                self.config.dsn,
+                autocommit=True,
+                row_factory=dict_row,  # type: ignore
+            )
+        except Exception as exc:
+            raise self._connect_error() from exc
+
+        if self.config.db_schema:
+            connection.execute(self._search_path_query())
+        return connection
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Run every call made inside the block on one connection, instead of
+        connecting for each of them.
+        """
+        if self._session is not None:
+            yield
+            return
+
+        self._session = self.connect()
+        try:
+            yield
+        finally:
+            self._session.close()
+            self._session = None
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        """Run every call made inside the block in a single transaction, that
+        is committed at the end of the block or rolled back if it raises.
+        """
+        with self.session():
+            # the transactions of the calls become savepoints inside it
+            with self._session.transaction():  # type: ignore
+                yield
+
+    @contextmanager
+    def _connect(self) -> Iterator[Connection[DictRow]]:
+        if self._session is not None:
+            yield self._session
+            return
 
         with self.connect() as connection:
+            yield connection
+
+    def create_table_migration(self):
+        with self._connect() as connection:
+            for query in self._create_table_queries():
+                connection.execute(query)
+
+    def drop_table_migration(self):
+        with self._connect() as connection:
+            connection.execute(self._drop_table_query())
+
+    def get_head_revision(self) -> RevisionRecord | None:
+        with self._connect() as connection:
+            result = connection.execute(self._head_query())
+            row = result.fetchone()
+            if not row:
+                return None
+            return RevisionRecord(**row)
+
+    def _execute_outside_transaction(
+        self, connection: Connection[DictRow], sql: str
+    ) -> Cursor[DictRow]:
+        if match := REGEX_CREATE_INDEX_CONCURRENTLY.search(sql):
+            invalid = connection.execute(
+                self._invalid_index_query(), {"name": match["name"]}
+            ).fetchone()
+            if invalid:
+                connection.execute(self._drop_index_query(invalid))
+        return connection.execute(sql)  # type: ignore
+
+    def _execute_revision(
+        self,
+        connection: Connection[DictRow],
+        revision: RevisionRecord,
+        statements: Iterable[Statement],
+        location: str,
+        query: SQL | None = None,
+        params: dict | None = None,
+    ) -> int:
+        """Execute the statements of `revision` and then its bookkeeping
+        `query`, in one transaction and bound by the timeouts of the revision.
+        Returns the rowcount of the query.
+
+        The statements of a revision that is not transactional are committed
+        one by one, and the query is only executed once all of them succeeded.
+        """
+        settings = self._timeout_settings(revision)
+        # inside an atomic upgrade, the timeouts set by the revisions before
+        # this one last until the end of the transaction, and are reset
+        nested = connection.info.transaction_status != TransactionStatus.IDLE
+        if not nested:
+            settings = {name: value for name, value in settings.items() if value}
+        if not revision.transactional:
+            if settings:
+                connection.execute(self._set_config_query(settings, local=False))
+            try:
+                execute_statements(
+                    lambda sql: self._execute_outside_transaction(connection, sql),
+                    statements,
+                    location,
+                )
+            finally:
+                if settings and not connection.broken:
+                    connection.execute(self._reset_query(settings))
+            if query is None:
+                return 0
+            return connection.execute(query, params=params).rowcount
+
+        with connection.transaction():  # BEGIN
+            if settings:
+                # until the end of the transaction
+                connection.execute(self._set_config_query(settings, local=True))
+            if not self.config.pipeline:
+                execute_statements(
+                    connection.execute,  # type: ignore
+                    statements,
+                    location,
+                )
+                if query is None:
+                    return 0
+                return connection.execute(query, params=params).rowcount
+
+            # sent without waiting for each result, the cursors of the
+            # statements since the last sync tell which one failed
+            sent: list[tuple[Cursor[DictRow], Statement]] = []
+            result: Cursor[DictRow] | None = None
+            try:
+                with connection.pipeline() as pipeline:
+                    for statement in statements:
+                        cursor = connection.execute(statement.sql)  # type: ignore
+                        sent.append((cursor, statement))
+                        if len(sent) >= PIPELINE_SYNC_INTERVAL:
+                            pipeline.sync()
+                            sent.clear()
+                    if query is not None:
+                        result = connection.execute(query, params=params)
+            except psycopg.Error as exc:
+                _add_failed_statement_note(exc, sent, location)
+                raise
+
+            return result.rowcount if result is not None else 0
+
+    def migrate_up(self, revision: RevisionRecord, record: bool = True):
+        query, params = None, None
+        if record:
+            query = self._insert_query()
+            params = self._insert_params(revision, datetime.now())
+
+        with self._connect() as connection:
+            return self._execute_revision(
+                connection,
+                revision,
+                revision.up_statements(self.dialect),
+                f"the UP SQL of revision {revision.revision_id}",
+                query,
+                params,
+            )
+
+    def record_migrations(self, revisions: list[RevisionRecord]) -> int:
+        with self._connect() as connection:
+            with connection.transaction(), connection.cursor() as cursor:
+                cursor.executemany(
+                    self._insert_query(), self._records_params(revisions)
+                )
+
+                return cursor.rowcount
+
+    def migrate_down(self, revision: RevisionRecord) -> int:
+        with self._connect() as connection:
+            return self._execute_revision(
+                connection,
+                revision,
+                revision.down_statements(self.dialect),
+                f"the DOWN SQL of revision {revision.revision_id}",
+                self._delete_query(),
+                {"revision_id": revision.revision_id},
+            )
+
+    def list_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        query, params = self._list_query(author, tags, created_at)
+
+        with self._connect() as connection:
             result = connection.execute(query, params=params)
             rows = result.fetchall()
 
-            return [Revision(**row) for row in rows]
+            return [RevisionRecord(**row) for row in rows]
+
+
+class AsyncPostgresProvider(_PostgresQueries, AsyncBaseProvider):
+    """`PostgresProvider` on psycopg's `AsyncConnection`"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._session: AsyncConnection[DictRow] | None = None
+
+    async def connect(self) -> AsyncConnection[DictRow]:
+        try:
+            connection = await psycopg.AsyncConnection.connect(
+                self.config.dsn,
+                autocommit=True,
+                row_factory=dict_row,  # type: ignore
+            )
+        except Exception as exc:
+            raise self._connect_error() from exc
+
+        if self.config.db_schema:
+            await connection.execute(self._search_path_query())
+        return connection
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[None]:
+        """Run every call made inside the block on one connection, instead of
+        connecting for each of them.
+        """
+        if self._session is not None:
+            yield
+            return
+
+        self._session = await self.connect()
+        try:
+            yield
+        finally:
+            await self._session.close()
+            self._session = None
+
+    @asynccontextmanager
+    async def use_connection(
+        self, connection: AsyncConnection[DictRow]
+    ) -> AsyncIterator[None]:
+        """Run every call made inside the block on `connection`, an open
+        connection shared with other providers such as one of a pool. Its
+        search_path is set to the schema of this provider first.
+        """
+        if self.config.db_schema:
+            await connection.execute(self._search_path_query())
+
+        self._session = connection
+        try:
+            yield
+        finally:
+            self._session = None
+
+    @asynccontextmanager
+    async def atomic(self) -> AsyncIterator[None]:
+        """Run every call made inside the block in a single transaction, that
+        is committed at the end of the block or rolled back if it raises.
+        """
+        async with self.session():
+            # the transactions of the calls become savepoints inside it
+            async with self._session.transaction():  # type: ignore
+                yield
+
+    @asynccontextmanager
+    async def _connect(self) -> AsyncIterator[AsyncConnection[DictRow]]:
+        if self._session is not None:
+            yield self._session
+            return
+
+        async with await self.connect() as connection:
+            yield connection
+
+    async def create_table_migration(self):
+        async with self._connect() as connection:
+            for query in self._create_table_queries():
+                await connection.execute(query)
+
+    async def drop_table_migration(self):
+        async with self._connect() as connection:
+            await connection.execute(self._drop_table_query())
+
+    async def get_head_revision(self) -> RevisionRecord | None:
+        async with self._connect() as connection:
+            result = await connection.execute(self._head_query())
+            row = await result.fetchone()
+            if not row:
+                return None
+            return RevisionRecord(**row)
+
+    async def get_schema_heads(self, pattern: str) -> dict[str, str | None]:
+        """The revision_id of the head of the migration table of every schema
+        whose name is LIKE `pattern`, in two queries whatever their number. It
+        is None for the schemas without migrations.
+        """
+        async with self._connect() as connection:
+            result = await connection.execute(
+                self._schemas_query(),
+                params={"table": self.config.migration_table, "pattern": pattern},
+            )
+            rows = await result.fetchall()
+            heads: dict[str, str | None] = {row["schema_name"]: None for row in rows}
+
+            migrated = [row["schema_name"] for row in rows if row["migrated"]]
+            if migrated:
+                result = await connection.execute(self._schema_heads_query(migrated))
+                for row in await result.fetchall():
+                    heads[row["schema_name"]] = row["revision_id"]
+
+            return heads
+
+    async def _execute_outside_transaction(
+        self, connection: AsyncConnection[DictRow], sql: str
+    ) -> AsyncCursor[DictRow]:
+        if match := REGEX_CREATE_INDEX_CONCURRENTLY.search(sql):
+            result = await connection.execute(
+                self._invalid_index_query(), {"name": match["name"]}
+            )
+            if invalid := await result.fetchone():
+                await connection.execute(self._drop_index_query(invalid))
+        return await connection.execute(sql)  # type: ignore
+
+    async def _execute_revision(
+        self,
+        connection: AsyncConnection[DictRow],
+        revision: RevisionRecord,
+        statements: Iterable[Statement],
+        location: str,
+        query: SQL | None = None,
+        params: dict | None = None,
+    ) -> int:
+        """See `PostgresProvider._execute_revision`"""
+        settings = self._timeout_settings(revision)
+        nested = connection.info.transaction_status != TransactionStatus.IDLE
+        if not nested:
+            settings = {name: value for name, value in settings.items() if value}
+        if not revision.transactional:
+            if settings:
+                await connection.execute(self._set_config_query(settings, local=False))
+            try:
+                await execute_statements_async(
+                    lambda sql: self._execute_outside_transaction(connection, sql),
+                    statements,
+                    location,
+                )
+            finally:
+                if settings and not connection.broken:
+                    await connection.execute(self._reset_query(settings))
+            if query is None:
+                return 0
+            return (await connection.execute(query, params=params)).rowcount
+
+        async with connection.transaction():  # BEGIN
+            if settings:
+                await connection.execute(self._set_config_query(settings, local=True))
+            if not self.config.pipeline:
+                await execute_statements_async(
+                    connection.execute,  # type: ignore
+                    statements,
+                    location,
+                )
+                if query is None:
+                    return 0
+                return (await connection.execute(query, params=params)).rowcount
+
+            sent: list[tuple[AsyncCursor[DictRow], Statement]] = []
+            result: AsyncCursor[DictRow] | None = None
+            try:
+                async with connection.pipeline() as pipeline:
+                    for statement in statements:
+                        cursor = await connection.execute(statement.sql)  # type: ignore
+                        sent.append((cursor, statement))
+                        if len(sent) >= PIPELINE_SYNC_INTERVAL:
+                            await pipeline.sync()
+                            sent.clear()
+                    if query is not None:
+                        result = await connection.execute(query, params=params)
+            except psycopg.Error as exc:
+                _add_failed_statement_note(exc, sent, location)
+                raise
+
+            return result.rowcount if result is not None else 0
+
+    async def migrate_up(self, revision: RevisionRecord, record: bool = True):
+        query, params = None, None
+        if record:
+            query = self._insert_query()
+            params = self._insert_params(revision, datetime.now())
+
+        async with self._connect() as connection:
+            return await self._execute_revision(
+                connection,
+                revision,
+                revision.up_statements(self.dialect),
+                f"the UP SQL of revision {revision.revision_id}",
+                query,
+                params,
+            )
+
+    async def record_migrations(self, revisions: list[RevisionRecord]) -> int:
+        async with self._connect() as connection:
+            async with connection.transaction(), connection.cursor() as cursor:
+                await cursor.executemany(
+                    self._insert_query(), self._records_params(revisions)
+                )
+
+                return cursor.rowcount
+
+    async def migrate_down(self, revision: RevisionRecord) -> int:
+        async with self._connect() as connection:
+            return await self._execute_revision(
+                connection,
+                revision,
+                revision.down_statements(self.dialect),
+                f"the DOWN SQL of revision {revision.revision_id}",
+                self._delete_query(),
+                {"revision_id": revision.revision_id},
+            )
+
+    async def list_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        query, params = self._list_query(author, tags, created_at)
+
+        async with self._connect() as connection:
+            result = await connection.execute(query, params=params)
+            rows = await result.fetchall()
+
+            return [RevisionRecord(**row) for row in rows]
@@ -17,3 +17,21 @@ def get_database_impl(provider: DatabaseProviders | str, config: Config):
         return MySQLProvider(config=config)
     else:
         raise NotImplementedError(f"Provider {provider!s} is not implemented yet!")
+
+
+def get_async_database_impl(provider: DatabaseProviders | str, config: Config):
+    provider = DatabaseProviders(provider)
+    if provider == DatabaseProviders.POSTGRESQL:
+        from wandern.databases.postgresql import AsyncPostgresProvider
+
+        return AsyncPostgresProvider(config=config)
+    elif provider == DatabaseProviders.SQLITE:
+        from wandern.databases.sqlite import AsyncSQLiteProvider
+
+        return AsyncSQLiteProvider(config=config)
+    elif provider == DatabaseProviders.MYSQL:
+        from wandern.databases.mysql import AsyncMySQLProvider
+
+        return AsyncMySQLProvider(config=config)
+    else:
+        raise NotImplementedError(f"Provider {provider!s} is not implemented yet!")
@@ -1,14 +1,32 @@
+import asyncio
+import functools
 import sqlite3
-from datetime import datetime
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import (
+    AbstractAsyncContextManager,
+    AbstractContextManager,
+    asynccontextmanager,
+    contextmanager,
+)
+from datetime import datetime, timedelta
+from typing import TypeVar
 
-from wandern.databases.base import BaseProvider
+from wandern.databases.base import AsyncBaseProvider, BaseProvider, revision_timeouts
 from wandern.exceptions import ConnectError
-from wandern.models import Config, Revision
+from wandern.models import Config, DatabaseProviders, RevisionRecord
+from wandern.statements import Statement, execute_statements
+
+T = TypeVar("T")
 
 
 class SQLiteProvider(BaseProvider):
+    dialect = DatabaseProviders.SQLITE
+
     def __init__(self, config: Config):
         self.config = config
+        self._session: sqlite3.Connection | None = None
+        self._atomic = False
 
     def connect(self) -> sqlite3.Connection:
         try:
@@ -30,6 +48,56 @@ class SQLiteProvider(BaseProvider):
                 f"\nIs your database server running on '{self.config.dsn}'?"
             ) from exc
 
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Run every call made inside the block on one connection, instead of
+        connecting for each of them.
+        """
+        if self._session is not None:
+            yield
+            return
+
+        self._session = self.connect()
+        try:
+            yield
+        finally:
+            self._session.close()
+            self._session = None
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        """Run every call made inside the block in a single transaction, that
+        is committed at the end of the block or rolled back if it raises.
+        """
+        with self.session():
+            if self._atomic:
+                yield
+                return
+
+            connection: sqlite3.Connection = self._session  # type: ignore
+            connection.execute("BEGIN")
+            self._atomic = True
+            try:
+                yield
+            except BaseException:
+                connection.rollback()
+                raise
+            else:
+                connection.commit()
+            finally:
+                self._atomic = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if self._atomic:
+            yield self._session  # type: ignore
+            return
+
+        # committed at the end of every call, as with a connection of its own
+        connection = self._session if self._session is not None else self.connect()
+        with connection:
+            yield connection
+
     def create_table_migration(self) -> None:
         query = f"""
         CREATE TABLE IF NOT EXISTS {self.config.migration_table} (
@@ -38,28 +106,38 @@ class SQLiteProvider(BaseProvider):
             message TEXT,
             tags TEXT,
             author TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            checksum TEXT
         )
         """
 
-        with self.connect() as connection:
+        with self._connect() as connection:
             connection.execute(query)
 
+            # tables created before checksums were recorded
+            columns = connection.execute(
+                f"PRAGMA table_info({self.config.migration_table})"
+            ).fetchall()
+            if "checksum" not in {column["name"] for column in columns}:
+                connection.execute(
+                    f"ALTER TABLE {self.config.migration_table} ADD COLUMN checksum TEXT"
+                )
+
     def drop_table_migration(self) -> None:
         query = f"""
         DROP TABLE IF EXISTS {self.config.migration_table}
         """
 
-        with self.connect() as connection:
+        with self._connect() as connection:
             connection.execute(query)
 
-    def get_head_revision(self) -> Revision | None:
+    def get_head_revision(self) -> RevisionRecord | None:
         query = f"""
         SELECT * FROM {self.config.migration_table}
         ORDER BY created_at DESC LIMIT 1
         """
 
-        with self.connect() as connection:
+        with self._connect() as connection:
             result = connection.execute(query)
             row = result.fetchone()
             if not row:
@@ -68,7 +146,7 @@ class SQLiteProvider(BaseProvider):
             # Convert tags from TEXT to list
             tags = row["tags"].split(",") if row["tags"] else []
 
-            return Revision(
+            return RevisionRecord(
                 revision_id=row["revision_id"],
                 down_revision_id=row["down_revision_id"],
                 message=row["message"] or "",
@@ -79,42 +157,117 @@ class SQLiteProvider(BaseProvider):
                     if row["created_at"]
                     else datetime.now()
                 ),
+                checksum=row["checksum"],
             )
 
-    def migrate_up(self, revision: Revision) -> int:
-        query = f"""
+    def _insert_query(self) -> str:
+        return f"""
         INSERT INTO {self.config.migration_table}
-            (revision_id, down_revision_id, message, tags, author, created_at)
-        VALUES (:revision_id, :down_revision_id, :message, :tags, :author, :created_at)
+            (revision_id, down_revision_id, message, tags, author, created_at, checksum)
+        VALUES (
+            :revision_id, :down_revision_id, :message, :tags, :author, :created_at,
+            :checksum
+        )
         """
 
-        with self.connect() as connection:
-            if revision.up_sql:
-                connection.execute(revision.up_sql)
+    @staticmethod
+    def _insert_params(revision: RevisionRecord, created_at: datetime) -> dict:
+        return {
+            "revision_id": revision.revision_id,
+            "down_revision_id": revision.down_revision_id,
+            "message": revision.message,
+            "tags": ",".join(revision.tags) if revision.tags else None,
+            "author": revision.author,
+            "created_at": created_at.isoformat(),
+            "checksum": revision.checksum,
+        }
+
+    @staticmethod
+    def is_lock_timeout(exc: Exception) -> bool:
+        return isinstance(exc, sqlite3.OperationalError) and exc.sqlite_errorcode in (
+            sqlite3.SQLITE_BUSY,
+            sqlite3.SQLITE_LOCKED,
+        )
+
+    def _execute_revision(
+        self,
+        connection: sqlite3.Connection,
+        revision: RevisionRecord,
+        statements: Iterable[Statement],
+        location: str,
+    ) -> None:
+        # waits for the locks of other connections up to the lock timeout
+        lock_timeout, _ = revision_timeouts(revision, self.config)
+        if lock_timeout is not None:
+            (busy_timeout,) = connection.execute("PRAGMA busy_timeout").fetchone()
+            connection.execute(f"PRAGMA busy_timeout = {round(lock_timeout * 1000)}")
+
+        try:
+            if revision.transactional:
+                if not self._atomic:
+                    # sqlite3 opens no transaction before DDL statements, they
+                    # are rolled back with the revision once it is explicit
+                    connection.execute("BEGIN")
+                # one at a time, executescript would commit a pending transaction
+                execute_statements(connection.execute, statements, location)
+                return
+
+            # committed one by one, e.g. VACUUM can not run inside a transaction
+            def execute(sql: str) -> None:
+                connection.execute(sql)
+                connection.commit()
+
+            connection.commit()
+            execute_statements(execute, statements, location)
+        finally:
+            if lock_timeout is not None:
+                connection.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+
+    def migrate_up(self, revision: RevisionRecord, record: bool = True) -> int:
+        with self._connect() as connection:
+            self._execute_revision(
+                connection,
+                revision,
+                revision.up_statements(self.dialect),
+                f"the UP SQL of revision {revision.revision_id}",
+            )
+
+            if not record:
+                return 0
 
             cursor = connection.execute(
-                query,
-                {
-                    "revision_id": revision.revision_id,
-                    "down_revision_id": revision.down_revision_id,
-                    "message": revision.message,
-                    "tags": ",".join(revision.tags) if revision.tags else None,
-                    "author": revision.author,
-                    "created_at": datetime.now().isoformat(),
-                },
+                self._insert_query(), self._insert_params(revision, datetime.now())
+            )
+
+            return cursor.rowcount
+
+    def record_migrations(self, revisions: list[RevisionRecord]) -> int:
+        # one microsecond apart, the last revision stays the head
+        now = datetime.now()
+        with self._connect() as connection:
+            cursor = connection.executemany(
+                self._insert_query(),
+                [
+                    self._insert_params(revision, now + timedelta(microseconds=i))
+                    for i, revision in enumerate(revisions)
+                ],
             )
 
             return cursor.rowcount
 
-    def migrate_down(self, revision: Revision) -> int:
+    def migrate_down(self, revision: RevisionRecord) -> int:
         query = f"""
         DELETE FROM {self.config.migration_table}
         WHERE revision_id = :revision_id
         """
 
-        with self.connect() as connection:
-            if revision.down_sql:
-                connection.execute(revision.down_sql)
+        with self._connect() as connection:
+            self._execute_revision(
+                connection,
+                revision,
+                revision.down_statements(self.dialect),
+                f"the DOWN SQL of revision {revision.revision_id}",
+            )
 
             cursor = connection.execute(query, {"revision_id": revision.revision_id})
 
@@ -125,7 +278,7 @@ class SQLiteProvider(BaseProvider):
         author: str | None = None,
         tags: list[str] | None = None,
         created_at: datetime | None = None,
-    ) -> list[Revision]:
+    ) -> list[RevisionRecord]:
         base_query = f"""
         SELECT * FROM {self.config.migration_table}
         """
@@ -159,7 +312,7 @@ class SQLiteProvider(BaseProvider):
             base_query += f" WHERE {' AND '.join(where_clause)}"
         base_query += " ORDER BY created_at DESC"
 
-        with self.connect() as connection:
+        with self._connect() as connection:
             result = connection.execute(base_query, params)
             rows = result.fetchall()
 
@@ -169,7 +322,7 @@ class SQLiteProvider(BaseProvider):
                 tags_list = row["tags"].split(",") if row["tags"] else []
 
                 revisions.append(
-                    Revision(
+                    RevisionRecord(
                         revision_id=row["revision_id"],
                         down_revision_id=row["down_revision_id"],
                         message=row["message"] or "",
@@ -180,7 +333,106 @@ class SQLiteProvider(BaseProvider):
                             if row["created_at"]
                             else datetime.now()
                         ),
+                        checksum=row["checksum"],
                     )
                 )
 
             return revisions
+
+
+class AsyncSQLiteProvider(AsyncBaseProvider):
+    """`SQLiteProvider` on a worker thread of its own.
+
+    sqlite3 has no asyncio interface and its connections can only be used by
+    the thread that opened them, so every call of a provider runs on the same
+    dedicated thread, keeping the event loop free.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._provider = SQLiteProvider(config)
+        self._executor: ThreadPoolExecutor | None = None
+        # calls and entered contexts using the worker thread
+        self._users = 0
+
+    @asynccontextmanager
+    async def _worker(self) -> AsyncIterator[ThreadPoolExecutor]:
+        # started on first use and stopped once unused, so that the providers
+        # of a fan-out do not leave an idle thread each behind them
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="wandern-sqlite"
+            )
+        executor = self._executor
+        self._users += 1
+        try:
+            yield executor
+        finally:
+            self._users -= 1
+            if not self._users:
+                self._executor = None
+                executor.shutdown(wait=False)
+
+    async def _run(self, function: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        async with self._worker() as executor:
+            return await loop.run_in_executor(
+                executor, functools.partial(function, *args, **kwargs)
+            )
+
+    @asynccontextmanager
+    async def _enter(
+        self, context: AbstractContextManager[None]
+    ) -> AsyncIterator[None]:
+        # entered and exited on the worker thread, like the calls inside it
+        async with self._worker():
+            await self._run(context.__enter__)
+            try:
+                yield
+            except BaseException as exc:
+                await self._run(context.__exit__, type(exc), exc, exc.__traceback__)
+                raise
+            else:
+                await self._run(context.__exit__, None, None, None)
+
+    def session(self) -> AbstractAsyncContextManager[None]:
+        """See `SQLiteProvider.session`"""
+        return self._enter(self._provider.session())
+
+    def atomic(self) -> AbstractAsyncContextManager[None]:
+        """See `SQLiteProvider.atomic`"""
+        return self._enter(self._provider.atomic())
+
+    async def create_table_migration(self) -> None:
+        await self._run(self._provider.create_table_migration)
+
+    async def drop_table_migration(self) -> None:
+        await self._run(self._provider.drop_table_migration)
+
+    async def get_head_revision(self) -> RevisionRecord | None:
+        return await self._run(self._provider.get_head_revision)
+
+    async def migrate_up(self, revision: RevisionRecord, record: bool = True) -> int:
+        return await self._run(self._provider.migrate_up, revision, record)
+
+    async def record_migrations(self, revisions: list[RevisionRecord]) -> int:
+        return await self._run(self._provider.record_migrations, revisions)
+
+    async def migrate_down(self, revision: RevisionRecord) -> int:
+        return await self._run(self._provider.migrate_down, revision)
+
+    def is_lock_timeout(self, exc: Exception) -> bool:
+        return self._provider.is_lock_timeout(exc)
+
+    async def list_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        return await self._run(
+            self._provider.list_migrations,
+            author=author,
+            tags=tags,
+            created_at=created_at,
+        )
@@ -18,5 +18,25 @@ class CycleDetected(WandernException):
     pass
 
 
+class OrphanedRevision(WandernException):
+    pass
+
+
+class MultipleRootsError(WandernException):
+    pass
+
+
+class GraphValidationError(GraphErrror):
+    def __init__(self, errors: list[WandernException]):
+        self.errors = errors
+        details = "\n".join(
+            f"- {type(error).__name__}: " + str(error).replace("\n", "\n  ")
+            for error in errors
+        )
+        super().__init__(
+            f"Found {len(errors)} problems in the migration graph:\n{details}"
+        )
+
+
 class ConnectError(WandernException):
     pass
@@ -0,0 +1,187 @@
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+from wandern.graph import MigrationGraph
+from wandern.migration import AsyncMigrationService
+from wandern.models import Config, DatabaseProviders
+
+
+class TargetState(StrEnum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass(slots=True)
+class TargetProgress:
+    """Progress of the upgrade of one database, or schema, of a fan-out"""
+
+    # DSN of the database, or name of the schema
+    name: str
+    state: TargetState = TargetState.PENDING
+    applied: int = 0
+    # revision_id of the last applied revision
+    last: str | None = None
+    error: str | None = None
+
+
+def read_dsn_file(file_path: str | Path) -> list[str]:
+    """One DSN per line, blank lines and lines starting with # are skipped"""
+    with open(file_path, encoding="utf-8") as file:
+        lines = (line.strip() for line in file)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def redact_dsn(dsn: str) -> str:
+    """The DSN without its password, to be displayed"""
+    parts = urlsplit(dsn)
+    if parts.password is None:
+        return dsn
+
+    netloc = parts.netloc.rpartition("@")
+    user = netloc[0].partition(":")[0]
+    return urlunsplit(parts._replace(netloc=f"{user}:***@{netloc[2]}"))
+
+
+def _describe(exc: BaseException) -> str:
+    message = str(exc) or type(exc).__name__
+    return "\n".join([message, *getattr(exc, "__notes__", ())])
+
+
+async def upgrade_targets(
+    config: Config,
+    dsns: list[str],
+    concurrency: int = 8,
+    on_progress: Callable[[list[TargetProgress]], None] | None = None,
+    **upgrade_options,
+) -> list[TargetProgress]:
+    """Upgrade every database of `dsns`, at most `concurrency` at a time.
+
+    The migration graph is built once, from `config`, and shared by all of
+    them. A database that fails is reported in its `TargetProgress` and does
+    not stop the others. `on_progress` is called with all the targets whenever
+    one of them changes, and `upgrade_options` are passed on to
+    `AsyncMigrationService.upgrade`.
+    """
+    graph = MigrationGraph.from_config(config)
+    targets = [TargetProgress(dsn) for dsn in dsns]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def changed() -> None:
+        if on_progress is not None:
+            on_progress(targets)
+
+    async def upgrade(target: TargetProgress) -> None:
+        async with semaphore:
+            target.state = TargetState.RUNNING
+            changed()
+
+            def applied(revision) -> None:
+                target.applied += 1
+                target.last = revision.revision_id
+                changed()
+
+            try:
+                service = AsyncMigrationService(
+                    config.model_copy(update={"dsn": target.name}), graph=graph
+                )
+                await service.upgrade(on_applied=applied, **upgrade_options)
+            except Exception as exc:
+                target.state = TargetState.FAILED
+                target.error = _describe(exc)
+            else:
+                target.state = TargetState.DONE
+            changed()
+
+    await asyncio.gather(*(upgrade(target) for target in targets))
+    return targets
+
+
+async def upgrade_schemas(
+    config: Config,
+    pattern: str,
+    concurrency: int = 8,
+    on_progress: Callable[[list[TargetProgress]], None] | None = None,
+    **upgrade_options,
+) -> list[TargetProgress]:
+    """Upgrade every schema whose name is LIKE `pattern` in the PostgreSQL
+    database of `config`, each with its own migration table.
+
+    The heads of all the schemas are read in one query and the schemas
+    already up to date are not connected to. The others are upgraded on a pool
+    of `concurrency` connections, with the search_path of a connection set to
+    the schema it upgrades. Failures and `on_progress` are handled as with
+    `upgrade_targets`.
+    """
+    if config.dialect != DatabaseProviders.POSTGRESQL:
+        raise ValueError("Migrating schemas is only supported on PostgreSQL")
+
+    from wandern.databases.postgresql import AsyncPostgresProvider
+
+    graph = MigrationGraph.from_config(config)
+    last = graph.get_last_migration()
+    last_id = last.revision_id if last else None
+    catalog = AsyncPostgresProvider(config.model_copy(update={"db_schema": None}))
+    heads = await catalog.get_schema_heads(pattern)
+
+    targets = [TargetProgress(schema) for schema in heads]
+    pending: list[TargetProgress] = []
+    for target in targets:
+        if heads[target.name] == last_id and upgrade_options.get("to") is None:
+            target.state = TargetState.DONE
+        else:
+            pending.append(target)
+
+    def changed() -> None:
+        if on_progress is not None:
+            on_progress(targets)
+
+    changed()
+    if not pending:
+        return targets
+
+    pool: asyncio.Queue = asyncio.Queue()
+    for connection in await asyncio.gather(
+        *(catalog.connect() for _ in range(min(concurrency, len(pending))))
+    ):
+        pool.put_nowait(connection)
+
+    async def upgrade(target: TargetProgress) -> None:
+        connection = await pool.get()
+        target.state = TargetState.RUNNING
+        changed()
+
+        def applied(revision) -> None:
+            target.applied += 1
+            target.last = revision.revision_id
+            changed()
+
+        try:
+            if connection.closed:
+                # lost while upgrading the previous schema
+                connection = await catalog.connect()
+            service = AsyncMigrationService(
+                config.model_copy(update={"db_schema": target.name}), graph=graph
+            )
+            async with service.database.use_connection(connection):
+                await service.upgrade(on_applied=applied, **upgrade_options)
+        except Exception as exc:
+            target.state = TargetState.FAILED
+            target.error = _describe(exc)
+        else:
+            target.state = TargetState.DONE
+        finally:
+            pool.put_nowait(connection)
+        changed()
+
+    try:
+        await asyncio.gather(*(upgrade(target) for target in pending))
+    finally:
+        while not pool.empty():
+            await pool.get_nowait().close()
+    return targets
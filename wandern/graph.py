@@ -1,117 +1,804 @@
+import dataclasses
 import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 
-import networkx as nx
-
+from wandern.bundle import MigrationBundle
 from wandern.exceptions import (
     CycleDetected,
     DivergentbranchError,
+    GraphErrror,
+    GraphValidationError,
     InvalidMigrationFile,
+    MultipleRootsError,
+    OrphanedRevision,
+    WandernException,
+)
+from wandern.index import RevisionIndex
+from wandern.models import (
+    Config,
+    ParseExecutor,
+    Revision,
+    RevisionRecord,
+    SectionOffsets,
+    SplitSql,
+    SqlFile,
+)
+from wandern.statements import (
+    MAX_CACHED_STATEMENTS,
+    StatementSpan,
+    read_chunks,
+    spans_to_statements,
+    statement_spans,
+)
+from wandern.utils import (
+    SqlChecksum,
+    list_migration_files,
+    parse_sql_file_header,
+    read_sql_section,
+    sql_checksum,
 )
-from wandern.models import Revision
-from wandern.utils import parse_sql_file_content
+
+NO_PARENT = -1
+
+# node states while looking for cycles
+UNSEEN, ON_PATH, DONE = range(3)
 
 
 class MigrationGraph:
-    def __init__(self, graph: nx.DiGraph):
-        self._graph: nx.DiGraph = graph
+    """Chain of revisions linked through their `down_revision_id`.
 
-    @classmethod
-    def build(cls, migration_dir: str):
-        graph: nx.DiGraph = nx.DiGraph()
-
-        for file in Path(migration_dir).iterdir():
-            if not os.path.isfile(file) or file.suffix != ".sql":
-                raise InvalidMigrationFile("Migration file must be a sql file")
-
-            try:
-                revision = parse_sql_file_content(file_path=file)
-            except ValueError as exc:
-                raise InvalidMigrationFile(
-                    f"Error parsing migration file: {file.name}"
-                ) from exc
+    Revisions are stored in insertion order and addressed by position, with
+    parent and child positions kept in plain lists. Roots, leaves and nodes
+    with more than one child are tracked as revisions are added, so looking
+    them up does not require scanning the graph.
+
+    The linear order of the chain, from the first root following first
+    children, is computed once on first use together with the position of
+    each revision in it, so ranges of revisions are taken as slices.
+
+    A squashed revision lists the revisions it replaces. Their IDs resolve to
+    the squashed revision, so later revisions can keep revising them.
+
+    Revisions can be removed and re-added while the graph is in use, e.g. by a
+    `GraphWatcher` following edits of the migration files. `version` counts
+    these changes. Once the graph has been validated, later validations only
+    look for cycles through the revisions changed since.
+    """
+
+    def __init__(
+        self,
+        revisions: Iterable[Revision | RevisionRecord] = (),
+        sources: dict[str, tuple[Path, SectionOffsets]] | None = None,
+    ):
+        self._index: dict[str, int] = {}
+        self._revisions: list[RevisionRecord] = []
+        self._parents: list[int] = []
+        self._children: list[list[int]] = []
+
+        # dicts are used as insertion ordered sets
+        self._roots: dict[int, None] = {}
+        self._leaves: dict[int, None] = {}
+        self._divergent: dict[int, None] = {}
+
+        # replaced revision_id -> revision_id of the squashed revision
+        self._replaced_by: dict[str, str] = {}
+
+        # children whose down revision has not been added (yet)
+        self._waiting: dict[str, list[int]] = {}
+
+        self._sources: dict[str, tuple[Path, SectionOffsets]] = sources or {}
+        # set when the revisions were loaded from a migration bundle
+        self._bundle: MigrationBundle | None = None
+        # set when the migration files were parsed with an index
+        self._revision_index: RevisionIndex | None = None
+
+        # revision_id -> checksum of its SQL, filled as the SQL is read
+        self._checksums: dict[str, str] = {}
+        # (checksum of the SQL, dialect) -> spans of its UP and DOWN statements
+        self._statement_spans: dict[
+            tuple[str, str], tuple[list[StatementSpan], list[StatementSpan]]
+        ] = {}
+
+        # SQL larger than this many bytes is streamed by `load_revision`
+        self.stream_threshold: int | None = None
+
+        # linear order and revision_id -> position in it, reset by `add`
+        self._order: list[int] | None = None
+        self._position: dict[str, int] = {}
+        # node -> number of revisions above it, filled by `_depth`
+        self._depths: dict[int, int] = {}
+
+        # memoised result of `validation_errors`, reset by `add` and `remove`
+        self._errors: list[WandernException] | None = None
+
+        # nodes on the cycles found by the last validation, None before the
+        # first one, and nodes added or removed since
+        self._cycle_nodes: set[int] | None = None
+        self._touched: set[int] = set()
+
+        # positions of removed revisions, which are unlinked but kept in place
+        self._removed: set[int] = set()
+        self._files: dict[Path, str] = {}
+        for revision_id, (file, _) in self._sources.items():
+            self._files[file] = revision_id
+
+        self.version = 0
+
+        for revision in revisions:
+            self.add(revision)
+
+    def __len__(self) -> int:
+        return len(self._revisions) - len(self._removed)
+
+    def __contains__(self, revision_id: object) -> bool:
+        return revision_id in self._index
+
+    def add(self, revision: Revision | RevisionRecord) -> None:
+        if isinstance(revision, Revision):
+            revision = RevisionRecord.from_revision(revision)
+
+        # a squashed revision also answers to the IDs of the revisions it replaces
+        revision_ids = [revision.revision_id, *(revision.replaces or ())]
+        for revision_id in revision_ids:
+            if revision_id in self._replaced_by:
+                raise GraphErrror(
+                    f"Revision {revision_id} was squashed into"
+                    f" {self._replaced_by[revision_id]}, remove its migration file"
+                )
+            if revision_id in self._index:
+                raise GraphErrror(f"Duplicate revision ID: {revision_id}")
+
+        node = len(self._revisions)
+        self._changed(node)
+        for revision_id in revision_ids:
+            self._index[revision_id] = node
+        for revision_id in revision.replaces or ():
+            self._replaced_by[revision_id] = revision.revision_id
+        self._revisions.append(revision)
+        self._parents.append(NO_PARENT)
+        self._children.append([])
+        self._roots[node] = None
+        self._leaves[node] = None
+
+        if revision.down_revision_id is not None:
+            parent = self._index.get(revision.down_revision_id)
+            if parent is None:
+                self._waiting.setdefault(revision.down_revision_id, []).append(node)
             else:
-                graph.add_node(revision.revision_id, **revision.model_dump())
+                self._link(parent, node)
 
-        for node in graph.nodes():
-            node_data = Revision(**graph.nodes[node])
-            if node_data.down_revision_id is None:
-                continue
+        for revision_id in revision_ids:
+            for child in self._waiting.pop(revision_id, []):
+                self._link(node, child)
 
-            graph.add_edge(node_data.down_revision_id, node_data.revision_id)
+    def remove(self, revision_id: str) -> RevisionRecord:
+        """Remove a revision, its children are orphaned until it is added back"""
+        node = self._index.get(revision_id)
+        if node is None or self._revisions[node].revision_id != revision_id:
+            raise ValueError(f"Revision: {revision_id} does not exist in the graph")
 
-        return cls(graph=graph)
+        revision = self._revisions[node]
+        self._changed(node)
+        self._removed.add(node)
+        del self._index[revision_id]
+        for replaced_id in revision.replaces or ():
+            del self._index[replaced_id]
+            del self._replaced_by[replaced_id]
 
-    def get_last_migration(self):
-        MigrationGraph.check_cycles(self._graph)
-        MigrationGraph.check_divergence(self._graph)
+        self._checksums.pop(revision_id, None)
+        source = self._sources.pop(revision_id, None)
+        if source is not None:
+            self._files.pop(source[0], None)
 
-        leaf_node = None
-        for node in self._graph.nodes():
-            out_edges = self._graph.out_edges(node)
-            if len(out_edges) == 0:
-                leaf_node = node
+        parent = self._parents[node]
+        if parent != NO_PARENT:
+            siblings = self._children[parent]
+            siblings.remove(node)
+            if len(siblings) < 2:
+                self._divergent.pop(parent, None)
+            if not siblings:
+                self._leaves[parent] = None
+        else:
+            self._roots.pop(node)
+            if revision.down_revision_id is not None:
+                waiting = self._waiting[revision.down_revision_id]
+                waiting.remove(node)
+                if not waiting:
+                    del self._waiting[revision.down_revision_id]
 
-        if leaf_node is None:
-            return None
-        node_data = self._graph.nodes[leaf_node]
-        return Revision(**node_data)
+        for child in self._children[node]:
+            self._parents[child] = NO_PARENT
+            self._roots[child] = None
+            down_revision_id = self._revisions[child].down_revision_id
+            if down_revision_id is not None:
+                self._waiting.setdefault(down_revision_id, []).append(child)
+
+        self._children[node] = []
+        self._leaves.pop(node, None)
+        self._divergent.pop(node, None)
+        return revision
+
+    def _changed(self, node: int) -> None:
+        self._order = None
+        self._errors = None
+        self._depths.clear()
+        self._touched.add(node)
+        self.version += 1
+
+    def update_file(self, file: Path) -> bool:
+        """Re-read a migration file after it was added, modified or deleted.
+
+        Only the touched file is parsed. Returns whether the graph changed.
+        """
+        revision_id = self._files.get(file)
+        if revision_id is not None:
+            self.remove(revision_id)
+        if not file.is_file():
+            return revision_id is not None
+
+        try:
+            revision, offsets = parse_sql_file_header(file)
+        except (OSError, ValueError) as exc:
+            # left out of the graph until the file is fixed
+            raise InvalidMigrationFile(
+                f"Error parsing migration file: {file.name}"
+            ) from exc
+
+        self.add(revision)
+        self._sources[revision.revision_id] = (file, offsets)
+        self._files[file] = revision.revision_id
+        return True
+
+    def _link(self, parent: int, child: int) -> None:
+        self._parents[child] = parent
+        self._children[parent].append(child)
+        self._roots.pop(child, None)
+        self._leaves.pop(parent, None)
+        if len(self._children[parent]) > 1:
+            self._divergent[parent] = None
+
+    @classmethod
+    def build(
+        cls,
+        migration_dir: str,
+        index_file: str | Path | None = None,
+        workers: int = 1,
+        executor: ParseExecutor = ParseExecutor.THREAD,
+    ):
+        graph = cls()
+        index = RevisionIndex.load(index_file) if index_file else None
+        files = list_migration_files(migration_dir)
+
+        parsed: dict[Path, tuple[Revision, SectionOffsets]] = {}
+        for file in files:
+            entry = index.get(file) if index else None
+            if entry is not None:
+                parsed[file] = (entry.revision, entry.offsets)
+                if entry.sql_checksum is not None:
+                    graph._checksums[entry.revision.revision_id] = entry.sql_checksum
+                    for dialect, spans in entry.statements.items():
+                        graph._statement_spans[(entry.sql_checksum, dialect)] = spans
+
+        pending = [file for file in files if file not in parsed]
+        for file, result in zip(pending, cls._parse_files(pending, workers, executor)):
+            parsed[file] = result
+            if index:
+                index.put(file, *result)
+
+        # revisions are added in directory order, whichever way they were parsed
+        for file in files:
+            revision, offsets = parsed[file]
+            graph.add(revision)
+            graph._sources[revision.revision_id] = (file, offsets)
+            graph._files[file] = revision.revision_id
+
+        if index:
+            index.prune(files)
+            index.save()
+        graph._revision_index = index
+
+        return graph
+
+    @classmethod
+    def from_bundle(cls, bundle_file: str | Path):
+        bundle = MigrationBundle(bundle_file)
+        graph = cls(entry.revision for entry in bundle.entries)
+        graph._bundle = bundle
+        return graph
+
+    @classmethod
+    def from_config(cls, config: Config):
+        if os.path.isfile(config.migration_dir):
+            return cls.from_bundle(config.migration_dir)
+
+        graph = cls.build(
+            config.migration_dir,
+            index_file=config.index_file,
+            workers=config.parse_workers,
+            executor=config.parse_executor,
+        )
+        graph.stream_threshold = config.stream_threshold
+        return graph
 
     @staticmethod
-    def check_cycles(graph: nx.DiGraph):
+    def _parse_files(
+        files: list[Path], workers: int, executor: ParseExecutor
+    ) -> Iterator[tuple[Revision, SectionOffsets]]:
+        """Parse migration file headers, in order, on a pool of `workers`"""
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(files))
+
+        pool: Executor | None = None
+        if workers > 1:
+            pool_cls = (
+                ProcessPoolExecutor
+                if executor == ParseExecutor.PROCESS
+                else ThreadPoolExecutor
+            )
+            pool = pool_cls(max_workers=workers)
+
         try:
-            cycle = nx.find_cycle(graph, orientation="original")
-            cycle_str = "\n".join(
-                [f"{c[0]} {'->' if c[2] == 'forward' else '<-'} {c[1]}" for c in cycle]
+            results = (
+                pool.map(parse_sql_file_header, files)
+                if pool
+                else map(parse_sql_file_header, files)
             )
+            for file in files:
+                try:
+                    yield next(results)
+                except (OSError, ValueError) as exc:
+                    raise InvalidMigrationFile(
+                        f"Error parsing migration file: {file.name}"
+                    ) from exc
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
 
-            raise CycleDetected(cycle_str)
-        except nx.NetworkXNoCycle:
+    def get_last_migration(self) -> RevisionRecord | None:
+        self.validate()
+
+        if not self._leaves:
             return None
+        return self._revisions[next(reversed(self._leaves))]
 
-    @staticmethod
-    def check_divergence(graph: nx.DiGraph):
-        for node in graph.nodes():
-            out_edges = graph.out_edges(node)
-
-            if len(out_edges) > 1:
-                to_nodes = [n[1] for n in out_edges]
-                raise DivergentbranchError(
-                    f"Divergent branch detected from {node} to ({', '.join(to_nodes)})"
+    def validate(self) -> None:
+        """Raise the problem found in the graph, or all of them together"""
+        errors = self.validation_errors()
+        if len(errors) == 1:
+            raise errors[0]
+        if errors:
+            raise GraphValidationError(errors)
+
+    def validation_errors(self) -> list[WandernException]:
+        """Cycles, divergent branches, orphaned revisions and extra roots.
+
+        Found in a single pass over the graph, which is only repeated after
+        revisions are added or removed. Roots and divergent branches are
+        tracked as the graph changes, and any new cycle has to run through a
+        changed revision, so later passes only walk up from those.
+        """
+        if self._errors is not None:
+            return self._errors
+
+        errors: list[WandernException] = []
+
+        first_root: str | None = None
+        for node in self._roots:
+            revision = self._revisions[node]
+            if revision.down_revision_id is not None:
+                errors.append(
+                    OrphanedRevision(
+                        f"Revision {revision.revision_id} revises"
+                        f" {revision.down_revision_id}, which does not exist"
+                    )
+                )
+            elif first_root is None:
+                first_root = revision.revision_id
+            else:
+                errors.append(
+                    MultipleRootsError(
+                        f"Multiple initial revisions: {first_root} and"
+                        f" {revision.revision_id} both revise nothing"
+                    )
                 )
 
+        for node in self._divergent:
+            from_node = self._revisions[node].revision_id
+            to_nodes = [
+                self._revisions[child].revision_id for child in self._children[node]
+            ]
+            errors.append(
+                DivergentbranchError(
+                    f"Divergent branch detected from {from_node}"
+                    f" to ({', '.join(to_nodes)})"
+                )
+            )
+
+        if self._cycle_nodes is None:
+            cycles = list(self._find_cycles())
+        else:
+            starts = (self._touched | self._cycle_nodes) - self._removed
+            cycles = list(self._find_cycles(sorted(starts)))
+        self._cycle_nodes = {node for cycle in cycles for node in cycle}
+        self._touched = set()
+
+        for cycle in cycles:
+            revision_ids = [self._revisions[node].revision_id for node in cycle]
+            errors.append(
+                CycleDetected(
+                    "\n".join(
+                        f"{revision_id} -> {revision_ids[(i + 1) % len(cycle)]}"
+                        for i, revision_id in enumerate(revision_ids)
+                    )
+                )
+            )
+
+        self._errors = errors
+        return errors
+
+    def _find_cycles(self, starts: Iterable[int] | None = None) -> Iterator[list[int]]:
+        """Walk up from `starts`, or every node, and yield the cycles found"""
+        state: dict[int, int] = dict.fromkeys(self._removed, DONE)
+        if starts is None:
+            # every node outside a cycle is reachable from a root
+            stack = list(self._roots)
+            while stack:
+                node = stack.pop()
+                state[node] = DONE
+                stack.extend(self._children[node])
+            starts = range(len(self._revisions))
+
+        # walking up ends at a root, in a new cycle or on a node seen from an
+        # earlier start
+        for start in starts:
+            path: list[int] = []
+            node = start
+            while node != NO_PARENT and state.get(node, UNSEEN) == UNSEEN:
+                state[node] = ON_PATH
+                path.append(node)
+                node = self._parents[node]
+
+            if node != NO_PARENT and state[node] == ON_PATH:
+                cycle = path[path.index(node) :]
+                cycle.reverse()  # parent first
+                yield cycle
+
+            for n in path:
+                state[n] = DONE
+
+    def check_cycles(self) -> None:
+        for error in self.validation_errors():
+            if isinstance(error, CycleDetected):
+                raise error
+
+    def check_divergence(self) -> None:
+        for error in self.validation_errors():
+            if isinstance(error, DivergentbranchError):
+                raise error
+
     @property
     def first(self) -> str | None:
-        for node in self._graph.nodes():
-            in_edges = self._graph.in_edges(node)
-            if len(in_edges) == 0:
-                return node
-        return None
-
-    def iter(self):
-        first_node = self.first
-        if not first_node:
+        if not self._roots:
             return None
+        return self._revisions[next(iter(self._roots))].revision_id
+
+    def _walk(self, node: int) -> Iterator[int]:
+        # bounded so that walking into a cycle cannot loop forever
+        for _ in range(len(self._revisions)):
+            children = self._children[node]
+            if not children:
+                return
+            node = children[0]
+            yield node
 
-        yield Revision(**self._graph.nodes[first_node])
+    def _linear(self) -> list[int]:
+        if self._order is None:
+            order: list[int] = []
+            if self._roots:
+                root = next(iter(self._roots))
+                order.append(root)
+                order.extend(self._walk(root))
+            self._order = order
+            self._position = {
+                self._revisions[node].revision_id: pos for pos, node in enumerate(order)
+            }
+        return self._order
 
-        current_node = first_node
-        while current_node:
-            current_node = next(self._graph.successors(current_node), None)
-            if current_node:
-                yield Revision(**self._graph.nodes[current_node])
+    def _slice(self, start: int, stop: int) -> Iterator[RevisionRecord]:
+        order = self._linear()
+        return (self._revisions[order[pos]] for pos in range(start, stop))
 
-    def iter_from(self, start: str):
-        if start not in self._graph.nodes:
+    def _stop(self, start: int, steps: int | None) -> int:
+        size = len(self._linear())
+        return size if steps is None else min(start + steps, size)
+
+    def position(self, revision_id: str) -> int | None:
+        """Position of the revision in the linear order of the graph"""
+        self._linear()
+        node = self._index.get(revision_id)
+        if node is None:
+            return None
+        return self._position.get(self._revisions[node].revision_id)
+
+    def _resolve(self, start: str) -> int:
+        """Node to start walking from, for the revision the database is at"""
+        node = self._index.get(start)
+        if node is None:
             raise ValueError(f"Revision: {start} does not exist in the graph")
 
-        current_node = start
-        while current_node:
-            current_node = next(self._graph.successors(current_node), None)
-            if current_node:
-                yield Revision(**self._graph.nodes[current_node])
+        # a database can only be at a squashed revision as a whole, that is at
+        # the revision itself or at the last of the revisions it replaces
+        revision = self._revisions[node]
+        if revision.replaces and start not in (
+            revision.revision_id,
+            revision.replaces[-1],
+        ):
+            raise ValueError(
+                f"Revision: {start} was squashed into {revision.revision_id}"
+                " partway, migrate it with the migration files from before"
+                " the squash"
+            )
+        return node
+
+    def iter(self, steps: int | None = None) -> Iterator[RevisionRecord]:
+        return self._slice(0, self._stop(0, steps))
+
+    def iter_from(
+        self, start: str, steps: int | None = None
+    ) -> Iterator[RevisionRecord]:
+        """Revisions after `start`, at most `steps` of them"""
+        node = self._resolve(start)
+        pos = self.position(start)
+        if pos is None:
+            # off the main line, e.g. on a divergent branch
+            nodes = islice(self._walk(node), steps)
+            return (self._revisions[node] for node in nodes)
+
+        return self._slice(pos + 1, self._stop(pos + 1, steps))
+
+    def iter_between(self, start: str | None, end: str) -> Iterator[RevisionRecord]:
+        """Revisions after `start` (or from the first one) up to and including `end`"""
+        begin = 0
+        if start is not None:
+            pos = self.position(start)
+            if pos is None:
+                raise ValueError(f"Revision: {start} does not exist in the graph")
+            begin = pos + 1
+
+        stop = self.position(end)
+        if stop is None:
+            raise ValueError(f"Revision: {end} does not exist in the graph")
+        if stop + 1 < begin:
+            raise ValueError(f"Revision: {end} comes before {start}")
+
+        return self._slice(begin, stop + 1)
+
+    def iter_down_from(
+        self, start: str, steps: int | None = None
+    ) -> Iterator[RevisionRecord]:
+        """`start` followed by its ancestors, at most `steps` revisions in total"""
+        node = self._resolve(start)
+        pos = self.position(start)
+        if pos is None:
+            return islice(self._ancestors(node), steps)
+
+        order = self._linear()
+        stop = -1 if steps is None else max(pos - steps, -1)
+        return (self._revisions[order[i]] for i in range(pos, stop, -1))
+
+    def _depth(self, node: int) -> int | None:
+        """Number of revisions above the node, None if it is on a cycle.
+
+        Memoised for every node on the way up, so the depths of a chain are
+        computed once.
+        """
+        path: list[int] = []
+        depth = self._depths.get(node)
+        # bounded so that walking into a cycle cannot loop forever
+        for _ in range(len(self._revisions)):
+            if depth is not None:
+                break
+            path.append(node)
+            node = self._parents[node]
+            depth = -1 if node == NO_PARENT else self._depths.get(node)
+
+        if depth is None:
+            return None
+        for node in reversed(path):
+            depth += 1
+            self._depths[node] = depth
+        return depth
+
+    def is_ancestor(self, ancestor: str, revision_id: str) -> bool:
+        """Whether `ancestor` comes before `revision_id` on its chain"""
+        target = self._index.get(ancestor)
+        node = self._index.get(revision_id)
+        if target is None or node is None:
+            return False
 
-    def get_node(self, revision_id: str) -> Revision | None:
-        if revision_id not in self._graph.nodes:
+        target_depth = self._depth(target)
+        depth = self._depth(node)
+        if target_depth is None or depth is None or target_depth >= depth:
+            return False
+
+        for _ in range(depth - target_depth):
+            node = self._parents[node]
+        return node == target
+
+    def get_target(self, revision_id: str) -> RevisionRecord:
+        """The revision a database can be migrated to, for `revision_id`"""
+        return self._revisions[self._resolve(revision_id)]
+
+    def path(self, start: str | None, end: str) -> list[RevisionRecord]:
+        """Revisions after `start` (or from the first one) up to and including
+        `end`, walking up from `end`.
+        """
+        node = self._resolve(end)
+        depth = self._depth(node)
+        if depth is None:
+            raise ValueError(f"Revision: {end} is part of a cycle")
+
+        stop = -1
+        if start is not None:
+            start_node = self._resolve(start)
+            if start_node != node and not self.is_ancestor(start, end):
+                raise ValueError(f"Revision: {end} does not follow {start}")
+            stop = self._depth(start_node) or 0
+
+        revisions = list(islice(self._ancestors(node), depth - stop))
+        revisions.reverse()
+        return revisions
+
+    def path_down(self, start: str, end: str) -> list[RevisionRecord]:
+        """`start` and its ancestors, down to but not including `end`"""
+        node = self._resolve(start)
+        target = self._resolve(end)
+        if target != node and not self.is_ancestor(end, start):
+            raise ValueError(f"Revision: {end} is not an ancestor of {start}")
+
+        depth = self._depth(node) or 0
+        return list(islice(self._ancestors(node), depth - (self._depth(target) or 0)))
+
+    def _ancestors(self, node: int) -> Iterator[RevisionRecord]:
+        for _ in range(len(self._revisions)):
+            yield self._revisions[node]
+            node = self._parents[node]
+            if node == NO_PARENT:
+                return
+
+    def get_node(self, revision_id: str) -> RevisionRecord | None:
+        """The revision, or the squashed revision that replaces it"""
+        node = self._index.get(revision_id)
+        if node is None:
             return None
-        return Revision(**self._graph.nodes[revision_id])
+        return self._revisions[node]
+
+    @property
+    def source_files(self) -> list[Path]:
+        return list(self._files)
+
+    def get_source(self, revision_id: str) -> Path | None:
+        source = self._sources.get(revision_id)
+        return source[0] if source else None
+
+    def load_revision(
+        self,
+        revision: RevisionRecord,
+        stream: bool = True,
+        dialect: str | None = None,
+    ) -> RevisionRecord:
+        """Return the revision with its UP and DOWN SQL read from its migration
+        file, and the checksum of the SQL.
+
+        Unless `stream` is false, SQL larger than `stream_threshold` is not
+        loaded, the revision then refers to the file to stream the SQL from as
+        its `sql_file`. With a `dialect`, loaded SQL is also split into
+        statements, reusing the split of earlier runs while the SQL is unchanged.
+        """
+        source = self._sources.get(revision.revision_id)
+        if self._bundle is not None:
+            revision = self._bundle.load_revision(revision)
+        elif source is not None:
+            revision = self._read_source(revision, *source, stream=stream)
+
+        checksum = self._checksums.get(revision.revision_id)
+        if revision.sql_file is None:
+            checksum = sql_checksum(revision.up_sql, revision.down_sql)
+        elif checksum is None:
+            checksum = self._stream_checksum(revision.sql_file)
+
+        self._checksums[revision.revision_id] = checksum
+        if self._revision_index is not None and source is not None:
+            self._revision_index.set_sql_checksum(source[0], checksum)
+
+        statements = None
+        if dialect is not None and revision.sql_file is None:
+            statements = self._split(
+                revision, checksum, dialect, source[0] if source else None
+            )
+
+        return dataclasses.replace(revision, checksum=checksum, statements=statements)
+
+    def _split(
+        self,
+        revision: RevisionRecord,
+        checksum: str,
+        dialect: str,
+        file: Path | None,
+    ) -> SplitSql:
+        up_sql = revision.up_sql or ""
+        down_sql = revision.down_sql or ""
+        key = (checksum, str(dialect))
+        spans = self._statement_spans.get(key)
+        if spans is None:
+            spans = statement_spans(up_sql, dialect), statement_spans(down_sql, dialect)
+            # the spans of huge revisions would bloat the index for little gain
+            if len(spans[0]) + len(spans[1]) <= MAX_CACHED_STATEMENTS:
+                self._statement_spans[key] = spans
+                if self._revision_index is not None and file is not None:
+                    self._revision_index.set_statements(file, key[1], spans)
+
+        return SplitSql(
+            dialect,
+            spans_to_statements(up_sql, spans[0]),
+            spans_to_statements(down_sql, spans[1]),
+        )
+
+    def _read_source(
+        self,
+        revision: RevisionRecord,
+        file: Path,
+        offsets: SectionOffsets,
+        stream: bool = True,
+    ) -> RevisionRecord:
+        try:
+            # the size of the SQL of a compressed file is not known without
+            # decompressing it, so it is always streamed
+            size = offsets.down_end - offsets.up_start
+            if offsets.down_end >= 0 and file.stat().st_size != offsets.down_end:
+                raise ValueError("file changed after the migration graph was built")
+
+            threshold = self.stream_threshold if stream else None
+            if threshold is not None and (offsets.down_end < 0 or size > threshold):
+                return dataclasses.replace(revision, sql_file=SqlFile(file, offsets))
+
+            up_sql = read_sql_section(file, offsets.up_start, offsets.up_end)
+            down_sql = read_sql_section(file, offsets.down_start, offsets.down_end)
+        except (OSError, ValueError) as exc:
+            raise InvalidMigrationFile(
+                f"Error reading migration file: {file.name}"
+            ) from exc
+
+        return dataclasses.replace(revision, up_sql=up_sql, down_sql=down_sql)
+
+    @staticmethod
+    def _stream_checksum(sql_file: SqlFile) -> str:
+        checksum = SqlChecksum()
+        offsets = sql_file.offsets
+        try:
+            for start, end in (
+                (offsets.up_start, offsets.up_end),
+                (offsets.down_start, offsets.down_end),
+            ):
+                for chunk in read_chunks(sql_file.path, start, end):
+                    checksum.update(chunk)
+                checksum.end_section()
+        except (OSError, ValueError) as exc:
+            raise InvalidMigrationFile(
+                f"Error reading migration file: {sql_file.path.name}"
+            ) from exc
+        return checksum.hexdigest()
+
+    def checksum(self, revision: RevisionRecord) -> str:
+        """Checksum of the revision's SQL, which is only read if not cached"""
+        if revision.revision_id not in self._checksums:
+            self.load_revision(revision)
+        return self._checksums[revision.revision_id]
+
+    def save_index(self) -> None:
+        """Persist checksums computed since the graph was built"""
+        if self._revision_index is not None:
+            self._revision_index.save()
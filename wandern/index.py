@@ -0,0 +1,141 @@
+import hashlib
+import os
+from pathlib import Path
+
+from pydantic import BaseModel, Field, ValidationError
+
+from wandern.models import Revision, SectionOffsets
+from wandern.statements import StatementSpan
+
+INDEX_VERSION = 5
+
+
+def file_checksum(file_path: str | Path) -> str:
+    with open(file_path, "rb") as file:
+        return hashlib.file_digest(file, "blake2b").hexdigest()
+
+
+class IndexEntry(BaseModel):
+    size: int
+    mtime_ns: int
+    checksum: str
+    revision: Revision
+    offsets: SectionOffsets
+    # filled in once the SQL of the revision has been read
+    sql_checksum: str | None = None
+    # dialect -> statement spans of the UP and DOWN SQL, once it has been split
+    statements: dict[str, tuple[list[StatementSpan], list[StatementSpan]]] = Field(
+        default_factory=dict
+    )
+
+
+class IndexFile(BaseModel):
+    version: int = INDEX_VERSION
+    entries: dict[str, IndexEntry] = Field(default_factory=dict)
+
+
+class RevisionIndex:
+    """On-disk cache of parsed migration headers, their SQL section offsets,
+    the checksums of their SQL and where its statements start and end.
+
+    Entries are keyed by the absolute path of the migration file and are
+    considered fresh while the file's size and mtime are unchanged. A file
+    whose mtime changed but whose content hash still matches is reused as well.
+    The index is only a cache: a missing, corrupt or outdated index file is
+    silently discarded and rebuilt.
+    """
+
+    def __init__(self, path: str | Path, entries: dict[str, IndexEntry] | None = None):
+        self.path = Path(path)
+        self.entries: dict[str, IndexEntry] = entries or {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RevisionIndex":
+        try:
+            with open(path, encoding="utf-8") as file:
+                index_file = IndexFile.model_validate_json(file.read())
+        except (OSError, ValueError, ValidationError):
+            return cls(path)
+
+        if index_file.version != INDEX_VERSION:
+            return cls(path)
+
+        return cls(path, entries=index_file.entries)
+
+    @staticmethod
+    def _key(file_path: Path) -> str:
+        return str(file_path.resolve())
+
+    def get(self, file_path: Path) -> IndexEntry | None:
+        entry = self.entries.get(self._key(file_path))
+        if entry is None:
+            return None
+
+        stat = file_path.stat()
+        if entry.size != stat.st_size:
+            return None
+        if entry.mtime_ns == stat.st_mtime_ns:
+            return entry
+
+        # touched but possibly unchanged, compare content before re-parsing
+        if file_checksum(file_path) != entry.checksum:
+            return None
+
+        entry.mtime_ns = stat.st_mtime_ns
+        self._dirty = True
+        return entry
+
+    def put(self, file_path: Path, revision: Revision, offsets: SectionOffsets) -> None:
+        stat = file_path.stat()
+        self.entries[self._key(file_path)] = IndexEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            checksum=file_checksum(file_path),
+            revision=revision,
+            offsets=offsets,
+        )
+        self._dirty = True
+
+    def set_sql_checksum(self, file_path: Path, checksum: str) -> None:
+        entry = self.entries.get(self._key(file_path))
+        if entry is not None and entry.sql_checksum != checksum:
+            entry.sql_checksum = checksum
+            self._dirty = True
+
+    def set_statements(
+        self,
+        file_path: Path,
+        dialect: str,
+        spans: tuple[list[StatementSpan], list[StatementSpan]],
+    ) -> None:
+        entry = self.entries.get(self._key(file_path))
+        if entry is not None and entry.statements.get(dialect) != spans:
+            entry.statements[dialect] = spans
+            self._dirty = True
+
+    def prune(self, file_paths: list[Path]) -> None:
+        """Drop entries for files that are no longer in the migration directory"""
+        keep = {self._key(file_path) for file_path in file_paths}
+        stale = [key for key in self.entries if key not in keep]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+
+        index_file = IndexFile(entries=self.entries)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(index_file.model_dump_json())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # the index is a cache, failing to persist it must not fail the command
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        self._dirty = False
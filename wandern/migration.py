@@ -1,71 +1,163 @@
+import asyncio
+import dataclasses
 import os
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
 from datetime import datetime
+from itertools import islice
+from typing import TypeVar
 
 import rich
 
 from wandern.constants import DEFAULT_FILE_FORMAT
-from wandern.databases.provider import get_database_impl
+from wandern.databases.provider import get_async_database_impl, get_database_impl
 from wandern.exceptions import ConnectError
 from wandern.graph import MigrationGraph
-from wandern.models import Config, Revision
+from wandern.models import Config, DatabaseProviders, Revision, RevisionRecord
 from wandern.templates.engine import generate_template
-from wandern.utils import generate_migration_filename
+from wandern.utils import create_migration, generate_migration_filename
+from wandern.watcher import GraphWatcher
 
+T = TypeVar("T")
 
-class MigrationService:
-    def __init__(self, config: Config):
+
+def _longest(timeouts: Iterable[float | None]) -> float | None:
+    return max((timeout for timeout in timeouts if timeout is not None), default=None)
+
+
+class _BaseMigrationService:
+    """What `MigrationService` and `AsyncMigrationService` share: the
+    migration graph, and planning which revisions to apply or revert.
+    """
+
+    def __init__(self, config: Config, graph: MigrationGraph | None = None):
         self.config = config
         if not config.dialect or not config.dsn:
             raise ConnectError("No database connection string provided")
 
-        self.database = get_database_impl(config.dialect, config=config)
-        self.graph = MigrationGraph.build(config.migration_dir)
+        # a graph can be shared by the services of databases on the same schema
+        self.graph = graph if graph is not None else MigrationGraph.from_config(config)
 
-    def upgrade(
+    def watch(self) -> GraphWatcher:
+        """Follow edits of the migration files, call `refresh` to apply them"""
+        if os.path.isfile(self.config.migration_dir):
+            raise ValueError("A migration bundle can not be watched")
+
+        return GraphWatcher(self.graph, self.config.migration_dir)
+
+    def _pending_upgrades(
         self,
+        head: RevisionRecord | None,
         steps: int | None = None,
         author: str | None = None,
         tags: list[str] | None = None,
-    ):
-        self.database.create_table_migration()
-        head = self.database.get_head_revision()
-        count = 0
+        to: str | None = None,
+    ) -> Iterator[RevisionRecord]:
+        """Revisions to apply on top of `head`, see `MigrationService.upgrade`"""
+        filtered = author is not None or bool(tags)
+        steps = steps or None  # 0 applies everything, as before
 
-        if not head:
+        # without filters the graph slices the next `steps` revisions itself
+        limit = None if filtered or to is not None else steps
+        if to is not None:
+            target = self.graph.get_target(to)
+            head_id = head.revision_id if head else None
+            if head_id and self.graph.is_ancestor(target.revision_id, head_id):
+                raise ValueError(
+                    f"Revision {to} is before the current revision"
+                    f" {head_id}, use `wandern down --to {to}`"
+                )
+            pending = iter(self.graph.path(head_id, to))
+            if not filtered:
+                pending = islice(pending, steps)
+        elif not head:
             # first migration
-            revisions = list(self.graph.iter())
+            pending = self.graph.iter(steps=limit)
         else:
-            revisions = list(self.graph.iter_from(head.revision_id))
+            pending = self.graph.iter_from(head.revision_id, steps=limit)
 
         if author is not None:
-            filtered_revisions = [rev for rev in revisions if rev.author == author]
-        elif tags is not None and len(tags) > 0:
-            filtered_revisions = [
-                rev for rev in revisions if rev.tags and set(rev.tags) & set(tags)
-            ]
-        else:
-            filtered_revisions = revisions
+            pending = (rev for rev in pending if rev.author == author)
+        elif tags:
+            pending = (rev for rev in pending if rev.tags and set(rev.tags) & set(tags))
 
-        # Validate that filtered revisions form a continuous chain
-        if author is not None or tags:
-            self._validate_sequential_path(filtered_revisions, head)
-            revisions = filtered_revisions
+        if filtered:
+            # Validate that filtered revisions form a continuous chain, all of
+            # them and not only the `steps` applied
+            selected = list(pending)
+            self._validate_sequential_path(selected, head)
+            pending = islice(selected, steps)
 
-        if not revisions:
-            rich.print("[green]Nothing to upgrade, already up to date[/green]")
+        return pending
+
+    def _lock_retry_delays(self, revision: RevisionRecord) -> Iterator[float]:
+        """Seconds to wait before each retry of a revision whose lock wait
+        timed out, doubled every time
+        """
+        if not revision.transactional or self.config.dialect == DatabaseProviders.MYSQL:
+            # the statements committed before the timeout, one by one or
+            # implicitly by the DDL of MySQL, would be run again
             return
+        for retry in range(self.config.lock_attempts - 1):
+            delay = self.config.lock_retry_delay * 2**retry
+            # jittered, so that the upgrades blocked together do not retry together
+            yield random.uniform(delay / 2, delay)
 
+    @staticmethod
+    def _lock_retry_message(revision: RevisionRecord, delay: float) -> str:
+        return (
+            f"[yellow]Timed out waiting for a lock in revision"
+            f" {revision.revision_id}, retrying in {delay:.1f}s[/yellow]"
+        )
+
+    @staticmethod
+    def _atomic_upgrades(
+        pending: Iterator[RevisionRecord],
+    ) -> Iterator[RevisionRecord]:
+        """`pending`, checked before any of them is applied in one transaction"""
+        revisions = list(pending)
         for revision in revisions:
-            self.database.migrate_up(revision)
-            rich.print(
-                f"(UP) [green]{revision.down_revision_id} -> {revision.revision_id}[/green]"
-            )
-            count += 1
-            if steps and count == steps:
-                break
+            if not revision.transactional:
+                raise ValueError(
+                    f"Revision {revision.revision_id} is not transactional,"
+                    " it can not be applied in an atomic upgrade"
+                )
+        return iter(revisions)
+
+    @staticmethod
+    def _applied_record(loaded: RevisionRecord) -> RevisionRecord:
+        # kept until the end of an atomic upgrade, without its SQL
+        return dataclasses.replace(
+            loaded,
+            up_sql=None,
+            down_sql=None,
+            sql_file=None,
+            statements=None,
+        )
+
+    def _mismatches(self, applied_migrations: list[RevisionRecord]) -> list[str]:
+        """See `MigrationService.verify`"""
+        problems = []
+        for applied in reversed(applied_migrations):
+            if applied.checksum is None:
+                continue
+
+            revision = self.graph.get_node(applied.revision_id)
+            if revision is None:
+                problems.append(
+                    f"{applied.revision_id}: missing from the migration directory"
+                )
+            elif revision.revision_id != applied.revision_id:
+                continue
+            elif self.graph.checksum(revision) != applied.checksum:
+                problems.append(f"{applied.revision_id}: changed after it was applied")
+
+        self.graph.save_index()
+        return problems
 
     def _validate_sequential_path(
-        self, filtered_revisions: list[Revision], head: Revision | None
+        self, filtered_revisions: list[RevisionRecord], head: RevisionRecord | None
     ):
         if not filtered_revisions:
             return
@@ -87,34 +179,87 @@ class MigrationService:
 
             expected_down_revision_id = revision.revision_id
 
-    def downgrade(
-        self,
-        steps: int | None = None,
-    ):
-        self.database.create_table_migration()
-        head = self.database.get_head_revision()
-        if not head:
-            # No migration to downgrade
-            rich.print("[red]Nothing to downgrade[/red]")
-            return
-
-        current = self.graph.get_node(head.revision_id)
-        if not current:
+    def _pending_downgrades(
+        self, head: RevisionRecord, steps: int | None = None, to: str | None = None
+    ) -> Iterator[RevisionRecord]:
+        """Revisions to revert from `head`, see `MigrationService.downgrade`"""
+        if not self.graph.get_node(head.revision_id):
             raise ValueError(
                 f"Migration file for revision {head.revision_id} not found"
             )
 
-        count = 0
-        while current and (steps is None or count < steps):
-            self.database.migrate_down(current)
-            if not current.down_revision_id:
-                rich.print(f"(DOWN) [red]{current.revision_id} -> None[/red]")
-                break
-            rich.print(
-                f"(DOWN) [red]{current.revision_id} -> {current.down_revision_id}[/red]"
-            )
-            current = self.graph.get_node(current.down_revision_id)
-            count += 1
+        if to is not None:
+            return islice(self.graph.path_down(head.revision_id, to), steps)
+        return self.graph.iter_down_from(head.revision_id, steps=steps)
+
+    @staticmethod
+    def _replaced_records(revision: RevisionRecord) -> list[RevisionRecord]:
+        # rows of databases migrated before the revisions were squashed
+        return [
+            RevisionRecord(revision_id=revision_id, down_revision_id=None, message="")
+            for revision_id in revision.replaces or ()
+        ]
+
+    def squash(
+        self,
+        until: str,
+        message: str | None = None,
+        author: str | None = None,
+    ) -> tuple[Revision, str]:
+        """Replace the revisions up to `until` with a single baseline revision.
+
+        The baseline runs the UP SQL of the squashed revisions in order and
+        their DOWN SQL in reverse, and lists them in its `Replaces:` header.
+        Their migration files are removed.
+        """
+        if os.path.isfile(self.config.migration_dir):
+            raise ValueError("Cannot squash the migrations of a migration bundle")
+
+        self.graph.validate()
+        if self.graph.position(until) is None:
+            raise ValueError(f"Revision: {until} does not exist in the graph")
+
+        squashed = [
+            self.graph.load_revision(revision, stream=False)
+            for revision in self.graph.iter_between(None, until)
+        ]
+        if len(squashed) < 2:
+            raise ValueError(f"Nothing to squash up to revision {until}")
+
+        replaces = [
+            revision_id
+            for revision in squashed
+            for revision_id in [*(revision.replaces or ()), revision.revision_id]
+        ]
+        baseline = create_migration(
+            message=message or f"Squash {squashed[0].revision_id}..{until}",
+            down_revision_id=None,
+            author=author,
+            up_sql="\n\n".join(
+                f"-- {revision.revision_id}: {revision.message}\n{revision.up_sql}"
+                for revision in squashed
+            ),
+            down_sql="\n\n".join(
+                f"-- {revision.revision_id}: {revision.message}\n{revision.down_sql}"
+                for revision in reversed(squashed)
+            ),
+            replaces=replaces,
+            # the SQL of all of them runs in the same mode, and within the
+            # longest of their timeouts
+            transactional=all(revision.transactional for revision in squashed),
+            lock_timeout=_longest(revision.lock_timeout for revision in squashed),
+            statement_timeout=_longest(
+                revision.statement_timeout for revision in squashed
+            ),
+        )
+
+        filename = self.save_migration(baseline)
+        for revision in squashed:
+            source = self.graph.get_source(revision.revision_id)
+            if source:
+                source.unlink()
+
+        return baseline, filename
 
     def save_migration(self, revision: Revision):
         filename = generate_migration_filename(
@@ -136,29 +281,18 @@ class MigrationService:
 
         return filename
 
-    def filter_migrations(
-        self,
-        author: str | None = None,
-        tags: list[str] | None = None,
-        created_at: datetime | None = None,
-    ) -> list[Revision]:
-        return self.database.list_migrations(
-            author=author, tags=tags, created_at=created_at
-        )
-
-    def get_combined_migrations(
+    def _combine(
         self,
+        db_migrations: list[RevisionRecord],
         author: str | None = None,
         tags: list[str] | None = None,
         created_at: datetime | None = None,
-    ) -> list[tuple[Revision, str]]:
-        db_migrations = self.database.list_migrations(
-            author=author, tags=tags, created_at=created_at
-        )
+    ) -> list[tuple[RevisionRecord, str]]:
+        """See `MigrationService.get_combined_migrations`"""
         db_revision_ids = {rev.revision_id for rev in db_migrations}
         local_migrations = list(self.graph.iter())
 
-        combined = list[tuple[Revision, str]]()
+        combined = list[tuple[RevisionRecord, str]]()
 
         for rev in db_migrations:
             combined.append((rev, "applied"))
@@ -176,3 +310,303 @@ class MigrationService:
         combined.sort(key=lambda x: x[0].created_at, reverse=True)
 
         return combined
+
+
+class MigrationService(_BaseMigrationService):
+    def __init__(self, config: Config, graph: MigrationGraph | None = None):
+        super().__init__(config, graph)
+        self.database = get_database_impl(config.dialect, config=config)
+
+    def _retry_lock_timeouts(
+        self, revision: RevisionRecord, apply: Callable[[], T]
+    ) -> T:
+        """`apply` the revision, again after a lock timeout up to the
+        `lock_attempts` of the config. Only the revisions that are rolled
+        back entirely by the timeout are retried.
+        """
+        delays = self._lock_retry_delays(revision)
+        while True:
+            try:
+                return apply()
+            except Exception as exc:
+                delay = next(delays, None)
+                if delay is None or not self.database.is_lock_timeout(exc):
+                    raise
+            rich.print(self._lock_retry_message(revision, delay))
+            time.sleep(delay)
+
+    def upgrade(
+        self,
+        steps: int | None = None,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        to: str | None = None,
+        atomic: bool = False,
+    ):
+        """Apply the pending revisions.
+
+        With `atomic` they are applied in a single transaction, so either all of
+        them or none are, and their rows are inserted in one batch at the end.
+        Otherwise a revision whose lock wait timed out is tried again, up to the
+        `lock_attempts` of the config. An atomic upgrade is not, as it would
+        keep the locks of the revisions before while it waits.
+        """
+        if to is not None:
+            # an unknown target fails before connecting to the database
+            self.graph.get_target(to)
+
+        # one connection for the whole run
+        with self.database.atomic() if atomic else self.database.session():
+            self.database.create_table_migration()
+            head = self.database.get_head_revision()
+            pending = self._pending_upgrades(head, steps, author, tags, to)
+            if atomic:
+                pending = self._atomic_upgrades(pending)
+
+            count = 0
+            applied: list[RevisionRecord] = []
+            for revision in pending:
+                loaded = self.graph.load_revision(revision, dialect=self.config.dialect)
+                if not atomic:
+                    self._retry_lock_timeouts(
+                        revision, lambda: self.database.migrate_up(loaded)
+                    )
+                else:
+                    # recorded together at the end
+                    self.database.migrate_up(loaded, record=False)
+                    applied.append(self._applied_record(loaded))
+                rich.print(
+                    f"(UP) [green]{revision.down_revision_id} -> {revision.revision_id}[/green]"
+                )
+                count += 1
+
+            if applied:
+                self.database.record_migrations(applied)
+
+        if not count:
+            rich.print("[green]Nothing to upgrade, already up to date[/green]")
+        self.graph.save_index()
+
+    def verify(self) -> list[str]:
+        """Compare the checksums of the applied migrations with their files.
+
+        Returns a description of every mismatch, an empty list if there is none.
+        Migrations applied before checksums were recorded, and revisions that
+        have since been squashed, can not be compared and are skipped.
+        """
+        with self.database.session():
+            self.database.create_table_migration()
+            applied_migrations = self.database.list_migrations()
+
+        return self._mismatches(applied_migrations)
+
+    def downgrade(
+        self,
+        steps: int | None = None,
+        to: str | None = None,
+    ):
+        """Revert `steps` revisions, or down to (and not including) `to`"""
+        if to is not None:
+            # an unknown target fails before connecting to the database
+            self.graph.get_target(to)
+
+        # one connection for the whole run
+        with self.database.session():
+            self.database.create_table_migration()
+            head = self.database.get_head_revision()
+            if not head:
+                # No migration to downgrade
+                rich.print("[red]Nothing to downgrade[/red]")
+                return
+
+            for current in self._pending_downgrades(head, steps, to):
+                loaded = self.graph.load_revision(current, dialect=self.config.dialect)
+                self._retry_lock_timeouts(
+                    current, lambda: self.database.migrate_down(loaded)
+                )
+                for replaced in self._replaced_records(current):
+                    self.database.migrate_down(replaced)
+                rich.print(
+                    f"(DOWN) [red]{current.revision_id} -> "
+                    f"{current.down_revision_id}[/red]"
+                )
+
+        self.graph.save_index()
+
+    def filter_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        return self.database.list_migrations(
+            author=author, tags=tags, created_at=created_at
+        )
+
+    def get_combined_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[tuple[RevisionRecord, str]]:
+        db_migrations = self.database.list_migrations(
+            author=author, tags=tags, created_at=created_at
+        )
+        return self._combine(db_migrations, author, tags, created_at)
+
+
+class AsyncMigrationService(_BaseMigrationService):
+    """`MigrationService` for asyncio applications, on an async provider.
+
+    Upgrades, downgrades and listings behave as with `MigrationService`, and
+    the services of several databases can be awaited concurrently. The SQL of
+    a revision is read from its migration file on a worker thread.
+    """
+
+    def __init__(self, config: Config, graph: MigrationGraph | None = None):
+        super().__init__(config, graph)
+        self.database = get_async_database_impl(config.dialect, config=config)
+
+    async def _retry_lock_timeouts(
+        self,
+        revision: RevisionRecord,
+        apply: Callable[[], Awaitable[T]],
+        quiet: bool = False,
+    ) -> T:
+        """See `MigrationService._retry_lock_timeouts`"""
+        delays = self._lock_retry_delays(revision)
+        while True:
+            try:
+                return await apply()
+            except Exception as exc:
+                delay = next(delays, None)
+                if delay is None or not self.database.is_lock_timeout(exc):
+                    raise
+            if not quiet:
+                rich.print(self._lock_retry_message(revision, delay))
+            await asyncio.sleep(delay)
+
+    async def _load_revision(self, revision: RevisionRecord) -> RevisionRecord:
+        return await asyncio.to_thread(
+            self.graph.load_revision, revision, dialect=self.config.dialect
+        )
+
+    async def upgrade(
+        self,
+        steps: int | None = None,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        to: str | None = None,
+        atomic: bool = False,
+        on_applied: Callable[[RevisionRecord], None] | None = None,
+    ) -> int:
+        """See `MigrationService.upgrade`, returns the number of revisions
+        applied.
+
+        `on_applied` is called with every revision once it is applied, instead
+        of printing it.
+        """
+        if to is not None:
+            # an unknown target fails before connecting to the database
+            self.graph.get_target(to)
+
+        # one connection for the whole run
+        async with self.database.atomic() if atomic else self.database.session():
+            await self.database.create_table_migration()
+            head = await self.database.get_head_revision()
+            pending = self._pending_upgrades(head, steps, author, tags, to)
+            if atomic:
+                pending = self._atomic_upgrades(pending)
+
+            count = 0
+            applied: list[RevisionRecord] = []
+            for revision in pending:
+                loaded = await self._load_revision(revision)
+                if not atomic:
+                    await self._retry_lock_timeouts(
+                        revision,
+                        lambda: self.database.migrate_up(loaded),
+                        quiet=on_applied is not None,
+                    )
+                else:
+                    # recorded together at the end
+                    await self.database.migrate_up(loaded, record=False)
+                    applied.append(self._applied_record(loaded))
+                if on_applied is not None:
+                    on_applied(revision)
+                else:
+                    rich.print(
+                        f"(UP) [green]{revision.down_revision_id} -> "
+                        f"{revision.revision_id}[/green]"
+                    )
+                count += 1
+
+            if applied:
+                await self.database.record_migrations(applied)
+
+        if not count and on_applied is None:
+            rich.print("[green]Nothing to upgrade, already up to date[/green]")
+        self.graph.save_index()
+        return count
+
+    async def verify(self) -> list[str]:
+        """See `MigrationService.verify`"""
+        async with self.database.session():
+            await self.database.create_table_migration()
+            applied_migrations = await self.database.list_migrations()
+
+        return self._mismatches(applied_migrations)
+
+    async def downgrade(
+        self,
+        steps: int | None = None,
+        to: str | None = None,
+    ):
+        """See `MigrationService.downgrade`"""
+        if to is not None:
+            # an unknown target fails before connecting to the database
+            self.graph.get_target(to)
+
+        # one connection for the whole run
+        async with self.database.session():
+            await self.database.create_table_migration()
+            head = await self.database.get_head_revision()
+            if not head:
+                # No migration to downgrade
+                rich.print("[red]Nothing to downgrade[/red]")
+                return
+
+            for current in self._pending_downgrades(head, steps, to):
+                loaded = await self._load_revision(current)
+                await self._retry_lock_timeouts(
+                    current, lambda: self.database.migrate_down(loaded)
+                )
+                for replaced in self._replaced_records(current):
+                    await self.database.migrate_down(replaced)
+                rich.print(
+                    f"(DOWN) [red]{current.revision_id} -> "
+                    f"{current.down_revision_id}[/red]"
+                )
+
+        self.graph.save_index()
+
+    async def filter_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[RevisionRecord]:
+        return await self.database.list_migrations(
+            author=author, tags=tags, created_at=created_at
+        )
+
+    async def get_combined_migrations(
+        self,
+        author: str | None = None,
+        tags: list[str] | None = None,
+        created_at: datetime | None = None,
+    ) -> list[tuple[RevisionRecord, str]]:
+        db_migrations = await self.database.list_migrations(
+            author=author, tags=tags, created_at=created_at
+        )
+        return self._combine(db_migrations, author, tags, created_at)
@@ -1,10 +1,19 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from enum import StrEnum
-from typing import Annotated, TypedDict
+from pathlib import Path
+from typing import Annotated, NamedTuple, TypedDict
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
-from wandern.constants import DEFAULT_FILE_FORMAT, DEFAULT_MIGRATION_TABLE
+from wandern.constants import (
+    DEFAULT_FILE_FORMAT,
+    DEFAULT_INDEX_FILENAME,
+    DEFAULT_MIGRATION_TABLE,
+    DEFAULT_STREAM_THRESHOLD,
+)
+from wandern.statements import Statement, read_statements, split_statements
 
 
 class DatabaseProviders(StrEnum):
@@ -14,6 +23,11 @@ class DatabaseProviders(StrEnum):
     MSSQL = "mssql"  # FUTURE: not implemented
 
 
+class ParseExecutor(StrEnum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
 class Config(BaseModel):
     dsn: str
     migration_dir: str
@@ -22,6 +36,36 @@ class Config(BaseModel):
     file_format: str | None = Field(default=DEFAULT_FILE_FORMAT)
     migration_table: str = Field(default=DEFAULT_MIGRATION_TABLE)
 
+    # cache of parsed migration headers, set to null to disable
+    index_file: str | None = Field(default=DEFAULT_INDEX_FILENAME)
+
+    # parallel parsing of migration files, 0 workers means one per CPU
+    parse_workers: int = Field(default=1, ge=0)
+    parse_executor: ParseExecutor = Field(default=ParseExecutor.THREAD)
+
+    # SQL sections larger than this many bytes are executed statement by
+    # statement from disk instead of being loaded, set to null to disable
+    stream_threshold: int | None = Field(default=DEFAULT_STREAM_THRESHOLD, ge=0)
+
+    # PostgreSQL sends the statements of a revision in pipeline mode, without
+    # waiting for the result of each of them
+    pipeline: bool = Field(default=False)
+
+    # bounds on the waits of every revision, in seconds, null for none. On
+    # PostgreSQL lock_timeout and statement_timeout, on MySQL lock_wait_timeout
+    # and on SQLite busy_timeout. A revision can set its own in its header
+    lock_timeout: float | None = Field(default=None, gt=0)
+    statement_timeout: float | None = Field(default=None, gt=0)
+    # tries of a revision whose lock wait timed out, the retries wait
+    # lock_retry_delay seconds, doubled after every retry, with a random jitter
+    lock_attempts: int = Field(default=1, ge=1)
+    lock_retry_delay: float = Field(default=1.0, ge=0)
+
+    # PostgreSQL schema holding the migration table, the migrations run with
+    # it as the search_path. null keeps the table in public and the default
+    # search_path
+    db_schema: str | None = Field(default=None)
+
     @property
     def dialect(self):
         _dialect = self.dsn.split("://")[0]
@@ -40,7 +84,76 @@ class FileTemplateArgs(TypedDict):
     datetime: datetime | None
 
 
-class Revision(BaseModel):
+class SectionOffsets(NamedTuple):
+    """Byte ranges of the UP and DOWN SQL inside a migration file.
+
+    For compressed files they refer to the decompressed content, and
+    `down_end` is -1 as the DOWN section runs to the end of the file.
+    """
+
+    up_start: int
+    up_end: int
+    down_start: int
+    down_end: int
+
+
+class SqlFile(NamedTuple):
+    """Migration file whose SQL is too large to load, and is streamed instead"""
+
+    path: Path
+    offsets: SectionOffsets
+
+    def up_statements(self, dialect: str | None = None) -> Iterator[Statement]:
+        return read_statements(
+            self.path, self.offsets.up_start, self.offsets.up_end, dialect
+        )
+
+    def down_statements(self, dialect: str | None = None) -> Iterator[Statement]:
+        return read_statements(
+            self.path, self.offsets.down_start, self.offsets.down_end, dialect
+        )
+
+
+class SplitSql(NamedTuple):
+    """UP and DOWN SQL of a revision split into statements for a dialect"""
+
+    dialect: str
+    up: list[Statement]
+    down: list[Statement]
+
+
+class SqlStatements:
+    """Statement accessors shared by `Revision` and `RevisionRecord`"""
+
+    __slots__ = ()
+
+    up_sql: str | None
+    down_sql: str | None
+    sql_file: SqlFile | None
+    statements: SplitSql | None
+
+    def up_statements(self, dialect: str | None = None) -> Iterable[Statement]:
+        """Statements of the UP SQL, split for `dialect` unless they already are"""
+        if self.statements is not None and self.statements.dialect == dialect:
+            return self.statements.up
+        if self.sql_file is not None:
+            return self.sql_file.up_statements(dialect)
+        return split_statements([self.up_sql or ""], dialect)
+
+    def down_statements(self, dialect: str | None = None) -> Iterable[Statement]:
+        """Statements of the DOWN SQL, split for `dialect` unless they already are"""
+        if self.statements is not None and self.statements.dialect == dialect:
+            return self.statements.down
+        if self.sql_file is not None:
+            return self.sql_file.down_statements(dialect)
+        return split_statements([self.down_sql or ""], dialect)
+
+
+class Revision(SqlStatements, BaseModel):
+    # revisions are shared by the migration graph and handed out as they are,
+    # use `model_copy(update=...)` to derive a changed revision
+    model_config = ConfigDict(frozen=True)
+
     revision_id: Annotated[
         str, Field(description="The unique identifier for the revision")
     ]
@@ -76,3 +189,97 @@ class Revision(BaseModel):
             description="Time when the revision was created",
         ),
     ] = datetime.now()
+    replaces: Annotated[
+        list[str] | None,
+        Field(description="IDs of the revisions squashed into this revision"),
+    ] = None
+    transactional: Annotated[
+        bool,
+        Field(
+            description=(
+                "False if the SQL must run outside of a transaction, "
+                "e.g. CREATE INDEX CONCURRENTLY"
+            )
+        ),
+    ] = True
+    lock_timeout: Annotated[
+        float | None,
+        Field(description="Seconds to wait for a lock, instead of the config's"),
+    ] = None
+    statement_timeout: Annotated[
+        float | None,
+        Field(description="Seconds a statement may run, instead of the config's"),
+    ] = None
+    checksum: Annotated[
+        str | None,
+        Field(description="Checksum of the UP and DOWN SQL, once it was read"),
+    ] = None
+    sql_file: Annotated[
+        SqlFile | None,
+        Field(
+            exclude=True,
+            description="File to stream the SQL from, when it is too large to load",
+        ),
+    ] = None
+    statements: Annotated[
+        SplitSql | None,
+        Field(
+            exclude=True,
+            description="The SQL split into statements, once it was split",
+        ),
+    ] = None
+
+
+@dataclass(frozen=True, slots=True)
+class RevisionRecord(SqlStatements):
+    """Compact, immutable revision used inside wandern.
+
+    Holds the same fields as `Revision` without pydantic's per instance
+    overhead, for the graph and for rows read from the migration table.
+    Convert to `Revision` with `to_revision` where a pydantic model is
+    needed, e.g. for JSON or the agents.
+    """
+
+    revision_id: str
+    down_revision_id: str | None
+    message: str
+    tags: list[str] | None = None
+    author: str | None = None
+    up_sql: str | None = None
+    down_sql: str | None = None
+    created_at: datetime = field(default_factory=datetime.now)
+    replaces: list[str] | None = None
+    # run outside of a transaction, see `Revision.transactional`
+    transactional: bool = True
+    # in seconds, instead of those of the config
+    lock_timeout: float | None = None
+    statement_timeout: float | None = None
+    # of the UP and DOWN SQL, see `wandern.utils.sql_checksum`
+    checksum: str | None = None
+    # set instead of `up_sql` and `down_sql` when they are streamed
+    sql_file: SqlFile | None = None
+    # `up_sql` and `down_sql` split into statements, see `up_statements`
+    statements: SplitSql | None = None
+
+    @classmethod
+    def from_revision(cls, revision: Revision) -> "RevisionRecord":
+        return cls(
+            revision_id=revision.revision_id,
+            down_revision_id=revision.down_revision_id,
+            message=revision.message,
+            tags=revision.tags,
+            author=revision.author,
+            up_sql=revision.up_sql,
+            down_sql=revision.down_sql,
+            created_at=revision.created_at,
+            replaces=revision.replaces,
+            transactional=revision.transactional,
+            lock_timeout=revision.lock_timeout,
+            statement_timeout=revision.statement_timeout,
+            checksum=revision.checksum,
+            sql_file=revision.sql_file,
+            statements=revision.statements,
+        )
+
+    def to_revision(self) -> Revision:
+        return Revision(**{f.name: getattr(self, f.name) for f in fields(self)})
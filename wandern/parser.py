@@ -0,0 +1,187 @@
+import os
+from datetime import datetime
+from typing import BinaryIO, Pattern
+
+from wandern.constants import (
+    REGEX_AUTHOR,
+    REGEX_DOWN_MARKER,
+    REGEX_DURATION,
+    REGEX_LOCK_TIMEOUT,
+    REGEX_MESSAGE,
+    REGEX_REPLACES,
+    REGEX_REVISES,
+    REGEX_REVISION_ID,
+    REGEX_STATEMENT_TIMEOUT,
+    REGEX_TAGS,
+    REGEX_TIMESTAMP,
+    REGEX_TRANSACTIONAL,
+    REGEX_UP_MARKER,
+)
+from wandern.models import Revision, SectionOffsets
+
+FIELD_PATTERNS: dict[str, Pattern] = {
+    "timestamp": REGEX_TIMESTAMP,
+    "revision_id": REGEX_REVISION_ID,
+    "revises": REGEX_REVISES,
+    "message": REGEX_MESSAGE,
+    "author": REGEX_AUTHOR,
+    "tags": REGEX_TAGS,
+    "replaces": REGEX_REPLACES,
+    "transactional": REGEX_TRANSACTIONAL,
+    "lock_timeout": REGEX_LOCK_TIMEOUT,
+    "statement_timeout": REGEX_STATEMENT_TIMEOUT,
+}
+
+TRUE_VALUES = {"true", "yes", "1"}
+FALSE_VALUES = {"false", "no", "0"}
+
+DURATION_UNITS = {"ms": 0.001, "s": 1, "min": 60}
+
+# parser states, in the order they appear in a migration file
+PREAMBLE, COMMENT, MARKER, UP, DOWN = range(5)
+
+
+def decode_sql(data: bytes) -> str:
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def parse_duration(value: str) -> float:
+    """Seconds of a duration such as `500ms`, `5s` or `2min`, a bare number is
+    in seconds.
+    """
+    match = REGEX_DURATION.fullmatch(value.strip())
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    unit = (match.group("unit") or "s").lower()
+    return float(match.group("value")) * DURATION_UNITS[unit]
+
+
+def revision_from_fields(
+    fields: dict[str, str], up_sql: str | None = None, down_sql: str | None = None
+) -> Revision:
+    # Validate required fields
+    if "timestamp" not in fields:
+        raise ValueError("Timestamp field is required in migration file")
+    if "revision_id" not in fields:
+        raise ValueError("Revision ID field is required in migration file")
+    if "revises" not in fields:
+        raise ValueError("Revises field is required in migration file")
+    if "message" not in fields:
+        raise ValueError("Message field is required in migration file")
+
+    down_revision_id = fields["revises"]
+    tags = fields.get("tags")
+    replaces = fields.get("replaces")
+    transactional = fields.get("transactional", "true").lower()
+    lock_timeout = fields.get("lock_timeout")
+    statement_timeout = fields.get("statement_timeout")
+    if transactional not in TRUE_VALUES | FALSE_VALUES:
+        raise ValueError(
+            f"Transactional field must be true or false, not {fields['transactional']}"
+        )
+
+    return Revision(
+        revision_id=fields["revision_id"],
+        down_revision_id=(
+            None
+            if not down_revision_id or down_revision_id.lower() == "none"
+            else down_revision_id
+        ),
+        message=fields["message"],
+        author=fields.get("author"),
+        tags=tags.split(",") if tags is not None else None,
+        up_sql=up_sql,
+        down_sql=down_sql,
+        created_at=datetime.fromisoformat(fields["timestamp"]),
+        replaces=(
+            [revision_id.strip() for revision_id in replaces.split(",")]
+            if replaces is not None
+            else None
+        ),
+        transactional=transactional in TRUE_VALUES,
+        lock_timeout=parse_duration(lock_timeout) if lock_timeout else None,
+        statement_timeout=(
+            parse_duration(statement_timeout) if statement_timeout else None
+        ),
+    )
+
+
+def parse_migration(
+    file: BinaryIO, with_sql: bool = False, compressed: bool = False
+) -> tuple[Revision, SectionOffsets]:
+    """Parse a migration file in a single pass over its lines.
+
+    Header fields are matched line by line inside the leading `/* ... */` block,
+    and the `-- UP` and `-- DOWN` markers are located on the way, so every line
+    is looked at once and the running time is linear in the size of the file.
+    Without `with_sql` scanning stops at the `-- DOWN` marker and no SQL is
+    kept in memory. The size of a `compressed` file is not looked up, as that
+    would decompress all of it.
+    """
+    fields: dict[str, str] = {}
+    up_lines: list[bytes] = []
+    down_lines: list[bytes] = []
+    state = PREAMBLE
+    offset = up_start = up_end = down_start = 0
+
+    for line in file:
+        line_start = offset
+        offset += len(line)
+
+        if state == PREAMBLE:
+            open_at = line.find(b"/*")
+            if open_at == -1:
+                continue
+            line = line[open_at + 2 :]
+            state = COMMENT
+
+        if state == COMMENT:
+            close_at = line.find(b"*/")
+            comment = line if close_at == -1 else line[:close_at]
+            if comment.strip():
+                comment_str = comment.decode("utf-8")
+                for name, pattern in FIELD_PATTERNS.items():
+                    if name not in fields and (match := pattern.search(comment_str)):
+                        fields[name] = match.group(name).strip()
+            if close_at == -1:
+                continue
+            line = line[close_at + 2 :]
+            state = MARKER
+
+        if state == MARKER:
+            if not line.strip():
+                continue
+            if not REGEX_UP_MARKER.match(line):
+                break
+            up_start = offset
+            state = UP
+        elif state == UP:
+            if REGEX_DOWN_MARKER.match(line):
+                up_end = line_start
+                down_start = offset
+                state = DOWN
+                if not with_sql:
+                    break
+            elif with_sql:
+                up_lines.append(line)
+        elif state == DOWN:
+            down_lines.append(line)
+
+    if state != DOWN:
+        raise ValueError("Invalid migration file format")
+
+    if with_sql:
+        revision = revision_from_fields(
+            fields,
+            up_sql=decode_sql(b"".join(up_lines)),
+            down_sql=decode_sql(b"".join(down_lines)),
+        )
+        down_end = offset
+    else:
+        # the DOWN section runs to the end of the file
+        revision = revision_from_fields(fields)
+        down_end = -1 if compressed else file.seek(0, os.SEEK_END)
+
+    return revision, SectionOffsets(
+        up_start=up_start, up_end=up_end, down_start=down_start, down_end=down_end
+    )
@@ -0,0 +1,331 @@
+import codecs
+import re
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from wandern.compression import DECOMPRESSION_ERRORS, open_migration_file
+
+# bytes read from a migration file at a time while streaming
+CHUNK_SIZE = 1024 * 1024
+
+# longer tokens, i.e. dollar quote tags, are not recognised across chunks
+MAX_TOKEN = 64
+
+# statements of revisions with more than this are not kept in the split cache
+MAX_CACHED_STATEMENTS = 1000
+
+
+def read_chunks(
+    file_path: str | Path, start: int, end: int, chunk_size: int = CHUNK_SIZE
+) -> Iterator[str]:
+    """Decoded text of a byte range of a file, a chunk at a time.
+
+    A negative `end` reads to the end of the file.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open_migration_file(file_path) as file:
+        try:
+            file.seek(start)
+            remaining = end - start if end >= 0 else None
+            while remaining is None or remaining > 0:
+                data = file.read(
+                    chunk_size if remaining is None else min(chunk_size, remaining)
+                )
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield decoder.decode(data)
+        except DECOMPRESSION_ERRORS as exc:
+            raise ValueError(f"Corrupt compressed file: {file_path}") from exc
+    yield decoder.decode(b"", final=True)
+
+
+class Statement(NamedTuple):
+    """A SQL statement, and the line of its section it starts on"""
+
+    sql: str
+    line: int
+
+
+# start and end offset in the text of a section, and line of a statement
+StatementSpan = tuple[int, int, int]
+
+
+class DialectRules(NamedTuple):
+    """How the text of a dialect is split into statements"""
+
+    # openers of quotes and comments, as regular expression alternatives
+    quotes: str
+    # strings may contain backslash escaped quotes
+    backslash_escapes: bool = False
+    # `;` inside the BEGIN ... END body of a CREATE TRIGGER or PROCEDURE
+    # does not end the statement
+    compound_bodies: bool = False
+    # `DELIMITER //` lines change the statement terminator, like the mysql client
+    delimiter_command: bool = False
+
+
+QUOTES = r"""/\*!?|--|'|"|\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$"""
+
+DIALECTS: dict[str | None, DialectRules] = {
+    None: DialectRules(quotes=QUOTES),
+    # E'...' strings take backslash escapes
+    "postgresql": DialectRules(quotes=r"(?<![\w$])[Ee]'|" + QUOTES),
+    "sqlite": DialectRules(
+        quotes=r"""/\*|--|'|"|`|\[""",
+        compound_bodies=True,
+    ),
+    "mysql": DialectRules(
+        quotes=r"""/\*!?|--|\#|'|"|`""",
+        backslash_escapes=True,
+        compound_bodies=True,
+        delimiter_command=True,
+    ),
+}
+
+# BEGIN and CASE open a block inside a compound body, END closes it unless it
+# ends a MySQL IF, LOOP, WHILE or REPEAT statement, which are not counted
+REGEX_KEYWORD = r"""(?<![\w$])(?i:CREATE|BEGIN|CASE|END(?:\s+(?:IF|LOOP|WHILE|REPEAT|CASE)(?![\w$]))?)(?![\w$])"""
+REGEX_DELIMITER_COMMAND = r"(?<![\w$])(?i:DELIMITER)(?=[ \t])"
+REGEX_CODE = re.compile(r"\S")
+
+# end of the quote or comment opened by a token, and its closing text
+ESCAPED = re.compile(r"\\[\s\S]|'")
+CLOSING: dict[str, tuple[re.Pattern, str]] = {
+    "'": (re.compile("'"), "'"),
+    '"': (re.compile('"'), '"'),
+    "`": (re.compile("`"), "`"),
+    "[": (re.compile(r"\]"), "]"),
+    "--": (re.compile("\n"), "\n"),
+    "#": (re.compile("\n"), "\n"),
+    "/*": (re.compile(r"\*/"), "*/"),
+    "/*!": (re.compile(r"\*/"), "*/"),
+}
+ESCAPED_CLOSING: dict[str, tuple[re.Pattern, str]] = {
+    "'": (ESCAPED, "'"),
+    '"': (re.compile(r'\\[\s\S]|"'), '"'),
+}
+
+
+def _token_pattern(rules: DialectRules, delimiter: str) -> re.Pattern:
+    alternatives = ["(?P<semicolon>;)", f"(?P<quote>{rules.quotes})"]
+    if delimiter != ";":
+        alternatives.insert(0, f"(?P<delimiter>{re.escape(delimiter)})")
+    if rules.compound_bodies:
+        alternatives.append(f"(?P<keyword>{REGEX_KEYWORD})")
+    if rules.delimiter_command:
+        alternatives.append(f"(?P<command>{REGEX_DELIMITER_COMMAND})")
+    return re.compile("|".join(alternatives))
+
+
+class _Splitter:
+    """Splits SQL text fed a chunk at a time, see `split_statements`"""
+
+    def __init__(self, dialect: str | None):
+        self.rules = DIALECTS.get(dialect, DIALECTS[None])
+        self.delimiter = ";"
+        self.tokens = _token_pattern(self.rules, self.delimiter)
+        self.buffer = ""
+        self.offset = 0  # of the buffer in the text
+        self.closing: tuple[re.Pattern, str] | None = None
+
+        # current statement, its text from earlier buffers is kept in `parts`
+        self.parts: list[str] = []
+        self.start = 0  # of its text in the buffer
+        self.statement_offset = 0
+        self.code_line = 0  # 0 until it has code, not only comments
+        self.creating = False
+        self.depth = 0
+
+        # line number at `line_pos` in the buffer
+        self.line = 1
+        self.line_pos = 0
+
+    def _line_at(self, pos: int) -> int:
+        self.line += self.buffer.count("\n", self.line_pos, pos)
+        self.line_pos = pos
+        return self.line
+
+    def _code(self, pos: int) -> None:
+        if not self.code_line:
+            self.code_line = self._line_at(pos)
+
+    def _emit(self, end: int, next_start: int) -> tuple[Statement, int, int] | None:
+        text = "".join(self.parts) + self.buffer[self.start : end]
+        statement_offset = self.statement_offset
+        self.parts.clear()
+        self.start = next_start
+        self.statement_offset = self.offset + next_start
+
+        code_line = self.code_line
+        self.code_line = 0
+        self.creating = False
+        self.depth = 0
+
+        sql = text.strip()
+        if not code_line or not sql:
+            return None
+        start = statement_offset + len(text) - len(text.lstrip())
+        return Statement(sql, code_line), start, start + len(sql)
+
+    def _scan(self, final: bool) -> Iterator[tuple[Statement, int, int]]:
+        buffer = self.buffer
+        # tokens starting before `limit` are complete, unless more text follows
+        limit = len(buffer) if final else len(buffer) - MAX_TOKEN
+        pos = 0
+        while pos < limit:
+            if self.closing is not None:
+                pattern, closer = self.closing
+                match = pattern.search(buffer, pos)
+                if match is None or match.start() >= limit:
+                    pos = limit
+                    break
+                pos = match.end()
+                if match.group() == closer:
+                    self.closing = None
+                continue
+
+            match = self.tokens.search(buffer, pos)
+            end = limit if match is None else min(match.start(), limit)
+            code = REGEX_CODE.search(buffer, pos, end)
+            if code is not None:
+                self._code(code.start())
+            if match is None or match.start() >= limit:
+                pos = limit
+                break
+
+            kind = match.lastgroup
+            token = match.group()
+            pos = match.end()
+            if kind == "delimiter":
+                if split := self._emit(match.start(), pos):
+                    yield split
+            elif kind == "semicolon":
+                if self.delimiter != ";" or self.depth:
+                    self._code(match.start())
+                elif split := self._emit(pos, pos):
+                    yield split
+            elif kind == "quote":
+                if token not in ("--", "#", "/*"):
+                    self._code(match.start())
+                closing = (
+                    ESCAPED_CLOSING.get(token) if self.rules.backslash_escapes else None
+                )
+                if token[0] in "Ee":
+                    closing = ESCAPED_CLOSING["'"]
+                elif token[0] == "$":
+                    closing = (re.compile(re.escape(token)), token)
+                self.closing = closing or CLOSING[token]
+            elif kind == "keyword":
+                words = token.upper().split()
+                if words[0] == "CREATE" and not self.code_line:
+                    self.creating = True
+                elif words[0] == "BEGIN" and self.creating:
+                    self.depth += 1
+                elif words[0] == "CASE" and self.depth:
+                    self.depth += 1
+                elif words[0] == "END" and self.depth and words[-1] in ("END", "CASE"):
+                    self.depth -= 1
+                self._code(match.start())
+            elif kind == "command":
+                if self.code_line:
+                    continue
+                line_end = buffer.find("\n", pos)
+                if line_end == -1:
+                    if not final:
+                        # wait for the rest of the line
+                        pos = match.start()
+                        break
+                    line_end = len(buffer)
+                delimiter = buffer[pos:line_end].strip()
+                if delimiter:
+                    self.delimiter = delimiter
+                    self.tokens = _token_pattern(self.rules, delimiter)
+                # the command is not part of any statement
+                self._emit(line_end, line_end)
+                pos = line_end
+
+        self.parts.append(buffer[self.start : pos])
+        self._line_at(pos)
+        self.buffer = buffer[pos:]
+        self.offset += pos
+        self.start = 0
+        self.line_pos = 0
+
+    def split(self, chunks: Iterable[str]) -> Iterator[tuple[Statement, int, int]]:
+        for chunk in chunks:
+            self.buffer += chunk
+            if len(self.buffer) >= 2 * MAX_TOKEN:
+                yield from self._scan(final=False)
+
+        yield from self._scan(final=True)
+        if split := self._emit(len(self.buffer), len(self.buffer)):
+            yield split
+
+
+def split_statements(
+    chunks: Iterable[str], dialect: str | None = None
+) -> Iterator[Statement]:
+    """Split SQL text into statements, at semicolons outside of quotes and
+    comments.
+
+    The quoting rules of `dialect` are followed, e.g. PostgreSQL dollar quotes,
+    MySQL `DELIMITER` commands and the BEGIN ... END bodies of SQLite and
+    MySQL triggers. The text is consumed a chunk at a time and only the
+    statement being read is kept in memory. Statements are stripped, with their
+    terminating semicolon, and statements holding nothing but comments are
+    dropped.
+    """
+    for statement, _, _ in _Splitter(dialect).split(chunks):
+        yield statement
+
+
+def statement_spans(sql: str, dialect: str | None = None) -> list[StatementSpan]:
+    """Offsets and lines of the statements of `sql`, see `split_statements`"""
+    return [
+        (start, end, statement.line)
+        for statement, start, end in _Splitter(dialect).split([sql])
+    ]
+
+
+def spans_to_statements(sql: str, spans: list[StatementSpan]) -> list[Statement]:
+    return [Statement(sql[start:end], line) for start, end, line in spans]
+
+
+def read_statements(
+    file_path: str | Path, start: int, end: int, dialect: str | None = None
+) -> Iterator[Statement]:
+    """Statements of a SQL section of a migration file, streamed from disk"""
+    return split_statements(read_chunks(file_path, start, end), dialect)
+
+
+def execute_statements(
+    execute: Callable[[str], object], statements: Iterable[Statement], location: str
+) -> None:
+    """Execute statements one at a time.
+
+    An error is annotated with the line of the statement that raised it and
+    with `location`, e.g. "the UP SQL of revision 0001".
+    """
+    for statement in statements:
+        try:
+            execute(statement.sql)
+        except Exception as exc:
+            exc.add_note(f"In the statement on line {statement.line} of {location}")
+            raise
+
+
+async def execute_statements_async(
+    execute: Callable[[str], Awaitable[object]],
+    statements: Iterable[Statement],
+    location: str,
+) -> None:
+    """Like `execute_statements`, awaiting each statement in turn"""
+    for statement in statements:
+        try:
+            await execute(statement.sql)
+        except Exception as exc:
+            exc.add_note(f"In the statement on line {statement.line} of {location}")
+            raise
@@ -11,16 +11,15 @@ from string import Formatter
 import rich
 import typer
 
-from wandern.constants import (
-    REGEX_AUTHOR,
-    REGEX_MESSAGE,
-    REGEX_MIGRATION_PARSER,
-    REGEX_REVISES,
-    REGEX_REVISION_ID,
-    REGEX_TAGS,
-    REGEX_TIMESTAMP,
+from wandern.compression import (
+    DECOMPRESSION_ERRORS,
+    is_compressed,
+    is_migration_file,
+    open_migration_file,
 )
-from wandern.models import Config, FileTemplateArgs, Revision
+from wandern.exceptions import InvalidMigrationFile
+from wandern.models import Config, FileTemplateArgs, Revision, SectionOffsets
+from wandern.parser import decode_sql, parse_migration
 
 
 def slugify(text: str, length: int = 10) -> str:
@@ -63,60 +62,104 @@ def generate_migration_filename(
         ) from exc
 
 
+def list_migration_files(migration_dir: str | Path) -> list[Path]:
+    files = []
+    for file in sorted(Path(migration_dir).iterdir()):
+        if not os.path.isfile(file) or not is_migration_file(file):
+            raise InvalidMigrationFile("Migration file must be a sql file")
+        files.append(file)
+    return files
+
+
 def parse_sql_file_content(file_path: str | Path) -> Revision:
-    with open(file_path, encoding="utf-8") as file:
-        content = file.read()
-
-        match = REGEX_MIGRATION_PARSER.search(content)
-
-        if not match:
-            raise ValueError("Invalid migration file format")
-
-        group: dict[str, str] = match.groupdict()
-        comment_block = group["comment_block"]
-        up_sql = group["up_sql"].strip()
-        down_sql = group["down_sql"].strip()
-
-        # Extract individual fields from comment block
-        timestamp_match = REGEX_TIMESTAMP.search(comment_block)
-        revision_id_match = REGEX_REVISION_ID.search(comment_block)
-        revises_match = REGEX_REVISES.search(comment_block)
-        message_match = REGEX_MESSAGE.search(comment_block)
-        author_match = REGEX_AUTHOR.search(comment_block)
-        tags_match = REGEX_TAGS.search(comment_block)
-
-        # Validate required fields
-        if not timestamp_match:
-            raise ValueError("Timestamp field is required in migration file")
-        if not revision_id_match:
-            raise ValueError("Revision ID field is required in migration file")
-        if not revises_match:
-            raise ValueError("Revises field is required in migration file")
-        if not message_match:
-            raise ValueError("Message field is required in migration file")
-
-        # Extract field values
-        revision_id = revision_id_match.group("revision_id").strip()
-        down_revision_id: str | None = revises_match.group("revises").strip()
-        created_at = timestamp_match.group("timestamp").strip()
-        message = message_match.group("message").strip()
-        author = author_match.group("author").strip() if author_match else None
-        tags = tags_match.group("tags").strip().split(",") if tags_match else None
-
-        return Revision(
-            revision_id=revision_id,
-            down_revision_id=(
-                None
-                if not down_revision_id or down_revision_id.lower() == "none"
-                else down_revision_id
-            ),
-            message=message,
-            author=author,
-            tags=tags,
-            up_sql=up_sql,
-            down_sql=down_sql,
-            created_at=datetime.fromisoformat(created_at),
-        )
+    with open_migration_file(file_path) as file:
+        try:
+            revision, _ = parse_migration(file, with_sql=True)
+        except DECOMPRESSION_ERRORS as exc:
+            raise ValueError(f"Corrupt compressed file: {file_path}") from exc
+        return revision
+
+
+def parse_sql_file_header(file_path: str | Path) -> tuple[Revision, SectionOffsets]:
+    """Parse only the comment block of a migration file.
+
+    The UP and DOWN SQL are not loaded, instead their byte offsets are returned
+    so they can be read with `read_sql_section` when they are needed. Only the
+    leading part of a compressed file is decompressed.
+    """
+    with open_migration_file(file_path) as file:
+        try:
+            return parse_migration(file, compressed=is_compressed(file_path))
+        except DECOMPRESSION_ERRORS as exc:
+            raise ValueError(f"Corrupt compressed file: {file_path}") from exc
+
+
+def read_sql_section(file_path: str | Path, start: int, end: int) -> str:
+    """Read the SQL between two byte offsets, a negative `end` reads to the
+    end of the file.
+    """
+    with open_migration_file(file_path) as file:
+        try:
+            file.seek(start)
+            return decode_sql(file.read(end - start if end >= 0 else -1))
+        except DECOMPRESSION_ERRORS as exc:
+            raise ValueError(f"Corrupt compressed file: {file_path}") from exc
+
+
+class SqlChecksum:
+    """Incremental `sql_checksum`, fed the UP and then the DOWN SQL in chunks,
+    each followed by `end_section`.
+    """
+
+    def __init__(self):
+        self._digest = hashlib.blake2b(digest_size=16)
+        self._partial = ""
+        self._started = False
+        self._blank_lines = 0
+
+    def update(self, text: str) -> None:
+        lines = (self._partial + text).splitlines(keepends=True)
+        # a line break may continue in the next chunk, e.g. "\r" + "\n"
+        self._partial = ""
+        if lines and (lines[-1] == lines[-1].rstrip("\r\n") or lines[-1][-1] == "\r"):
+            self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+
+    def _line(self, line: str) -> None:
+        line = line.rstrip()
+        if not line:
+            self._blank_lines += self._started
+        elif self._started:
+            self._digest.update(("\n" * (self._blank_lines + 1) + line).encode("utf-8"))
+            self._blank_lines = 0
+        else:
+            self._digest.update(line.lstrip().encode("utf-8"))
+            self._started = True
+
+    def end_section(self) -> None:
+        for line in self._partial.splitlines():
+            self._line(line)
+        self._digest.update(b"\0")
+        self._partial = ""
+        self._started = False
+        self._blank_lines = 0
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def sql_checksum(up_sql: str | None, down_sql: str | None) -> str:
+    """BLAKE2 hash of the UP and DOWN SQL of a revision.
+
+    Line endings, surrounding blank lines and trailing whitespace are ignored,
+    so re-saving a file in another editor does not change its checksum.
+    """
+    checksum = SqlChecksum()
+    for sql in (up_sql, down_sql):
+        checksum.update(sql or "")
+        checksum.end_section()
+    return checksum.hexdigest()
 
 
 def generate_revision_id() -> str:
@@ -130,6 +173,10 @@ def create_migration(
     tags: list[str] | None = None,
     up_sql: str | None = None,
     down_sql: str | None = None,
+    replaces: list[str] | None = None,
+    transactional: bool = True,
+    lock_timeout: float | None = None,
+    statement_timeout: float | None = None,
 ) -> Revision:
     version = generate_revision_id()
 
@@ -142,6 +189,10 @@ def create_migration(
         up_sql=up_sql,
         down_sql=down_sql,
         created_at=datetime.now(),
+        replaces=replaces,
+        transactional=transactional,
+        lock_timeout=lock_timeout,
+        statement_timeout=statement_timeout,
     )
 
 
@@ -155,7 +206,12 @@ def load_config(path: str | Path) -> Config:
         config = Config(**json.load(file))
 
     migration_dir = os.path.abspath(config.migration_dir)
-    if not os.access(migration_dir, os.W_OK):
+    if os.path.isfile(migration_dir):
+        # a migration bundle, only read from
+        if not os.access(migration_dir, os.R_OK):
+            rich.print("[red]Migration bundle is not readable[/red]")
+            raise typer.Exit(code=1)
+    elif not os.access(migration_dir, os.W_OK):
         rich.print("[red]Migration directory is not writeable[/red]")
         raise typer.Exit(code=1)
 
@@ -0,0 +1,188 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Protocol
+
+from wandern.compression import is_migration_file
+from wandern.exceptions import WandernException
+from wandern.graph import MigrationGraph
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# wd, mask, cookie, length of the name that follows
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# files being written are picked up once they are closed or moved in place
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+
+class DirectoryWatcher(Protocol):
+    def changes(self, timeout: float = 0) -> set[str] | None:
+        """Names of the files changed since the last call, waiting up to
+        `timeout` seconds for one. None if changes were lost and the whole
+        directory has to be compared again.
+        """
+        ...
+
+    def close(self) -> None: ...
+
+
+class InotifyWatcher:
+    """Directory watcher using inotify, only available on Linux"""
+
+    def __init__(self, directory: str | Path):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, os.strerror(errno), str(directory))
+
+    def changes(self, timeout: float = 0) -> set[str] | None:
+        names: set[str] = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return names
+
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if length:
+                    name = data[offset : offset + length].rstrip(b"\0")
+                    names.add(os.fsdecode(name))
+                offset += length
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Directory watcher comparing file sizes and modification times"""
+
+    def __init__(self, directory: str | Path, interval: float = 0.5):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def changes(self, timeout: float = 0) -> set[str] | None:
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            names = {
+                name
+                for name in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(name) != self._snapshot.get(name)
+            }
+            self._snapshot = snapshot
+
+            remaining = deadline - time.monotonic()
+            if names or remaining <= 0:
+                return names
+            time.sleep(min(self.interval, remaining))
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(directory: str | Path, interval: float = 0.5) -> DirectoryWatcher:
+    """Watch with inotify where available, by polling otherwise"""
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError):
+        # AttributeError when libc has no inotify functions
+        return PollingWatcher(directory, interval=interval)
+
+
+class GraphWatcher:
+    """Keeps a migration graph in sync with the files of its migration directory.
+
+    Each `refresh` re-parses only the files changed since the last one, and
+    returns whether the graph changed. `graph.version` changes along with it,
+    for consumers that only hold on to the graph.
+    """
+
+    def __init__(
+        self,
+        graph: MigrationGraph,
+        migration_dir: str | Path,
+        watcher: DirectoryWatcher | None = None,
+    ):
+        self.graph = graph
+        self.migration_dir = Path(migration_dir)
+        self.watcher = watcher or create_watcher(self.migration_dir)
+
+    def refresh(self, timeout: float = 0) -> bool:
+        names = self.watcher.changes(timeout)
+        if names is None:
+            names = {file.name for file in self.graph.source_files}
+            names.update(os.listdir(self.migration_dir))
+
+        # deletions first, so that a file renamed in the same batch, or a
+        # revision moved to another file, is not seen twice
+        files = [
+            self.migration_dir / name
+            for name in sorted(names)
+            if is_migration_file(name)
+        ]
+        files.sort(key=lambda file: file.is_file())
+
+        version = self.graph.version
+        error: WandernException | None = None
+        for file in files:
+            try:
+                self.graph.update_file(file)
+            except WandernException as exc:
+                # keep applying the other changes, report the first problem
+                error = error or exc
+
+        if error is not None:
+            raise error
+        return self.graph.version != version
+
+    def close(self) -> None:
+        self.watcher.close()
+
+    def __enter__(self) -> "GraphWatcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()